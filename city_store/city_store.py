@@ -0,0 +1,202 @@
+"""
+Local store of cities, backed by SQLite, consulted before the external city service.
+
+Cities are bulk-loaded from a file, e.g. the locations of cities.yaml, so that known
+cities never need a network round trip and everything can run offline. Cities missing
+from the store are fetched from the city service with a pooled HTTP session and stored.
+
+Cities are returned as the city service returns them, i.e. with name, latitude,
+longitude, population and country.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from pathlib import Path
+import sqlite3
+from threading import Lock
+from typing import Any, Dict, Iterable, List
+import requests
+from requests.adapters import HTTPAdapter
+import yaml
+
+FIELDS = ("name", "latitude", "longitude", "population", "country")
+
+
+class CityStore:
+    # Names looked up per query, within the SQLite limit on the number of variables
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        file: Path,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        timeout: float = 5,
+        max_connections: int = 8,
+    ) -> None:
+        """
+        Args:
+            file (Path): SQLite database, created if it does not exist
+            base_url (str | None): city service, None to run offline
+            api_key (str | None): API key of the city service
+            timeout (float): timeout of the requests to the city service, in seconds
+            max_connections (int): maximum number of concurrent requests to the city service
+        """
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._lock = Lock()
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the threads of the service, serialized by _lock
+        self._connection = sqlite3.connect(file, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Cities are looked up by the name they were requested with, e.g. "new york"
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cities (
+                query TEXT PRIMARY KEY COLLATE NOCASE,
+                name TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                population INTEGER,
+                country TEXT
+            )
+            """
+        )
+        self._connection.commit()
+
+        # Keep-alive connections to the city service
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=max_connections),
+        )
+        self._session.mount(
+            "http://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=max_connections),
+        )
+        if api_key is not None:
+            self._session.headers["X-Api-Key"] = api_key
+
+    def load(self, cities: Iterable[Dict[str, Any]]) -> int:
+        """Bulk-loads cities, replacing the stored ones with the same name
+
+        Args:
+            cities (Iterable[Dict[str, Any]]): name, latitude and longitude of every city,
+                optionally population and country
+
+        Returns:
+            int: number of cities loaded
+        """
+
+        rows = [
+            (city["name"],) + tuple(city.get(field) for field in FIELDS)
+            for city in cities
+        ]
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cities VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._connection.commit()
+
+        return len(rows)
+
+    def load_file(self, file: Path) -> int:
+        """Bulk-loads the cities of a file
+
+        Args:
+            file (Path): YAML file with a list of cities under locations, e.g. cities.yaml,
+                or CSV file with a header with the fields of the cities
+
+        Returns:
+            int: number of cities loaded
+        """
+
+        with open(file, "r", newline="") as cities_file:
+            if file.suffix.lower() == ".csv":
+                return self.load(csv.DictReader(cities_file))
+
+            return self.load(yaml.safe_load(cities_file)["locations"])
+
+    def get(self, names: List[str]) -> List[Dict[str, Any]]:
+        """Returns the cities, fetching the ones missing from the store from the city service
+
+        Args:
+            names (List[str]): city names
+
+        Raises:
+            ValueError: if a city is neither stored nor known to the city service
+
+        Returns:
+            List[Dict[str, Any]]: the cities, in the same order
+        """
+
+        cities = self._get_stored(names)
+        missing = list(dict.fromkeys(name for name in names if name not in cities))
+
+        if missing:
+            if self.base_url is None:
+                raise ValueError(f"Unknown cities {missing}, the city store is offline")
+
+            # Cold cities are fetched concurrently
+            with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+                fetched = list(executor.map(self._fetch, missing))
+
+            self._put(zip(missing, fetched))
+            cities.update(zip(missing, fetched))
+
+        return [cities[name] for name in names]
+
+    def _get_stored(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        unique = list(dict.fromkeys(names))
+
+        rows = []
+
+        with self._lock:
+            for i in range(0, len(unique), self.LOOKUP_BATCH_SIZE):
+                batch = unique[i : i + self.LOOKUP_BATCH_SIZE]
+                rows.extend(
+                    self._connection.execute(
+                        f"SELECT query, {', '.join(FIELDS)} FROM cities "
+                        f"WHERE query IN ({', '.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+
+        # Stored and requested names may differ in case
+        stored = {query.lower(): dict(zip(FIELDS, values)) for query, *values in rows}
+
+        return {
+            name: stored[name.lower()] for name in unique if name.lower() in stored
+        }
+
+    def _fetch(self, name: str) -> Dict[str, Any]:
+        response = self._session.get(
+            self.base_url, params={"name": name}, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        if not response.json():
+            raise ValueError(f"Unknown city {name}")
+
+        return {field: response.json()[0].get(field) for field in FIELDS}
+
+    def _put(self, cities: Iterable[tuple]) -> None:
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cities VALUES (?, ?, ?, ?, ?, ?)",
+                [(query,) + tuple(city[field] for field in FIELDS) for query, city in cities],
+            )
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM cities").fetchone()[0]
+
+    def close(self) -> None:
+        self._session.close()
+        self._connection.close()
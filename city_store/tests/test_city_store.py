@@ -0,0 +1,149 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import sqlite3
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+import pytest
+from city_store import CityStore
+
+
+class TestCityStore:
+    def test_load_file(self, tmp_path):
+        store = CityStore(tmp_path / "cities.sqlite")
+
+        assert store.load_file(Path("../../cities.yaml")) == 11
+
+        tokyo, cairo = store.get(["tokyo", "Cairo"])
+
+        assert tokyo["name"] == "Tokyo"
+        assert tokyo["latitude"] == pytest.approx(35.6897)
+        assert cairo["name"] == "Cairo"
+
+        # Offline
+        with pytest.raises(ValueError):
+            store.get(["Rome"])
+
+    def test_load_csv_file(self, tmp_path):
+        (tmp_path / "cities.csv").write_text(
+            "name,latitude,longitude,population,country\n"
+            "Rome,41.8931,12.4828,2872800,IT\n"
+            "Lima,-12.06,-77.0375,8852000,PE\n"
+        )
+        store = CityStore(tmp_path / "cities.sqlite")
+
+        assert store.load_file(tmp_path / "cities.csv") == 2
+
+        (lima,) = store.get(["Lima"])
+
+        assert lima == {
+            "name": "Lima",
+            "latitude": pytest.approx(-12.06),
+            "longitude": pytest.approx(-77.0375),
+            "population": 8852000,
+            "country": "PE",
+        }
+
+    def test_local_lookup(self, tmp_path):
+        store = CityStore(tmp_path / "cities.sqlite")
+        store.load(
+            [
+                {"name": "Tokyo", "latitude": 35.6897, "longitude": 139.692},
+                {"name": "Cairo", "latitude": 30.0444, "longitude": 31.2358},
+            ]
+        )
+
+        # In the requested order, duplicates included, whatever the case
+        cities = store.get(["CAIRO", "tokyo", "Cairo"])
+
+        assert [city["name"] for city in cities] == ["Cairo", "Tokyo", "Cairo"]
+        assert cities[1]["population"] is None
+
+        # Reloading a city replaces it
+        store.load([{"name": "Tokyo", "latitude": 35.0, "longitude": 139.0}])
+
+        assert store.get(["Tokyo"])[0]["latitude"] == pytest.approx(35.0)
+        assert len(store) == 2
+
+        # Persisted
+        store.close()
+
+        assert len(CityStore(tmp_path / "cities.sqlite")) == 2
+
+    def test_many_cities(self, tmp_path):
+        store = CityStore(tmp_path / "cities.sqlite")
+        store.load(
+            [
+                {"name": f"City {i}", "latitude": i / 100, "longitude": 0.0}
+                for i in range(1200)
+            ]
+        )
+
+        # Fewer variables per query than cities requested
+        store._connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        names = [f"city {i}" for i in reversed(range(1200))]
+
+        cities = store.get(names)
+
+        assert [city["name"] for city in cities] == [
+            f"City {i}" for i in reversed(range(1200))
+        ]
+
+    def test_remote_fallback(self, tmp_path):
+        requested = []
+
+        class CityService(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = parse_qs(urlparse(self.path).query)["name"][0]
+                requested.append((name, self.headers["X-Api-Key"]))
+
+                body = json.dumps(
+                    [
+                        {
+                            "name": name.title(),
+                            "latitude": 41.8931,
+                            "longitude": 12.4828,
+                            "population": 2872800,
+                            "country": "IT",
+                        }
+                    ]
+                    if name != "Atlantis"
+                    else []
+                ).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CityService)
+        Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            store = CityStore(
+                tmp_path / "cities.sqlite",
+                base_url=f"http://127.0.0.1:{server.server_port}/city",
+                api_key="key",
+            )
+            store.load([{"name": "Tokyo", "latitude": 35.6897, "longitude": 139.692}])
+
+            cities = store.get(["rome", "Tokyo", "rome"])
+
+            assert [city["name"] for city in cities] == ["Rome", "Tokyo", "Rome"]
+            # Only the missing city, once
+            assert requested == [("rome", "key")]
+
+            # Stored
+            store.get(["Rome"])
+
+            assert len(requested) == 1
+            assert len(store) == 2
+
+            with pytest.raises(ValueError):
+                store.get(["Atlantis"])
+        finally:
+            server.shutdown()
@@ -0,0 +1,195 @@
+"""
+Zero-copy reader of the compact binary topology snapshots served by the topology_builder
+service (topology_builder/topology/binary_format.py), and streaming reader of the
+topology archives of its range endpoint (topology_builder/topology/archive.py).
+"""
+
+from datetime import datetime, timezone
+import json
+import struct
+from typing import Any, Dict, Iterable, Iterator, Tuple
+import networkx as nx
+import numpy as np
+
+MAGIC = b"TOPO"
+VERSION = 1
+MIMETYPE = "application/x-topology"
+
+ARCHIVE_MAGIC = b"TOPA"
+ARCHIVE_MIMETYPE = "application/x-topology-archive"
+
+NODE_TYPES = ["GROUD_STATION", "LEO_SATELLITE"]
+
+# Archive record kinds
+KEYFRAME = 0
+DELTA = 1
+END = 2
+
+_PREAMBLE = struct.Struct("<4sII")
+_RECORD = struct.Struct("<Bdq")  # kind, POSIX timestamp, payload size
+_DELTA_COUNTS = struct.Struct("<III")  # removed, added, updated
+
+
+def decode(buffer: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    magic, version, header_size = _PREAMBLE.unpack_from(buffer)
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a topology snapshot or unsupported version")
+
+    header = json.loads(bytes(buffer[_PREAMBLE.size : _PREAMBLE.size + header_size]))
+
+    # Views on buffer, no copies
+    arrays = {
+        name: np.frombuffer(
+            buffer,
+            dtype=np.dtype(spec["dtype"]),
+            count=int(np.prod(spec["shape"])),
+            offset=spec["offset"],
+        ).reshape(spec["shape"])
+        for name, spec in header["arrays"].items()
+    }
+
+    return header, arrays
+
+
+def _to_digraph(
+    header: Dict[str, Any],
+    arrays: Dict[str, np.ndarray],
+    edges: Iterable[Tuple[int, int, float]],
+) -> nx.DiGraph:
+    nodes = header["nodes"]
+    graph = nx.DiGraph()
+
+    for i, node in enumerate(nodes):
+        info = {
+            "type": NODE_TYPES[arrays["node_type"][i]],
+            "latitude": float(arrays["latitude"][i]),
+            "longitude": float(arrays["longitude"][i]),
+        }
+
+        if arrays["plane"][i] >= 0:
+            info["height"] = float(arrays["height"][i])
+            info["plane"] = int(arrays["plane"][i])
+            info["position_in_plane"] = int(arrays["position_in_plane"][i])
+
+            # Snapshots of older services have no shells
+            if "shell" in arrays:
+                info["shell"] = int(arrays["shell"][i])
+
+        graph.add_node(node, **info)
+
+    graph.add_edges_from(
+        (nodes[u], nodes[v], {"length": length}) for u, v, length in edges
+    )
+
+    return graph
+
+
+def _get_edges(arrays: Dict[str, np.ndarray]) -> Dict[Tuple[int, int], float]:
+    # Directed edges, in the order of the CSR arrays
+    sources = np.repeat(np.arange(len(arrays["node_type"])), np.diff(arrays["indptr"]))
+
+    return dict(
+        zip(
+            zip(sources.tolist(), arrays["indices"].tolist()),
+            arrays["length"].tolist(),
+        )
+    )
+
+
+def to_digraph(buffer: bytes) -> nx.DiGraph:
+    header, arrays = decode(buffer)
+
+    return _to_digraph(
+        header,
+        arrays,
+        ((u, v, length) for (u, v), length in _get_edges(arrays).items()),
+    )
+
+
+def _apply_delta(edges: Dict[Tuple[int, int], float], payload: bytes) -> None:
+    n_removed, n_added, n_updated = _DELTA_COUNTS.unpack_from(payload)
+
+    offset = _DELTA_COUNTS.size
+    arrays = []
+    for dtype, count in [
+        ("<i4", 2 * n_removed),
+        ("<i4", 2 * n_added),
+        ("<f8", n_added),
+        ("<i4", 2 * n_updated),
+        ("<f8", n_updated),
+    ]:
+        arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+        offset += arrays[-1].nbytes
+
+    removed, added, added_length, updated, updated_length = arrays
+
+    for u, v in removed.reshape(-1, 2).tolist():
+        del edges[u, v]
+        del edges[v, u]
+
+    # New links are appended, existing links keep their position in the adjacency
+    for (u, v), length in zip(added.reshape(-1, 2).tolist(), added_length.tolist()):
+        edges[u, v] = edges[v, u] = length
+
+    for (u, v), length in zip(updated.reshape(-1, 2).tolist(), updated_length.tolist()):
+        edges[u, v] = edges[v, u] = length
+
+
+def iter_archive(chunks: Iterable[bytes]) -> Iterator[Tuple[datetime, nx.DiGraph]]:
+    """Decodes a topology archive while it is received, e.g. from
+    requests.Response.iter_content, yielding every snapshot as soon as it is complete
+
+    Args:
+        chunks (Iterable[bytes]): the archive, in chunks of any size
+
+    Yields:
+        Iterator[Tuple[datetime, nx.DiGraph]]: time instant and topology of every snapshot
+    """
+
+    buffer = bytearray()
+    chunks = iter(chunks)
+    offset = 0
+    started = False
+
+    header, arrays, edges = None, None, dict()
+
+    while True:
+        # Wait for the magic, then for whole records
+        needed = len(ARCHIVE_MAGIC) if not started else _RECORD.size
+        if len(buffer) - offset >= _RECORD.size and started:
+            needed += _RECORD.unpack_from(buffer, offset)[2]
+
+        if len(buffer) - offset < needed:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Truncated topology archive")
+            # Drop what has been consumed
+            del buffer[:offset]
+            offset = 0
+            buffer += chunk
+            continue
+
+        if not started:
+            if bytes(buffer[: len(ARCHIVE_MAGIC)]) != ARCHIVE_MAGIC:
+                raise ValueError("Not a topology archive")
+            offset += len(ARCHIVE_MAGIC)
+            started = True
+            continue
+
+        kind, timestamp, size = _RECORD.unpack_from(buffer, offset)
+        payload = bytes(buffer[offset + _RECORD.size : offset + _RECORD.size + size])
+        offset += _RECORD.size + size
+
+        if kind == END:
+            return
+
+        if kind == KEYFRAME:
+            header, arrays = decode(payload)
+            edges = _get_edges(arrays)
+        else:
+            _apply_delta(edges, payload)
+
+        yield datetime.fromtimestamp(timestamp, tz=timezone.utc), _to_digraph(
+            header, arrays, ((u, v, length) for (u, v), length in edges.items())
+        )
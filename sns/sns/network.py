@@ -1,6 +1,6 @@
-from enum import Enum
+from datetime import datetime
 import json
-from typing import Any, List, Self, Tuple, Dict, Union
+from typing import Any, Iterator, List, Self, Tuple, Dict, Union
 import requests
 import networkx as nx
 from ns.packet.sink import PacketSink
@@ -12,16 +12,35 @@ import sns.leo_satellite as snsleo
 import sns.packet_generator as snspg
 import sns.network_parameters as snsntwkparams
 import sns.sr_header_builder as srhb
-
-
-class NodeTypes(str, Enum):
-    GROUD_STATION = "GROUD_STATION"
-    LEO_SATELLITE = "LEO_SATELLITE"
+import sns.binary_topology as snsbt
+import sns.traffic_matrix as snstm
+# Re-exported, sr_header_builder imports node_types so as not to import network
+from sns.node_types import NodeTypes
 
 
 class Network:
     def __init__(self, graph: nx.DiGraph) -> None:
         self.graph = graph
+        self._partition_nodes()
+
+    def _partition_nodes(self) -> None:
+        # Node-type partitions, the info dicts are the graph's own so attributes stay in sync
+        self._nodes_by_type: Dict[NodeTypes, List[Tuple[Any, Any]]] = {
+            node_type: [] for node_type in NodeTypes
+        }
+
+        for node, info in self.graph.nodes(data=True):
+            self._nodes_by_type[info["type"]].append((node, info))
+
+        self._partitioned_nodes = frozenset(self.graph)
+
+    def _get_nodes_by_type(self, node_type: NodeTypes) -> List[Tuple[Any, Any]]:
+        # Invalidate the partitions if nodes have been added or removed, even when as
+        # many were added as removed
+        if frozenset(self.graph) != self._partitioned_nodes:
+            self._partition_nodes()
+
+        return self._nodes_by_type[node_type]
 
     def __str__(self) -> str:
         return f"Network: {json.dumps(nx.node_link_data(self.graph), indent=4, default=lambda o: f'{type(o)}')}"
@@ -30,18 +49,10 @@ class Network:
         return self.__str__()
 
     def get_GSs(self) -> List[Tuple[Any, Any]]:
-        return [
-            (node, info)
-            for node, info in self.graph.nodes(data=True)
-            if info["type"] == NodeTypes.GROUD_STATION
-        ]
+        return self._get_nodes_by_type(NodeTypes.GROUD_STATION)
 
     def get_leo_satellites(self) -> List[Tuple[Any, Any]]:
-        return [
-            (node, info)
-            for node, info in self.graph.nodes(data=True)
-            if info["type"] == NodeTypes.LEO_SATELLITE
-        ]
+        return self._get_nodes_by_type(NodeTypes.LEO_SATELLITE)
 
     def get_shortest_path(
         self, source: str, target: str, weight=None
@@ -56,7 +67,7 @@ class Network:
     def __build(
         self,
         env: simpy.Environment,
-        traffic_matrix: Dict[str, Dict[str, float]],
+        traffic_matrix: snstm.TrafficMatrix,
         old_ntwk: Self | None = None,
         packet_forwarding_strategy: snsleo.ForwardingStrategy = snsleo.ForwardingStrategy.PORT_FORWARDING,
         srhb_class: Union[
@@ -65,9 +76,18 @@ class Network:
             srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
             srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
         ] = srhb.BaselineSourceRoutingHeaderBuilder,
+        sr_header_builder: srhb.BaselineSourceRoutingHeaderBuilder | None = None,
         debug: bool = False,
     ) -> Self:
 
+        # Routing state, kept across the snapshots of a simulation
+        if sr_header_builder is not None:
+            self.sr_header_builder = sr_header_builder
+        elif old_ntwk:
+            self.sr_header_builder = old_ntwk.sr_header_builder
+        else:
+            self.sr_header_builder = srhb_class()
+
         # Set sink
         for gs, gs_info in self.get_GSs():
             if old_ntwk:
@@ -84,24 +104,27 @@ class Network:
                 if "packet_generator" not in src_gs_info:
                     src_gs_info["packet_generator"] = dict()
 
+                # Bound per pair, the rate of the snapshot's traffic matrix
+                ad = (
+                    snsntwkparams.NetworkParameters.PACKET_SIZE
+                    / traffic_matrix.get(src_gs, dst_gs)
+                )
+
                 if old_ntwk:
                     pg: snspg.PacketGenerator = old_ntwk.graph.nodes[src_gs][
                         "packet_generator"
                     ][dst_gs]
                     pg.graph = self.graph
+                    pg.arrival_dist = lambda ad=ad: ad
 
                 else:
-                    ad = (
-                        snsntwkparams.NetworkParameters.PACKET_SIZE
-                        / traffic_matrix[src_gs][dst_gs]
-                    )
                     pg = snspg.PacketGenerator(
                         env=env,
                         src=src_gs,
                         dst=dst_gs,
                         graph=self.graph,
-                        srhb_class=srhb_class,
-                        arrival_dist=lambda: ad,
+                        sr_header_builder=self.sr_header_builder,
+                        arrival_dist=lambda ad=ad: ad,
                         size_dist=lambda: snsntwkparams.NetworkParameters.PACKET_SIZE,
                         debug=debug,
                     )
@@ -269,12 +292,37 @@ class Network:
                 print(f"    ├ -- packets_dropped: {out_port.packets_dropped}   ")
                 print(f"    ├ -- buffer size in bytes: {int(out_port.byte_size)}")
 
+    @classmethod
+    def from_graph(
+        cls,
+        env: simpy.Environment,
+        graph: nx.DiGraph,
+        traffic_matrix: snstm.TrafficMatrix,
+        old_ntwk: Self = None,
+        packet_forwarding_strategy: snsleo.ForwardingStrategy = snsleo.ForwardingStrategy.PORT_FORWARDING,
+        srhb_class: Union[
+            srhb.BaselineSourceRoutingHeaderBuilder,
+            srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
+            srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
+            srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
+        ] = srhb.BaselineSourceRoutingHeaderBuilder,
+        sr_header_builder: srhb.BaselineSourceRoutingHeaderBuilder | None = None,
+    ) -> Self:
+        return cls(graph=graph).__build(
+            env=env,
+            traffic_matrix=traffic_matrix,
+            old_ntwk=old_ntwk,
+            packet_forwarding_strategy=packet_forwarding_strategy,
+            srhb_class=srhb_class,
+            sr_header_builder=sr_header_builder,
+        )
+
     @classmethod
     def from_topology_builder_svc(
         cls,
         env: simpy.Environment,
         topology_builder_svc_url: str,
-        traffic_matrix: Dict[str, Dict[str, float]],
+        traffic_matrix: snstm.TrafficMatrix,
         old_ntwk: Self = None,
         packet_forwarding_strategy: snsleo.ForwardingStrategy = snsleo.ForwardingStrategy.PORT_FORWARDING,
         srhb_class: Union[
@@ -283,16 +331,33 @@ class Network:
             srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
             srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
         ] = srhb.BaselineSourceRoutingHeaderBuilder,
+        sr_header_builder: srhb.BaselineSourceRoutingHeaderBuilder | None = None,
     ) -> Self:
-        topology_builder_svc_data = requests.get(url=topology_builder_svc_url).json()
+        response = requests.get(url=topology_builder_svc_url)
 
-        nx_obj = topology_builder_svc_data["networkx_obj"]
-        ntwk = cls(graph=nx.DiGraph(nx.node_link_graph(nx_obj)))
+        if response.headers.get("Content-Type", "").startswith(snsbt.MIMETYPE):
+            graph = snsbt.to_digraph(response.content)
+        else:
+            nx_obj = response.json()["networkx_obj"]
+            graph = nx.DiGraph(nx.node_link_graph(nx_obj))
 
-        return ntwk.__build(
+        return cls.from_graph(
             env=env,
+            graph=graph,
             traffic_matrix=traffic_matrix,
             old_ntwk=old_ntwk,
             packet_forwarding_strategy=packet_forwarding_strategy,
             srhb_class=srhb_class,
-        )
\ No newline at end of file
+            sr_header_builder=sr_header_builder,
+        )
+
+    @staticmethod
+    def iter_topology_builder_svc_range(
+        topology_builder_svc_range_url: str,
+    ) -> Iterator[Tuple[datetime, nx.DiGraph]]:
+        """
+        Topologies of the range endpoint of the topology builder service, yielded as soon as they are received
+        """
+        with requests.get(url=topology_builder_svc_range_url, stream=True) as response:
+            response.raise_for_status()
+            yield from snsbt.iter_archive(response.iter_content(chunk_size=None))
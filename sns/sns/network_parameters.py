@@ -3,8 +3,12 @@ class NetworkParameters:
     PACKET_SIZE = 1_500  # bytes
     SATELLITE_QUEUE_SIZE = PACKET_SIZE * 10_000 # bytes
     TOTAL_VOLUME_OF_TRAFFIC = 10_000_000_000 # bytes / second
+    DIURNAL_AMPLITUDE = 0.5 # relative swing of the traffic of a city along the day
+    TRAFFIC_FLUCTUATION = 0.1 # standard deviation of the log of the random fluctuation of the traffic
+    TRAFFIC_SEED = 0
     CITIES_FILE_PATH = '../cities.yaml'
     SATELLITE_PORT_RATE = 1_000_000_000  # bit / second
     LINK_SWITCH_DELAY = 0.1  # seconds
     LIMIT_BYTES = True
-    ALPHA = 0.125
\ No newline at end of file
+    ALPHA = 0.125
+    NODE_DISJOINT_PATHS_PROCESSES = 1 # processes computing the node disjoint paths, 1 computes them in the simulation
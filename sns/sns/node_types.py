@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class NodeTypes(str, Enum):
+    GROUD_STATION = "GROUD_STATION"
+    LEO_SATELLITE = "LEO_SATELLITE"
@@ -1,7 +1,7 @@
 from ns.packet.packet import Packet
 import simpy
 import networkx as nx
-from typing import Callable, Union
+from typing import Callable
 import sns.network_parameters as snsnp
 import sns.sr_header_builder as srhb
 
@@ -13,12 +13,7 @@ class PacketGenerator:
         src: str,
         dst: str,
         graph: nx.digraph,
-        srhb_class: Union[
-            srhb.BaselineSourceRoutingHeaderBuilder,
-            srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
-            srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
-            srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
-        ],
+        sr_header_builder: srhb.BaselineSourceRoutingHeaderBuilder,
         arrival_dist: Callable,
         size_dist: Callable,
         initial_delay=0,
@@ -35,10 +30,11 @@ class PacketGenerator:
         self.src = src
         self.dst = dst
         self.graph = graph
-        self.srhb_class = srhb_class
+        # Routing state of the network, shared by its packet generators
+        self.sr_header_builder = sr_header_builder
 
         self.timeout_routing_update = 1  # seconds
-        self.sr_header_builder = None
+        self.routing_info_updated = False
         self.last_timeout_routing_update = env.now
         self.out = None
         self.packets_sent = 0
@@ -51,7 +47,7 @@ class PacketGenerator:
 
     def __update_routing_info(self) -> None:
         yield self.env.timeout(snsnp.NetworkParameters.LEO_GEO_GS_TD)
-        self.sr_header_builder = self.srhb_class.instance(
+        self.sr_header_builder.update(
             self.env, self.graph, self.timeout_routing_update
         )
 
@@ -62,10 +58,11 @@ class PacketGenerator:
 
             self.packets_sent += 1
 
-            if not self.sr_header_builder:
-                self.sr_header_builder = self.srhb_class.instance(
+            if not self.routing_info_updated:
+                self.sr_header_builder.update(
                     self.env, self.graph, self.timeout_routing_update
                 )
+                self.routing_info_updated = True
 
             packet = Packet(
                 time=self.env.now,
@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta
 import simpy
 from sns.network import Network
+from sns.traffic_matrix import TrafficMatrix
 from sns.leo_satellite import ForwardingStrategy, LeoSatellite
 import sns.network_parameters as ntwkparams
 from typing import Any, List, Union
 from collections import defaultdict as dd
-import requests
 import time
 import sns.sr_header_builder as srhb
 
@@ -25,7 +25,6 @@ def run_sns_simulation(
         srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
     ] = srhb.BaselineSourceRoutingHeaderBuilder,
 ) -> Any:
-    now = start_time
     old_ntwk = None
 
     average_buffer_occupation = dd(int)
@@ -35,84 +34,123 @@ def run_sns_simulation(
     number_of_packets_delivered = dd(int)
     number_of_packets_sent = dd(int)
 
-    traffic_matrix = requests.get(
-        url=f"{traffic_matrix_svc_url}?total_volume_of_traffic={ntwkparams.NetworkParameters.TOTAL_VOLUME_OF_TRAFFIC}&cities={','.join(cities)}",
-    ).json()
+    # Time-varying traffic matrices, one per snapshot, generated while the simulation runs
+    traffic_matrices = TrafficMatrix.iter_traffic_matrix_svc_range(
+        f"{traffic_matrix_svc_url}/range"
+        f"?total_volume_of_traffic={ntwkparams.NetworkParameters.TOTAL_VOLUME_OF_TRAFFIC}"
+        f"&start={start_time.strftime('%Y-%m-%d %H:%M:%S %z').replace('+', '%2B')}"
+        f"&end={end_time.strftime('%Y-%m-%d %H:%M:%S %z').replace('+', '%2B')}"
+        f"&dt={int(snapshot_duration.total_seconds() * 1000)}"
+        f"&cities={','.join(cities)}"
+        f"&amplitude={ntwkparams.NetworkParameters.DIURNAL_AMPLITUDE}"
+        f"&fluctuation={ntwkparams.NetworkParameters.TRAFFIC_FLUCTUATION}"
+        f"&seed={ntwkparams.NetworkParameters.TRAFFIC_SEED}"
+    )
+
+    # Every snapshot of the simulation in a single streamed response. Full snapshots keep
+    # the adjacency order, hence the port numbering, of the topology builder
+    snapshots = Network.iter_topology_builder_svc_range(
+        f"{topology_builder_svc_url}/range"
+        f"?start={start_time.strftime('%Y-%m-%d %H:%M:%S %z').replace('+', '%2B')}"
+        f"&end={end_time.strftime('%Y-%m-%d %H:%M:%S %z').replace('+', '%2B')}"
+        f"&dt={int(snapshot_duration.total_seconds() * 1000)}"
+        f"&cities={','.join(cities)}&keyframe_interval=1"
+    )
+
+    s_time = time.time()
+
+    # Routing state of the simulation, shared by the networks of its snapshots
+    sr_header_builder = srhb_class()
+
+    try:
+        # Streams of different lengths raise ValueError
+        for (now, graph), (traffic_matrix_time, traffic_matrix) in zip(
+            snapshots, traffic_matrices, strict=True
+        ):
+            if traffic_matrix_time != now:
+                raise ValueError(
+                    f"Traffic matrix at {traffic_matrix_time} for the snapshot at {now}"
+                )
+
+            print(f"\nRunning simulation at {now}")
+
+            ntwk = Network.from_graph(
+                env=env,
+                graph=graph,
+                traffic_matrix=traffic_matrix,
+                old_ntwk=old_ntwk,
+                packet_forwarding_strategy=forwarding_strategy,
+                sr_header_builder=sr_header_builder,
+            )
+
+            print("--- Building took %s seconds ---" % (time.time() - s_time))
+
+            env.run(until=((now - start_time) + snapshot_duration).seconds)
+
+            print("--- Simulating took %s seconds ---" % (time.time() - s_time))
+
+            ntwk.dump_status()
 
-    while now <= end_time:
-        print(f"\nRunning simulation at {now}")
+            for _, satellite_info in ntwk.get_leo_satellites():
+                leo_satellite: LeoSatellite = satellite_info["leo_satellite"]
 
-        s_time = time.time()
+                average_buffer_occupation[(now - start_time).seconds] += sum(
+                    [
+                        int(port.byte_size / ntwkparams.NetworkParameters.PACKET_SIZE)
+                        for port in leo_satellite.out_ports.values()
+                    ]
+                ) / len(leo_satellite.out_ports.values())
 
-        ntwk = Network.from_topology_builder_svc(
-            env=env,
-            topology_builder_svc_url=f"{topology_builder_svc_url}?t={now.strftime('%Y-%m-%d %H:%M:%S %z').replace('+', '%2B')}&cities={','.join(cities)}",
-            traffic_matrix=traffic_matrix,
-            old_ntwk=old_ntwk,
-            packet_forwarding_strategy=forwarding_strategy,
-            srhb_class=srhb_class
-        )
+            average_buffer_occupation[(now - start_time).seconds] /= len(
+                ntwk.get_leo_satellites()
+            )
 
-        print("--- Building took %s seconds ---" % (time.time() - s_time))
-        
-        env.run(until=((now - start_time) + snapshot_duration).seconds)
+            number_of_packets_dropped_for_rounting_issues[(now - start_time).seconds] = sum(
+                [
+                    sat_info["leo_satellite"].routing_issues_drops
+                    for _, sat_info in ntwk.get_leo_satellites()
+                ]
+            )
+
+            number_of_packets_dropped_for_buffer_issues[(now - start_time).seconds] = sum(
+                [
+                    sat_info["leo_satellite"].port_drop()
+                    for _, sat_info in ntwk.get_leo_satellites()
+                ]
+            )
 
-        print("--- Simulating took %s seconds ---" % (time.time() - s_time))
+            number_of_packets_dropped[(now - start_time).seconds] = (
+                number_of_packets_dropped_for_rounting_issues[(now - start_time).seconds]
+                + number_of_packets_dropped_for_buffer_issues[(now - start_time).seconds]
+            )
 
-        ntwk.dump_status()
-        
-        for _, satellite_info in ntwk.get_leo_satellites():
-            leo_satellite: LeoSatellite = satellite_info["leo_satellite"]
+            number_of_packets_delivered[(now - start_time).seconds] = sum(
+                [
+                    sum(list(gs_info["packet_sink"].packets_received.values()))
+                    for _, gs_info in ntwk.get_GSs()
+                ]
+            )
 
-            average_buffer_occupation[(now - start_time).seconds] += sum(
+            number_of_packets_sent[(now - start_time).seconds] = sum(
                 [
-                    int(port.byte_size / ntwkparams.NetworkParameters.PACKET_SIZE)
-                    for port in leo_satellite.out_ports.values()
+                    sum([pg.packets_sent for pg in gs_info["packet_generator"].values()])
+                    for _, gs_info in ntwk.get_GSs()
                 ]
-            ) / len(leo_satellite.out_ports.values())
-
-        average_buffer_occupation[(now - start_time).seconds] /= len(
-            ntwk.get_leo_satellites()
-        )
-
-        number_of_packets_dropped_for_rounting_issues[(now - start_time).seconds] = sum(
-            [
-                sat_info["leo_satellite"].routing_issues_drops
-                for _, sat_info in ntwk.get_leo_satellites()
-            ]
-        )
-
-        number_of_packets_dropped_for_buffer_issues[(now - start_time).seconds] = sum(
-            [
-                sat_info["leo_satellite"].port_drop()
-                for _, sat_info in ntwk.get_leo_satellites()
-            ]
-        )
-
-        number_of_packets_dropped[(now - start_time).seconds] = (
-            number_of_packets_dropped_for_rounting_issues[(now - start_time).seconds]
-            + number_of_packets_dropped_for_buffer_issues[(now - start_time).seconds]
-        )
-
-        number_of_packets_delivered[(now - start_time).seconds] = sum(
-            [
-                sum(list(gs_info["packet_sink"].packets_received.values()))
-                for _, gs_info in ntwk.get_GSs()
-            ]
-        )
-
-        number_of_packets_sent[(now - start_time).seconds] = sum(
-            [
-                sum([pg.packets_sent for pg in gs_info["packet_generator"].values()])
-                for _, gs_info in ntwk.get_GSs()
-            ]
-        )
-
-        # print(json.dumps(average_buffer_occupation, indent=4))
-
-        old_ntwk = ntwk
-
-        now += snapshot_duration
+            )
+
+            # print(json.dumps(average_buffer_occupation, indent=4))
+
+            old_ntwk = ntwk
+
+            s_time = time.time()
+
+    finally:
+        # Release the HTTP responses of both streams, also when they are not consumed
+        snapshots.close()
+        traffic_matrices.close()
+
+        # The routing state lives as long as the simulation, also when it fails
+        sr_header_builder.close()
 
     return (
         average_buffer_occupation,
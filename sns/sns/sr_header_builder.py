@@ -1,41 +1,66 @@
-import json
 import math
-import time
+import multiprocessing
 from typing import Dict, List, Tuple, Self
 import networkx as nx
-import sns.network as snsntwk
+import sns.node_types as snsnt
 import sns.network_parameters as snsnp
+from concurrent.futures import ProcessPoolExecutor
 from collections import defaultdict as dd
 from networkx.algorithms.flow import build_residual_network
 from networkx.algorithms.connectivity import build_auxiliary_node_connectivity
-from networkx.classes.function import path_weight
 import random
 import numpy as np
 from collections import defaultdict as dd
 from datetime import datetime
+import heapq
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import dijkstra
 import simpy
 
+# Stands for infinite weights, which nx.shortest_path still crosses as a last resort. It
+# exceeds any path of finite weights, weights above 2**31 - 1 are infinite
+INFINITE_WEIGHT = float(2**53)
+# Fraction of the edges whose weight changes above which the shortest path trees are
+# recomputed from scratch instead of being repaired
+REPAIR_MAX_CHANGED_EDGES = 0.05
+# Fraction of the nodes of a tree whose distance is lost above which the tree is
+# recomputed from scratch instead of being repaired
+REPAIR_MAX_AFFECTED_NODES = 0.25
+
 
 class BaselineSourceRoutingHeaderBuilder:
-    _instance: Self = None
-    _graph: nx.DiGraph = None
-    _last_update: int = None
+    """Routing state of a single simulation, owned by its network and shared by the
+    packet generators. Builders do not share any state, so simulations can run side by
+    side in threads or processes"""
 
-    def __init__(self):
-        raise RuntimeError("Call instance() instead")
+    def __init__(self) -> None:
+        self._graph: nx.DiGraph = None
+        self._last_update: float = None
 
-    def get_sr_header(self, src_gs: str, dst_gs: str) -> List[Tuple[int, str]]:
+    def __enter__(self) -> Self:
+        return self
 
-        s_time = time.time()
+    def __exit__(self, *args) -> None:
+        self.close()
 
-        sp = nx.shortest_path(
-            G=self._graph, source=src_gs, target=dst_gs, weight="weight"
-        )
+    def close(self) -> None:
+        """Releases the resources of the builder, which cannot be updated afterwards"""
+
+    def get_sr_header(self, src_gs: str, dst_gs: str) -> List[Tuple[int, str]]:
+        sr_header = self._sr_headers.get((src_gs, dst_gs))
+
+        if sr_header is None:
+            sp = self._get_shortest_path(src_gs, dst_gs)
+            sr_header = self._encode_sr_header([self._nodes[node] for node in sp])
+            self._sr_headers[src_gs, dst_gs] = sr_header
+            self._sr_header_paths[src_gs][dst_gs] = sp
 
-        #print("--- Simple shortest path took %s seconds ---" % (time.time() - s_time))
+        # Headers are consumed hop by hop
+        return list(sr_header)
 
+    def _encode_sr_header(self, sp: List[str]) -> List[Tuple[int, str]]:
         port_list = [
-            self._graph.edges[sp[i], sp[i + 1]]["out_port"]
+            int(self._out_port[self._edge_index[sp[i], sp[i + 1]]])
             for i in range(1, len(sp[1:]))
         ][::-1]
         satellite_gs_list = sp[1:][::-1]
@@ -45,194 +70,507 @@ class BaselineSourceRoutingHeaderBuilder:
             for port, satellite_or_gs in zip(port_list, satellite_gs_list)
         ]
 
-    def _set_up_graph_copy_for_routing(self, graph: nx.DiGraph):
-        # print('BaselineSourceRoutingHeaderBuilder')
-        for u, v in graph.edges:
-            uv_data = self._graph.edges[u, v]
-            uv_data["weight"] = uv_data["length"]
+    def _get_path_weight(self, path: List[str]) -> float:
+        return float(
+            sum(self._weight[self._edge_index[u, v]] for u, v in zip(path, path[1:]))
+        )
+
+    def _get_shortest_path(self, src_gs: str, dst_gs: str) -> List[int]:
+        src = self._node_index[src_gs]
+
+        # Shortest path tree of src, kept up to date across routing updates
+        if src_gs not in self._predecessors:
+            self._distances[src_gs], self._predecessors[src_gs] = dijkstra(
+                self._csgraph, indices=src, return_predecessors=True
+            )
+
+        predecessors = self._predecessors[src_gs]
+        sp = [self._node_index[dst_gs]]
+
+        while sp[-1] != src:
+            if predecessors[sp[-1]] < 0:
+                raise nx.NetworkXNoPath(f"No path between {src_gs} and {dst_gs}")
+            sp.append(int(predecessors[sp[-1]]))
+
+        return sp[::-1]
+
+    def _repair_shortest_path_tree(
+        self,
+        src: int,
+        distances: np.ndarray,
+        predecessors: np.ndarray,
+        changed: np.ndarray,
+        old_weights: np.ndarray,
+    ) -> bool:
+        """Dynamic SSSP, in the spirit of Ramalingam and Reps: repairs a shortest path tree in
+        place after the weights of the changed edges went from old_weights to the ones of
+        the CSR graph, touching only the nodes whose distance changes
+
+        Args:
+            src (int): source of the tree
+            distances (np.ndarray): distances from the source
+            predecessors (np.ndarray): shortest path tree, as returned by dijkstra
+            changed (np.ndarray): edges whose weight changed
+            old_weights (np.ndarray): previous weights of the changed edges
+
+        Returns:
+            bool: False if the tree is unaffected by the changes
+        """
+
+        weights = self._csgraph.data
+        sources = self._edge_sources[changed]
+        targets = self._csgraph.indices[changed]
+        increased = weights[changed] > old_weights
+
+        # Only heavier tree edges and lighter edges that shorten a path affect the tree
+        heavier_tree_edges = increased & (predecessors[targets] == sources)
+        shortening = ~increased & (
+            distances[sources] + weights[changed] < distances[targets]
+        )
+
+        if not heavier_tree_edges.any() and not shortening.any():
+            return False
+
+        # The subtrees under the tree edges that got heavier lose their distances, found
+        # by pointer jumping up the tree
+        affected = np.zeros(len(distances), dtype=bool)
+        affected[targets[heavier_tree_edges]] = True
+        ancestors = np.where(predecessors >= 0, predecessors, np.arange(len(distances)))
+
+        while True:
+            affected |= affected[ancestors]
+            next_ancestors = ancestors[ancestors]
+            if np.array_equal(next_ancestors, ancestors):
+                break
+            ancestors = next_ancestors
+
+        affected_nodes = np.flatnonzero(affected)
+
+        # Cheaper from scratch when most of the tree is affected
+        if len(affected_nodes) > REPAIR_MAX_AFFECTED_NODES * len(distances):
+            distances[:], predecessors[:] = dijkstra(
+                self._csgraph, indices=src, return_predecessors=True
+            )
+            return True
+
+        distances[affected_nodes] = np.inf
+        predecessors[affected_nodes] = -9999
+
+        # Affected nodes restart from their best unaffected in-neighbour
+        starts = self._in_indptr[affected_nodes]
+        counts = self._in_indptr[affected_nodes + 1] - starts
+        in_edges = self._in_edges[
+            np.repeat(starts - np.cumsum(counts) + counts, counts)
+            + np.arange(counts.sum())
+        ]
+        heads = np.repeat(affected_nodes, counts)
+        candidates = distances[self._edge_sources[in_edges]] + weights[in_edges]
+
+        order = np.lexsort((candidates, heads))
+        best = order[np.r_[True, heads[order][1:] != heads[order][:-1]][: len(order)]]
+        best = best[candidates[best] < np.inf]
 
-    def _copy_graph_structure(self, graph: nx.DiGraph) -> nx.DiGraph:
-        # copy graph structure and edge attributes
-        self._graph = graph.__class__()
-        self._graph.add_nodes_from(graph)
-        self._graph.add_edges_from(graph.edges(data=True))
+        # Distances and predecessors that changed, the others are read from the tree
+        new_distances = dict(zip(heads[best].tolist(), candidates[best].tolist()))
+        new_predecessors = dict(
+            zip(heads[best].tolist(), self._edge_sources[in_edges[best]].tolist())
+        )
 
-        # add data
-        for u, v in graph.edges:
+        # Edges that got lighter may shorten the paths through them
+        for edge in changed[~increased].tolist():
+            u, v = int(self._edge_sources[edge]), self._indices_list[edge]
+            distance = new_distances.get(u, distances[u]) + weights[edge]
+            if distance < new_distances.get(v, distances[v]):
+                new_distances[v] = distance
+                new_predecessors[v] = u
+
+        # Dijkstra from the nodes whose distance changed
+        indptr, indices = self._indptr_list, self._indices_list
+        heap = [(distance, v) for v, distance in new_distances.items()]
+        heapq.heapify(heap)
+
+        while heap:
+            distance, u = heapq.heappop(heap)
+            if distance > new_distances[u]:
+                continue
+
+            for edge in range(indptr[u], indptr[u + 1]):
+                v = indices[edge]
+                v_distance = new_distances.get(v)
+                if v_distance is None:
+                    v_distance = distances[v]
+
+                if distance + weights[edge] < v_distance:
+                    new_distances[v] = distance + weights[edge]
+                    new_predecessors[v] = u
+                    heapq.heappush(heap, (new_distances[v], v))
+
+        nodes = list(new_distances)
+        distances[nodes] = [new_distances[node] for node in nodes]
+        predecessors[nodes] = [new_predecessors[node] for node in nodes]
+
+        return True
+
+    def _set_up_routing_graph(self, graph: nx.DiGraph) -> None:
+        # The structure only changes with the topology, i.e. with the graph
+        if graph is not self._graph or graph.number_of_edges() != len(self._length):
+            self._build_routing_graph(graph)
+
+        # Sample the buffers
+        self._buffer_occupation[self._satellite_edges] = np.fromiter(
+            (port.byte_size for port in self._ports),
+            dtype=np.float64,
+            count=len(self._ports),
+        )
+
+    def _build_routing_graph(self, graph: nx.DiGraph) -> None:
+        # Edges in CSR order, one array per edge attribute
+        self._graph = graph
+        self._nodes = list(graph)
+        self._node_index = {node: i for i, node in enumerate(self._nodes)}
+        self._edge_index: Dict[Tuple[str, str], int] = dict()
+
+        indptr = np.zeros(len(self._nodes) + 1, dtype=np.int32)
+        indices, length, out_port = [], [], []
+        satellite_edges, self._ports, self._port_keys = [], [], []
+
+        for i, u in enumerate(self._nodes):
             u_data = graph.nodes[u]
-            if u_data["type"] != snsntwk.NodeTypes.LEO_SATELLITE:
+            ports = dict()
+
+            if u_data["type"] == snsnt.NodeTypes.LEO_SATELLITE:
+                for port, out_sat_or_gs in u_data["leo_satellite"].out_sat_or_gs.items():
+                    ports.setdefault(out_sat_or_gs, port)
+
+            for v, uv_data in graph.adj[u].items():
+                self._edge_index[u, v] = len(indices)
+
+                if v in ports:
+                    satellite_edges.append(len(indices))
+                    self._ports.append(u_data["leo_satellite"].out_ports[ports[v]])
+                    self._port_keys.append((u, ports[v]))
+
+                indices.append(self._node_index[v])
+                length.append(uv_data["length"])
+                out_port.append(ports.get(v, -1))
+
+            indptr[i + 1] = len(indices)
+
+        self._length = np.array(length, dtype=np.float64)
+        self._out_port = np.array(out_port, dtype=np.int64)
+        self._satellite_edges = np.array(satellite_edges, dtype=np.int64)
+        self._buffer_occupation = np.zeros(len(indices), dtype=np.float64)
+        self._weight = np.zeros(len(indices), dtype=np.float64)
+
+        self._csgraph = csr_array(
+            (np.zeros(len(indices)), np.array(indices, dtype=np.int32), indptr),
+            shape=(len(self._nodes), len(self._nodes)),
+        )
+
+        # Source of every edge and in-edges of every node, to repair the trees
+        self._edge_sources = np.repeat(
+            np.arange(len(self._nodes), dtype=np.int32), np.diff(indptr)
+        )
+        self._in_edges = np.argsort(self._csgraph.indices, kind="stable")
+        self._in_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(self._csgraph.indices, minlength=len(self._nodes))))
+        )
+        self._indptr_list = indptr.tolist()
+        self._indices_list = indices
+
+        self._distances: Dict[str, np.ndarray] = dict()
+        self._predecessors: Dict[str, np.ndarray] = dict()
+        self._sr_headers: Dict[Tuple[str, str], List[Tuple[int, str]]] = dict()
+        # Source -> destination -> path of the cached header
+        self._sr_header_paths: Dict[str, Dict[str, List[int]]] = dd(dict)
+
+    def _set_up_weights(self) -> None:
+        self._weight[:] = self._length
+
+    def _set_up_shortest_path_trees(self) -> None:
+        weights = np.where(np.isinf(self._weight), INFINITE_WEIGHT, self._weight)
+        changed = np.flatnonzero(weights != self._csgraph.data)
+
+        if len(changed) == 0:
+            return
+
+        old_weights = self._csgraph.data[changed]
+        np.copyto(self._csgraph.data, weights)
+
+        # Trees are computed on demand, from scratch if most of them would change
+        if len(changed) > REPAIR_MAX_CHANGED_EDGES * len(weights):
+            self._distances.clear()
+            self._predecessors.clear()
+            self._sr_headers.clear()
+            self._sr_header_paths.clear()
+            return
+
+        for src_gs, predecessors in self._predecessors.items():
+            old_predecessors = predecessors.copy()
+
+            if not self._repair_shortest_path_tree(
+                self._node_index[src_gs],
+                self._distances[src_gs],
+                predecessors,
+                changed,
+                old_weights,
+            ):
                 continue
-            for out_port, out_sat_or_gs in u_data[
-                "leo_satellite"
-            ].out_sat_or_gs.items():
-                if out_sat_or_gs == v:
-                    self._graph[u][v]["out_port"] = out_port
-                    self._graph[u][v]["buffer_occupation"] = (
-                        u_data["leo_satellite"].out_ports[out_port].byte_size
-                    )
-                    break
-
-    @classmethod
-    def instance(cls, env: simpy.Environment, graph: nx.DiGraph, update_freq: int):
-        # print('instance BaselineSourceRoutingHeaderBuilder')
-        if cls._instance is None:
-            cls._instance = super(BaselineSourceRoutingHeaderBuilder, cls).__new__(cls)
-        
-        if cls._last_update == None or (env.now - cls._last_update) > update_freq:
-            #print(f'BaselineSourceRoutingHeaderBuilder: {cls._last_update}')
-            cls._instance._copy_graph_structure(graph)
-            cls._instance._set_up_graph_copy_for_routing(graph)
-            cls._last_update = env.now
-
-        return cls._instance
+
+            # Headers whose path did not move are still valid
+            moved = predecessors != old_predecessors
+            sr_header_paths = self._sr_header_paths[src_gs]
+            for dst_gs, sp in list(sr_header_paths.items()):
+                if moved[sp].any():
+                    del self._sr_headers[src_gs, dst_gs]
+                    del sr_header_paths[dst_gs]
+
+    def update(
+        self, env: simpy.Environment, graph: nx.DiGraph, update_freq: int
+    ) -> Self:
+        """Routing update on graph, unless the last one is at most update_freq seconds old"""
+
+        if self._last_update is None or (env.now - self._last_update) > update_freq:
+            self._set_up_routing_graph(graph)
+            self._set_up_weights()
+            self._set_up_shortest_path_trees()
+            self._last_update = env.now
+
+        return self
 
 
 class NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder(
     BaselineSourceRoutingHeaderBuilder
 ):
-    def _set_up_graph_copy_for_routing(cls, graph: nx.DiGraph):
-        # print('NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder')
-        for u, v in graph.edges:
-            u_data = graph.nodes[u]
-            uv_data = cls._graph.edges[u, v]
-            buffer_factor = 0
-            if u_data["type"] == snsntwk.NodeTypes.LEO_SATELLITE:
-                try:
-                    buffer_factor = 1 / (
-                        1
-                        - (
-                            uv_data["buffer_occupation"]
-                            / snsnp.NetworkParameters.SATELLITE_QUEUE_SIZE
-                        )
-                    )
-                except:
-                    buffer_factor = math.inf
-            if abs(uv_data["length"] + buffer_factor) > (2**31 - 1):
-                uv_data["weight"] = math.inf
-            else:
-                uv_data["weight"] = uv_data["length"] + buffer_factor
+    def _set_up_weights(self) -> None:
+        # 1 / (1 - occupation) on the satellite edges, infinite on full buffers
+        buffer_factor = np.zeros_like(self._weight)
+
+        with np.errstate(divide="ignore"):
+            buffer_factor[self._satellite_edges] = 1 / (
+                1
+                - (
+                    self._buffer_occupation[self._satellite_edges]
+                    / snsnp.NetworkParameters.SATELLITE_QUEUE_SIZE
+                )
+            )
+
+        np.add(self._length, buffer_factor, out=self._weight)
+        self._weight[np.abs(self._weight) > (2**31 - 1)] = math.inf
 
 
 class ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder(
     NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder
 ):
-    _exponential_avg_buffer_occupation: Dict[Tuple[str, int], float] = dd(float)
+    def __init__(self) -> None:
+        super(
+            ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder, self
+        ).__init__()
 
-    def _set_up_graph_copy_for_routing(self, graph: nx.DiGraph):
-        # print('ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder')
-        for u, v in graph.edges:
-            u_data = graph.nodes[u]
+        self._exponential_avg_buffer_occupation: Dict[Tuple[str, int], float] = dd(
+            float
+        )
+        # Averages of the ports of the routing graph, aligned with _port_keys
+        self._port_keys: List[Tuple[str, int]] = []
+        self._avg_buffer_occupation = np.zeros(0)
+
+    def _build_routing_graph(self, graph: nx.DiGraph) -> None:
+        # Averages outlive the topology, as the ports of the satellites do
+        self._exponential_avg_buffer_occupation.update(
+            zip(self._port_keys, self._avg_buffer_occupation.tolist())
+        )
 
-            if u_data["type"] != snsntwk.NodeTypes.LEO_SATELLITE:
-                continue
+        super(
+            ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder, self
+        )._build_routing_graph(graph)
 
-            out_port = self._graph[u][v]["out_port"]
-            sampling_bo = self._graph[u][v]["buffer_occupation"]
-            estimated_bo = self._exponential_avg_buffer_occupation[u, out_port]
-            self._exponential_avg_buffer_occupation[u, out_port] = (
-                snsnp.NetworkParameters.ALPHA * sampling_bo
-                + (1 - snsnp.NetworkParameters.ALPHA) * estimated_bo
-            )
-            # print(f'{u}, {v} : {self._exponential_avg_buffer_occupation[u, out_port]}')
-            self._graph[u][v][
-                "buffer_occupation"
-            ] = self._exponential_avg_buffer_occupation[u, out_port]
+        self._avg_buffer_occupation = np.array(
+            [self._exponential_avg_buffer_occupation[key] for key in self._port_keys],
+            dtype=np.float64,
+        )
 
-        # print(json.dumps(dict((':'.join(str(k)), v) for k,v in self._exponential_avg_buffer_occupation.items()), indent=4))
+    def _set_up_weights(self) -> None:
+        self._avg_buffer_occupation *= 1 - snsnp.NetworkParameters.ALPHA
+        self._avg_buffer_occupation += (
+            snsnp.NetworkParameters.ALPHA
+            * self._buffer_occupation[self._satellite_edges]
+        )
+        self._buffer_occupation[self._satellite_edges] = self._avg_buffer_occupation
 
         super(
             ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder, self
-        )._set_up_graph_copy_for_routing(graph)
+        )._set_up_weights()
+
+
+def _node_disjoint_paths_task(
+    task: Tuple[List[str], List[Tuple[str, str]], List[Tuple[str, str]]]
+) -> List[List[List[str]]]:
+    """Node disjoint paths between pairs of satellites, on the graph of the ISLs
+
+    Args:
+        task (Tuple[List[str], List[Tuple[str, str]], List[Tuple[str, str]]]): satellites,
+            ISLs and pairs of satellites
+
+    Returns:
+        List[List[List[str]]]: node disjoint paths of every pair
+    """
+
+    satellites, isls, pairs = task
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(satellites)
+    graph.add_edges_from(isls)
+
+    auxiliary = build_auxiliary_node_connectivity(graph)
+    residual = build_residual_network(auxiliary, "capacity")
+
+    return [
+        list(
+            nx.node_disjoint_paths(
+                graph, s=s, t=t, auxiliary=auxiliary, residual=residual
+            )
+        )
+        for s, t in pairs
+    ]
 
 
 class KShortestNodeDisjointSourceRoutingHeaderBuilder(
     ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder
 ):
-    _all_couples_shortest_paths = dd(dict)
+    def __init__(self) -> None:
+        super(KShortestNodeDisjointSourceRoutingHeaderBuilder, self).__init__()
+
+        self._all_couples_shortest_paths: Dict[
+            str, Dict[str, List[List[str]]]
+        ] = dd(dict)
+        # Node disjoint paths between satellites, they only depend on the ISLs
+        self._isls = frozenset()
+        self._symmetric_isls = False
+        self._satellite_disjoint_paths: Dict[Tuple[str, str], List[List[str]]] = dict()
+        self._pool: ProcessPoolExecutor = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def get_sr_header(self, src_gs: str, dst_gs: str) -> List[Tuple[int, str]]:
-        s_time = time.time()
         sp_s = self._all_couples_shortest_paths[src_gs][dst_gs]
+        sr_headers = self._k_sr_headers.get((src_gs, dst_gs))
 
-        sp = None
+        if sr_headers is None:
+            sr_headers = [self._encode_sr_header(sp) for sp in sp_s]
+            self._k_sr_headers[src_gs, dst_gs] = sr_headers
 
-        if len(sp_s) == 1:
-            sp = sp_s[0]
-        else:
-            total_path_weights = sum(
-                [path_weight(self._graph, path, weight="weight") for path in sp_s]
-            )
+        if len(sr_headers) == 1:
+            return list(sr_headers[0])
+
+        # Weights of the paths only change with the routing updates
+        weights = self._path_choice_weights.get((src_gs, dst_gs))
+
+        if weights is None:
+            path_weights = [self._get_path_weight(path) for path in sp_s]
+            total_path_weights = sum(path_weights)
 
             weights = [
-                    1
-                    - (path_weight(self._graph, path, weight="weight") / total_path_weights)
-                    for path in sp_s
-                ]
+                1 - (path_weight / total_path_weights) for path_weight in path_weights
+            ]
+            self._path_choice_weights[src_gs, dst_gs] = weights
 
-            sp = random.choices(population=sp_s, weights=weights)[0]
-        
-        #print("--- Extracting shortest path from cache %s seconds ---" % (time.time() - s_time))
+        # Headers are consumed hop by hop
+        return list(random.choices(population=sr_headers, weights=weights)[0])
 
-        port_list = [
-            self._graph.edges[sp[i], sp[i + 1]]["out_port"]
-            for i in range(1, len(sp[1:]))
-        ][::-1]
-        satellite_gs_list = sp[1:][::-1]
+    def _build_routing_graph(self, graph: nx.DiGraph) -> None:
+        super(
+            KShortestNodeDisjointSourceRoutingHeaderBuilder, self
+        )._build_routing_graph(graph)
 
-        return [
-            (port, satellite_or_gs)
-            for port, satellite_or_gs in zip(port_list, satellite_gs_list)
-        ]
+        self._set_up_node_disjoint_paths(graph)
+        self._k_sr_headers: Dict[Tuple[str, str], List[List[Tuple[int, str]]]] = dict()
+
+    def _set_up_weights(self) -> None:
+        super(KShortestNodeDisjointSourceRoutingHeaderBuilder, self)._set_up_weights()
+
+        self._path_choice_weights: Dict[Tuple[str, str], List[float]] = dict()
 
-    @classmethod
-    def instance(cls, env: simpy.Environment, graph: nx.DiGraph, update_freq: int):
-        if cls._last_update == None or (env.now - cls._last_update) > update_freq:
-            super().instance(env, graph, update_freq)
-            cls._graph = cls._instance._graph
-            cls._last_update = cls._instance._last_update
+    def _set_up_node_disjoint_paths(self, graph: nx.DiGraph) -> None:
+        is_satellite = {
+            node: data["type"] == snsnt.NodeTypes.LEO_SATELLITE
+            for node, data in graph.nodes(data=True)
+        }
+        satellites = [node for node in graph if is_satellite[node]]
+        gss = [node for node in graph if not is_satellite[node]]
+        isls = [(u, v) for u, v in graph.edges if is_satellite[u] and is_satellite[v]]
 
-            s_time = time.time()
+        # Paths between satellites are reused until the ISLs change
+        if frozenset(isls) != self._isls:
+            self._isls = frozenset(isls)
+            self._symmetric_isls = all((v, u) in self._isls for u, v in self._isls)
+            self._satellite_disjoint_paths = dict()
 
-            auxiliary = build_auxiliary_node_connectivity(cls._graph)
-            residual = build_residual_network(auxiliary, "capacity")
+        paths = self._satellite_disjoint_paths
+        attachments = {gs: next(iter(graph[gs])) for gs in gss}
 
-            for src_gs, s_info in graph.nodes(data=True):
-                if s_info["type"] == snsntwk.NodeTypes.LEO_SATELLITE:
+        # Pairs of attachment satellites without paths yet, one direction only if the
+        # ISLs are symmetric
+        pairs: Dict[Tuple[str, str], None] = dict()
+
+        for src_gs in gss:
+            for dst_gs in gss:
+                s, t = attachments[src_gs], attachments[dst_gs]
+
+                if s == t or (s, t) in paths or (s, t) in pairs:
+                    continue
+                if self._symmetric_isls and ((t, s) in paths or (t, s) in pairs):
                     continue
-                for dst_gs, t_info in graph.nodes(data=True):
-                    if (
-                        t_info["type"] == snsntwk.NodeTypes.LEO_SATELLITE
-                        or src_gs == dst_gs
-                    ):
-                        continue
-
-                    src_sat = list(cls._graph[src_gs].keys())[0]
-                    dst_sat = list(cls._graph[dst_gs].keys())[0]
-
-                    if src_sat == dst_sat:
-                        cls._all_couples_shortest_paths[src_gs][dst_gs] = [
-                            [src_gs, src_sat, dst_gs]
-                        ]
-                    else:
-                        sp_s = list(
-                            nx.node_disjoint_paths(
-                                cls._graph,
-                                s=src_sat,
-                                t=dst_sat,
-                                auxiliary=auxiliary,
-                                residual=residual,
-                            )
-                        )
-
-                        cls._all_couples_shortest_paths[src_gs][dst_gs] = [
-                            [src_gs] + sp + [dst_gs] for sp in sp_s
-                        ]
-
-            #print(json.dumps(cls._all_couples_shortest_paths, indent=4))
-            print(
-                "--- All node disjoint paths cache took %s seconds ---" % (time.time() - s_time)
+
+                pairs[s, t] = None
+
+        for (s, t), sp_s in zip(
+            pairs, self._get_node_disjoint_paths(satellites, isls, list(pairs))
+        ):
+            paths[s, t] = sp_s
+
+            if self._symmetric_isls:
+                paths[t, s] = [sp[::-1] for sp in sp_s]
+
+        self._all_couples_shortest_paths = dd(dict)
+
+        for src_gs in gss:
+            for dst_gs in gss:
+                if src_gs == dst_gs:
+                    continue
+
+                s, t = attachments[src_gs], attachments[dst_gs]
+
+                self._all_couples_shortest_paths[src_gs][dst_gs] = (
+                    [[src_gs, s, dst_gs]]
+                    if s == t
+                    else [[src_gs] + sp + [dst_gs] for sp in paths[s, t]]
+                )
+
+    def _get_node_disjoint_paths(
+        self,
+        satellites: List[str],
+        isls: List[Tuple[str, str]],
+        pairs: List[Tuple[str, str]],
+    ) -> List[List[List[str]]]:
+        processes = snsnp.NetworkParameters.NODE_DISJOINT_PATHS_PROCESSES
+
+        if processes <= 1 or len(pairs) < 2 * processes:
+            return _node_disjoint_paths_task((satellites, isls, pairs))
+
+        if self._pool is None:
+            # Not forked, simulations may run in threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn")
             )
 
-            cls._last_update = env.now
+        # Interleaved, as the pairs of the same GS cost about the same
+        sp_s: List[List[List[str]]] = [None] * len(pairs)
+        tasks = [(satellites, isls, pairs[i::processes]) for i in range(processes)]
+
+        for i, result in enumerate(self._pool.map(_node_disjoint_paths_task, tasks)):
+            sp_s[i::processes] = result
 
-        return cls._instance
+        return sp_s
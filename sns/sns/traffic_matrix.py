@@ -0,0 +1,104 @@
+"""
+Dense traffic matrices of the traffic matrix generator service, mirrors
+gravity_model/matrix_stream.py of the traffic matrix generator
+"""
+
+from datetime import datetime, timezone
+import io
+import json
+import struct
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+import requests
+
+NPZ_MIMETYPE = "application/x-npz"
+
+STREAM_MAGIC = b"TMXS"
+STREAM_MIMETYPE = "application/x-traffic-matrix-stream"
+MATRIX = 0
+END = 1
+
+_HEADER = struct.Struct("<I")
+_RECORD = struct.Struct("<Bd")
+
+
+class TrafficMatrix:
+    def __init__(self, matrix: np.ndarray, cities: List[str]) -> None:
+        """
+        Args:
+            matrix (np.ndarray): n x n traffic, in bytes / second
+            cities (List[str]): names of the rows and columns of the matrix
+        """
+
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.cities = list(cities)
+        self.index: Dict[str, int] = {city: i for i, city in enumerate(self.cities)}
+
+    def get(self, src: str, dst: str) -> float:
+        return float(self.matrix[self.index[src], self.index[dst]])
+
+    @classmethod
+    def from_traffic_matrix_svc(cls, traffic_matrix_svc_url: str) -> "TrafficMatrix":
+        response = requests.get(url=traffic_matrix_svc_url)
+
+        if response.headers.get("Content-Type", "").startswith(NPZ_MIMETYPE):
+            with np.load(io.BytesIO(response.content), allow_pickle=False) as arrays:
+                return cls(arrays["matrix"], arrays["cities"].tolist())
+
+        return cls(response.json()["matrix"], response.json()["cities"])
+
+    @staticmethod
+    def iter_traffic_matrix_svc_range(
+        traffic_matrix_svc_range_url: str,
+    ) -> Iterator[Tuple[datetime, "TrafficMatrix"]]:
+        """
+        Traffic matrices of the range endpoint of the traffic matrix generator service,
+        yielded as soon as they are received
+        """
+
+        with requests.get(url=traffic_matrix_svc_range_url, stream=True) as response:
+            response.raise_for_status()
+            yield from iter_stream(response.iter_content(chunk_size=1 << 16))
+
+
+def iter_stream(chunks: Iterable[bytes]) -> Iterator[Tuple[datetime, TrafficMatrix]]:
+    """Decodes a traffic matrix stream while it is received, yielding every matrix as soon
+    as it is complete
+
+    Args:
+        chunks (Iterable[bytes]): the stream, in chunks of any size
+
+    Yields:
+        Iterator[Tuple[datetime, TrafficMatrix]]: time instant and traffic matrix
+    """
+
+    buffer = bytearray()
+    chunks = iter(chunks)
+
+    def read(size: int) -> bytes:
+        while len(buffer) < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Truncated traffic matrix stream")
+            buffer.extend(chunk)
+
+        data = bytes(buffer[:size])
+        del buffer[:size]
+
+        return data
+
+    if read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+        raise ValueError("Not a traffic matrix stream")
+
+    cities = json.loads(read(_HEADER.unpack(read(_HEADER.size))[0]))
+    n = len(cities)
+
+    while True:
+        kind, timestamp = _RECORD.unpack(read(_RECORD.size))
+
+        if kind == END:
+            return
+
+        yield datetime.fromtimestamp(timestamp, tz=timezone.utc), TrafficMatrix(
+            np.frombuffer(read(n * n * 8), dtype="<f8").reshape(n, n), cities
+        )
@@ -0,0 +1,146 @@
+from datetime import datetime
+import io
+from pathlib import Path
+import sys
+import networkx as nx
+import pytest
+import pytz
+import sns.binary_topology as snsbt
+
+# The readers are tested against the encoders of the topology builder service, skipped
+# where its requirements are not installed
+TOPOLOGY_BUILDER_DIR = Path(__file__).resolve().parents[2] / "topology_builder"
+sys.path.append(str(TOPOLOGY_BUILDER_DIR))
+pytest.importorskip("skyfield")
+
+from topology_builder.builder.min_distance_topology_builder import (  # noqa: E402
+    MinimumDistanceTopologyBuilder,
+)
+from topology_builder.propagation.propagator import (  # noqa: E402
+    ConstellationPropagator,
+)
+from topology_builder.repository.satellite_repository import (  # noqa: E402
+    STKLeoSatelliteRepository,
+)
+from topology_builder.topology.archive import TopologyArchiveWriter  # noqa: E402
+
+NODE_ATTRIBUTES = [
+    "type",
+    "latitude",
+    "longitude",
+    "height",
+    "plane",
+    "position_in_plane",
+    "shell",
+]
+
+
+@pytest.fixture(scope="module")
+def topologies():
+    repository = STKLeoSatelliteRepository(
+        TOPOLOGY_BUILDER_DIR / "constellations" / "Iridium_TLE.txt"
+    )
+
+    times, positions = ConstellationPropagator(
+        [info["skyfield_obj"] for _, info in repository.get_constellation()]
+    ).propagate_range(
+        start_time=datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+        end_time=datetime(year=2023, month=9, day=12, minute=10, tzinfo=pytz.UTC),
+        dt=60000,
+    )
+
+    return [
+        MinimumDistanceTopologyBuilder(verbose=False, name="Iridium", t=now)
+        .add_LEO_constellation(repository, positions=snapshot_positions)
+        .add_ISLs()
+        .add_GSs(
+            [
+                {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+                {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+            ]
+        )
+        .add_GSLs()
+        .build()
+        for now, snapshot_positions in zip(times, positions)
+    ]
+
+
+def _write_archive(topologies, keyframe_interval: int) -> bytes:
+    stream = io.BytesIO()
+
+    with TopologyArchiveWriter(stream, keyframe_interval=keyframe_interval) as archive:
+        for topology in topologies:
+            archive.write(topology)
+
+    return stream.getvalue()
+
+
+class TestBinaryTopology:
+    def _check_graph(self, graph: nx.DiGraph, topology, node_attributes: bool) -> None:
+        ntwk = topology.ntwk
+
+        assert list(graph.nodes) == list(ntwk.nodes)
+
+        if node_attributes:
+            for node, info in ntwk.nodes(data=True):
+                assert graph.nodes[node] == {
+                    attribute: info[attribute]
+                    for attribute in NODE_ATTRIBUTES
+                    if attribute in info
+                }
+
+        # Both directions of every link, with its length
+        assert {(u, v): length for u, v, length in graph.edges(data="length")} == {
+            edge: length
+            for u, v, length in ntwk.edges(data="length")
+            for edge in [(u, v), (v, u)]
+        }
+
+    def test_to_digraph(self, topologies):
+        for topology in topologies[:3]:
+            graph = snsbt.to_digraph(topology.to_bytes())
+
+            self._check_graph(graph, topology, node_attributes=True)
+
+            # Port numbering follows the adjacency order of the topology builder
+            for node in graph:
+                assert list(graph[node]) == list(topology.ntwk[node])
+
+    @pytest.mark.parametrize("chunk_size", [7, 4096, None])
+    def test_iter_archive(self, topologies, chunk_size):
+        archive = _write_archive(topologies, keyframe_interval=4)
+        chunk_size = chunk_size or len(archive)
+
+        snapshots = list(
+            snsbt.iter_archive(
+                archive[i : i + chunk_size] for i in range(0, len(archive), chunk_size)
+            )
+        )
+
+        assert len(snapshots) == len(topologies)
+
+        for (t, graph), topology in zip(snapshots, topologies):
+            assert t == topology.t.utc_datetime()
+            # Node attributes are those of the last keyframe
+            self._check_graph(graph, topology, node_attributes=False)
+
+    def test_iter_archive_keyframes(self, topologies):
+        archive = _write_archive(topologies[:3], keyframe_interval=1)
+
+        for (_, graph), topology in zip(snsbt.iter_archive([archive]), topologies):
+            expected = snsbt.to_digraph(topology.to_bytes())
+
+            self._check_graph(graph, topology, node_attributes=True)
+            assert list(graph.edges) == list(expected.edges)
+
+    def test_not_an_archive(self, topologies):
+        archive = _write_archive(topologies[:2], keyframe_interval=1)
+
+        with pytest.raises(ValueError):
+            list(snsbt.iter_archive([archive[: len(archive) // 2]]))
+
+        with pytest.raises(ValueError):
+            list(snsbt.iter_archive([topologies[0].to_bytes()]))
+
+        with pytest.raises(ValueError):
+            snsbt.to_digraph(archive)
@@ -0,0 +1,41 @@
+import networkx as nx
+import sns.network as snsntwk
+from sns.node_types import NodeTypes
+
+
+def _names(nodes) -> list:
+    return [node for node, _ in nodes]
+
+
+class TestNetwork:
+    def test_node_type_partitions(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(
+            [
+                ("Tokyo", {"type": NodeTypes.GROUD_STATION}),
+                ("Cairo", {"type": NodeTypes.GROUD_STATION}),
+                ("SAT-0", {"type": NodeTypes.LEO_SATELLITE}),
+                ("SAT-1", {"type": NodeTypes.LEO_SATELLITE}),
+            ]
+        )
+        ntwk = snsntwk.Network(graph)
+
+        assert _names(ntwk.get_GSs()) == ["Tokyo", "Cairo"]
+        assert _names(ntwk.get_leo_satellites()) == ["SAT-0", "SAT-1"]
+
+        # Node attributes are those of the graph
+        graph.nodes["Tokyo"]["packet_sink"] = "sink"
+        assert dict(ntwk.get_GSs())["Tokyo"]["packet_sink"] == "sink"
+
+        graph.add_node("Lima", type=NodeTypes.GROUD_STATION)
+        assert _names(ntwk.get_GSs()) == ["Tokyo", "Cairo", "Lima"]
+
+        graph.remove_node("SAT-1")
+        assert _names(ntwk.get_leo_satellites()) == ["SAT-0"]
+
+        # As many nodes removed as added
+        graph.remove_node("Cairo")
+        graph.add_node("SAT-2", type=NodeTypes.LEO_SATELLITE)
+
+        assert _names(ntwk.get_GSs()) == ["Tokyo", "Lima"]
+        assert _names(ntwk.get_leo_satellites()) == ["SAT-0", "SAT-2"]
@@ -1,8 +1,21 @@
 from datetime import datetime, timedelta
+import pytest
 import simpy
+import sns.leo_satellite as snsleo
+import sns.sns as snssns
+import sns.sr_header_builder as srhb
 from sns.sns import run_sns_simulation
 import pytz
 
+START_TIME = datetime(year=2023, month=9, day=12, hour=10, tzinfo=pytz.UTC)
+
+
+def _stream(items, closed: list, name: str):
+    try:
+        yield from items
+    finally:
+        closed.append(name)
+
 
 class TestSns:
 
@@ -16,4 +29,91 @@ class TestSns:
             start_time=datetime(year=2023, month=9, day=12, hour=10, minute=0, second=0, tzinfo=pytz.UTC),
             end_time=datetime(year=2023, month=9, day=12, hour=10, minute=10, second=0, tzinfo=pytz.UTC),
             snapshot_duration=timedelta(seconds=1)
-        )
\ No newline at end of file
+        )
+
+    @pytest.mark.parametrize(
+        "snapshot_times, traffic_matrix_times",
+        [
+            # Rounded differently by the two services
+            ([START_TIME], [START_TIME + timedelta(milliseconds=1)]),
+            # One stream shorter than the other
+            ([START_TIME], []),
+            ([], [START_TIME]),
+        ],
+    )
+    def test_streams_out_of_step(
+        self, monkeypatch, snapshot_times, traffic_matrix_times
+    ):
+        closed = []
+
+        monkeypatch.setattr(
+            snssns.Network,
+            "iter_topology_builder_svc_range",
+            lambda url: _stream(
+                [(t, None) for t in snapshot_times], closed, "snapshots"
+            ),
+        )
+        monkeypatch.setattr(
+            snssns.TrafficMatrix,
+            "iter_traffic_matrix_svc_range",
+            lambda url: _stream(
+                [(t, None) for t in traffic_matrix_times], closed, "traffic_matrices"
+            ),
+        )
+
+        with pytest.raises(ValueError):
+            run_sns_simulation(
+                env=simpy.Environment(),
+                topology_builder_svc_url="http://topology_builder",
+                traffic_matrix_svc_url="http://traffic_matrix_generator",
+                cities=["Rome", "Paris"],
+                start_time=START_TIME,
+                end_time=START_TIME,
+                snapshot_duration=timedelta(seconds=1),
+                forwarding_strategy=snsleo.ForwardingStrategy.PORT_FORWARDING,
+            )
+
+        # Both HTTP responses are released
+        assert sorted(closed) == ["snapshots", "traffic_matrices"]
+
+    def test_builder_is_closed_when_the_first_build_fails(self, monkeypatch):
+        closed = []
+        built_with = []
+
+        class SourceRoutingHeaderBuilder(srhb.BaselineSourceRoutingHeaderBuilder):
+            def close(self) -> None:
+                closed.append(self)
+
+        def from_graph(**kwargs):
+            built_with.append(kwargs["sr_header_builder"])
+            raise RuntimeError("Build failed")
+
+        monkeypatch.setattr(
+            snssns.Network,
+            "iter_topology_builder_svc_range",
+            lambda url: _stream([(START_TIME, None)], [], "snapshots"),
+        )
+        monkeypatch.setattr(
+            snssns.TrafficMatrix,
+            "iter_traffic_matrix_svc_range",
+            lambda url: _stream([(START_TIME, None)], [], "traffic_matrices"),
+        )
+        monkeypatch.setattr(snssns.Network, "from_graph", from_graph)
+
+        with pytest.raises(RuntimeError):
+            run_sns_simulation(
+                env=simpy.Environment(),
+                topology_builder_svc_url="http://topology_builder",
+                traffic_matrix_svc_url="http://traffic_matrix_generator",
+                cities=["Rome", "Paris"],
+                start_time=START_TIME,
+                end_time=START_TIME,
+                snapshot_duration=timedelta(seconds=1),
+                forwarding_strategy=snsleo.ForwardingStrategy.PORT_FORWARDING,
+                srhb_class=SourceRoutingHeaderBuilder,
+            )
+
+        # The builder of the simulation, although no network was built
+        assert len(built_with) == 1
+        assert closed == built_with
+
@@ -1,15 +1,130 @@
 from datetime import datetime, timedelta
 import json
+import math
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+import networkx as nx
+import numpy as np
+import pytest
 import requests
+from scipy.sparse.csgraph import dijkstra
 import simpy
 import yaml
 import sns.leo_satellite as snsleo
-import  sns.sr_header_builder as srhb
 import sns.network as snsntwk
+import sns.sr_header_builder as srhb
 import sns.network_parameters as ntwkparams
+import sns.traffic_matrix as snstm
 import pytz
 
 
+def _build_graph(
+    rng: np.random.Generator, size: int = 6, no_gss: int = 4
+) -> nx.DiGraph:
+    """size x size torus of satellites with random lengths and GSs attached to random
+    satellites, with the attributes the header builders read"""
+
+    graph = nx.DiGraph()
+
+    def add_link(u: str, v: str, length: float) -> None:
+        graph.add_edge(u, v, length=length)
+
+        if graph.nodes[u]["type"] == snsntwk.NodeTypes.LEO_SATELLITE:
+            leo_satellite = graph.nodes[u]["leo_satellite"]
+            port = len(leo_satellite.out_ports)
+            leo_satellite.out_sat_or_gs[port] = v
+            leo_satellite.out_ports[port] = SimpleNamespace(byte_size=0.0)
+
+    satellites = [f"sat_{i}_{j}" for i in range(size) for j in range(size)]
+
+    for satellite in satellites:
+        graph.add_node(
+            satellite,
+            type=snsntwk.NodeTypes.LEO_SATELLITE,
+            leo_satellite=SimpleNamespace(out_sat_or_gs=dict(), out_ports=dict()),
+        )
+
+    for i in range(size):
+        for j in range(size):
+            for k, l in [((i + 1) % size, j), (i, (j + 1) % size)]:
+                add_link(f"sat_{i}_{j}", f"sat_{k}_{l}", rng.uniform(1, 10))
+                add_link(f"sat_{k}_{l}", f"sat_{i}_{j}", rng.uniform(1, 10))
+
+    for gs, satellite in enumerate(rng.choice(satellites, size=no_gss, replace=False)):
+        graph.add_node(f"gs_{gs}", type=snsntwk.NodeTypes.GROUD_STATION)
+        length = rng.uniform(1, 10)
+        add_link(f"gs_{gs}", satellite, length)
+        add_link(satellite, f"gs_{gs}", length)
+
+    return graph
+
+
+def _get_ports(graph: nx.DiGraph) -> list:
+    return [
+        port
+        for _, info in graph.nodes(data=True)
+        if "leo_satellite" in info
+        for port in info["leo_satellite"].out_ports.values()
+    ]
+
+
+def _get_gss(graph: nx.DiGraph) -> list:
+    return [
+        node
+        for node, info in graph.nodes(data=True)
+        if info["type"] == snsntwk.NodeTypes.GROUD_STATION
+    ]
+
+
+def _get_out_port(graph: nx.DiGraph, u: str, v: str) -> int:
+    return next(
+        port
+        for port, out_sat_or_gs in graph.nodes[u]["leo_satellite"].out_sat_or_gs.items()
+        if out_sat_or_gs == v
+    )
+
+
+def _get_reference_sr_header(graph: nx.DiGraph, sp: List[str]) -> list:
+    """Header of a path, encoded edge by edge as the original builders did"""
+
+    port_list = [
+        _get_out_port(graph, sp[i], sp[i + 1]) for i in range(1, len(sp[1:]))
+    ][::-1]
+
+    return list(zip(port_list, sp[1:][::-1]))
+
+
+def _get_reference_weights(
+    graph: nx.DiGraph, buffer_occupation: Dict[Tuple[str, int], float]
+) -> Dict[Tuple[str, str], float]:
+    """Weights of the buffer-size builders, computed edge by edge as the original ones
+    did, from the buffer occupation of every (satellite, port)"""
+
+    weights = dict()
+
+    for u, v, length in graph.edges(data="length"):
+        buffer_factor = 0
+
+        if graph.nodes[u]["type"] == snsntwk.NodeTypes.LEO_SATELLITE:
+            try:
+                buffer_factor = 1 / (
+                    1
+                    - (
+                        buffer_occupation[u, _get_out_port(graph, u, v)]
+                        / ntwkparams.NetworkParameters.SATELLITE_QUEUE_SIZE
+                    )
+                )
+            except ZeroDivisionError:
+                buffer_factor = math.inf
+
+        if abs(length + buffer_factor) > (2**31 - 1):
+            weights[u, v] = math.inf
+        else:
+            weights[u, v] = length + buffer_factor
+
+    return weights
+
+
 class TestSRHeaderBuilder:
     def test_srhb(self):
         env = simpy.Environment()
@@ -39,9 +154,9 @@ class TestSRHeaderBuilder:
 
         old_ntwk = None
 
-        traffic_matrix = requests.get(
-            url=f"{traffic_matrix_svc_url}?total_volume_of_traffic={ntwkparams.NetworkParameters.TOTAL_VOLUME_OF_TRAFFIC}&cities={','.join(cities)}",
-        ).json()
+        traffic_matrix = snstm.TrafficMatrix.from_traffic_matrix_svc(
+            f"{traffic_matrix_svc_url}?total_volume_of_traffic={ntwkparams.NetworkParameters.TOTAL_VOLUME_OF_TRAFFIC}&cities={','.join(cities)}",
+        )
 
         while now <= end_time:
             print(f"\nRunning simulation at {now}")
@@ -62,13 +177,392 @@ class TestSRHeaderBuilder:
                     if src_gs == dst_gs:
                         continue
                     print(
-                        srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder.instance(
-                            ntwk.graph
-                        ).get_sr_header(
-                            src_gs, dst_gs
-                        )
+                        ntwk.sr_header_builder.update(
+                            env, ntwk.graph, 1
+                        ).get_sr_header(src_gs, dst_gs)
                     )
 
             old_ntwk = ntwk
 
             now += snapshot_duration
+
+    @pytest.mark.parametrize("max_affected_nodes", [0.0, 1.0])
+    def test_repaired_trees_match_dijkstra(self, monkeypatch, max_affected_nodes):
+        # 0 recomputes every affected tree from scratch, 1 always repairs it
+        monkeypatch.setattr(srhb, "REPAIR_MAX_AFFECTED_NODES", max_affected_nodes)
+
+        from_scratch = []
+
+        def counted_dijkstra(*args, **kwargs):
+            from_scratch.append(kwargs["indices"])
+            return dijkstra(*args, **kwargs)
+
+        monkeypatch.setattr(srhb, "dijkstra", counted_dijkstra)
+
+        rng = np.random.default_rng(0)
+        graph = _build_graph(rng)
+        ports = _get_ports(graph)
+        gss = _get_gss(graph)
+        queue_size = ntwkparams.NetworkParameters.SATELLITE_QUEUE_SIZE
+
+        builder = srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder()
+        env = SimpleNamespace(now=0)
+        builder.update(env, graph, 0)
+
+        kept = invalidated = recomputed = 0
+
+        for _ in range(40):
+            headers = {
+                (src, dst): builder.get_sr_header(src, dst)
+                for src in gss
+                for dst in gss
+                if src != dst
+            }
+
+            # Few buffers change, below REPAIR_MAX_CHANGED_EDGES
+            for port in rng.choice(ports, size=3, replace=False):
+                port.byte_size = rng.uniform(0, 0.9 * queue_size)
+
+            env.now += 1
+            from_scratch.clear()
+            builder.update(env, graph, 0)
+
+            recomputed += len(from_scratch)
+
+            # Repaired trees, i.e. every tree, as every GS is a source
+            assert len(builder._distances) == len(gss)
+            for src, distances in builder._distances.items():
+                expected = dijkstra(builder._csgraph, indices=builder._node_index[src])
+                assert np.allclose(distances, expected)
+
+            reference = srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder().update(
+                env, graph, 0
+            )
+
+            # Headers kept across the update are those of the new shortest paths
+            for (src, dst), sr_header in builder._sr_headers.items():
+                assert sr_header == reference.get_sr_header(src, dst)
+
+            kept += len(builder._sr_headers)
+            invalidated += len(headers) - len(builder._sr_headers)
+
+            for src, dst in headers:
+                assert builder.get_sr_header(src, dst) == reference.get_sr_header(
+                    src, dst
+                )
+
+        assert kept > 0 and invalidated > 0
+        assert (recomputed > 0) == (max_affected_nodes == 0.0)
+
+    def test_many_changes_reset_trees(self):
+        rng = np.random.default_rng(1)
+        graph = _build_graph(rng)
+        gss = _get_gss(graph)
+
+        builder = srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder()
+        env = SimpleNamespace(now=0)
+        builder.update(env, graph, 0)
+
+        for src in gss:
+            for dst in gss:
+                if src != dst:
+                    builder.get_sr_header(src, dst)
+
+        # Every buffer changes, above REPAIR_MAX_CHANGED_EDGES
+        for port in _get_ports(graph):
+            port.byte_size = rng.uniform(
+                0, 0.9 * ntwkparams.NetworkParameters.SATELLITE_QUEUE_SIZE
+            )
+
+        env.now += 1
+        builder.update(env, graph, 0)
+
+        assert builder._predecessors == dict()
+        assert builder._sr_headers == dict()
+
+        reference = srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder().update(
+            env, graph, 0
+        )
+
+        for src in gss:
+            for dst in gss:
+                if src != dst:
+                    assert builder.get_sr_header(src, dst) == reference.get_sr_header(
+                        src, dst
+                    )
+
+    def _check_node_disjoint_paths(self, graph: nx.DiGraph, builder) -> None:
+        gss = _get_gss(graph)
+        isl_graph = graph.subgraph(
+            node
+            for node, info in graph.nodes(data=True)
+            if info["type"] == snsntwk.NodeTypes.LEO_SATELLITE
+        )
+
+        for src in gss:
+            for dst in gss:
+                if src == dst:
+                    continue
+
+                sp_s = builder._all_couples_shortest_paths[src][dst]
+                s, t = next(iter(graph[src])), next(iter(graph[dst]))
+
+                # Paths of the graph, node disjoint and as many as possible
+                for sp in sp_s:
+                    assert sp[0] == src and sp[-1] == dst
+                    assert all(graph.has_edge(u, v) for u, v in zip(sp, sp[1:]))
+
+                inner_nodes = [node for sp in sp_s for node in sp[2:-2]]
+                assert len(inner_nodes) == len(set(inner_nodes))
+
+                if s != t:
+                    assert len(sp_s) == len(
+                        list(nx.node_disjoint_paths(isl_graph, s, t))
+                    )
+
+    @pytest.mark.parametrize("symmetric", [True, False])
+    def test_node_disjoint_paths(self, symmetric):
+        graph = _build_graph(np.random.default_rng(2), no_gss=6)
+
+        if not symmetric:
+            # One way ISLs between the first two columns of the torus
+            graph.remove_edges_from([(f"sat_{i}_0", f"sat_{i}_1") for i in range(6)])
+
+        builder = srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder()
+        builder.update(SimpleNamespace(now=0), graph, 0)
+
+        assert builder._symmetric_isls == symmetric
+        self._check_node_disjoint_paths(graph, builder)
+
+        # Only one direction is computed on symmetric ISLs
+        reversed_paths = [
+            sp_s == [sp[::-1] for sp in builder._satellite_disjoint_paths[t, s]]
+            for (s, t), sp_s in builder._satellite_disjoint_paths.items()
+        ]
+        assert all(reversed_paths) == symmetric
+
+    def test_node_disjoint_paths_are_reused(self, monkeypatch):
+        computed = []
+        node_disjoint_paths_task = srhb._node_disjoint_paths_task
+
+        def counted_task(task):
+            computed.extend(task[2])
+            return node_disjoint_paths_task(task)
+
+        monkeypatch.setattr(srhb, "_node_disjoint_paths_task", counted_task)
+
+        graph = _build_graph(np.random.default_rng(3), no_gss=4)
+        attachments = {gs: next(iter(graph[gs])) for gs in _get_gss(graph)}
+
+        builder = srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder()
+        env = SimpleNamespace(now=0)
+        builder.update(env, graph, 0)
+
+        # One direction of every pair of attachment satellites
+        assert len(computed) == 6
+
+        # Same ISLs, gs_0 moves to another satellite
+        moved = graph.copy()
+        satellite = next(
+            node
+            for node, info in graph.nodes(data=True)
+            if info["type"] == snsntwk.NodeTypes.LEO_SATELLITE
+            and node not in attachments.values()
+        )
+        moved.remove_edges_from(
+            [("gs_0", attachments["gs_0"]), (attachments["gs_0"], "gs_0")]
+        )
+        moved.add_edge("gs_0", satellite, length=1.0)
+        moved.add_edge(satellite, "gs_0", length=1.0)
+
+        computed.clear()
+        env.now += 1
+        builder.update(env, moved, 0)
+
+        # Only the pairs of the new attachment satellite are computed
+        assert len(computed) == 3
+        assert all(satellite in pair for pair in computed)
+        self._check_node_disjoint_paths(moved, builder)
+
+    def test_node_disjoint_paths_process_pool(self, monkeypatch):
+        graph = _build_graph(np.random.default_rng(4), no_gss=6)
+
+        builder = srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder()
+        builder.update(SimpleNamespace(now=0), graph, 0)
+
+        monkeypatch.setattr(
+            ntwkparams.NetworkParameters, "NODE_DISJOINT_PATHS_PROCESSES", 2
+        )
+
+        with srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder() as pooled:
+            pooled.update(SimpleNamespace(now=0), graph, 0)
+
+            assert pooled._pool is not None
+            assert (
+                pooled._all_couples_shortest_paths
+                == builder._all_couples_shortest_paths
+            )
+
+        assert pooled._pool is None
+
+    @pytest.mark.parametrize(
+        "srhb_class",
+        [
+            srhb.BaselineSourceRoutingHeaderBuilder,
+            srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
+            srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder,
+            srhb.KShortestNodeDisjointSourceRoutingHeaderBuilder,
+        ],
+    )
+    def test_builders_are_independent(self, monkeypatch, srhb_class):
+        # The most likely of the K shortest paths, not a random one
+        monkeypatch.setattr(
+            srhb.random,
+            "choices",
+            lambda population, weights: [population[int(np.argmax(weights))]],
+        )
+
+        def simulate(seed: int):
+            """Headers of a builder over routing updates of a random network"""
+
+            rng = np.random.default_rng(seed)
+            graph = _build_graph(rng)
+            gss = _get_gss(graph)
+            env = SimpleNamespace(now=0)
+
+            with srhb_class() as builder:
+                for _ in range(5):
+                    for port in _get_ports(graph):
+                        port.byte_size = rng.uniform(
+                            0, 0.9 * ntwkparams.NetworkParameters.SATELLITE_QUEUE_SIZE
+                        )
+
+                    builder.update(env, graph, 0)
+                    env.now += 1
+
+                    yield {
+                        (src, dst): builder.get_sr_header(src, dst)
+                        for src in gss
+                        for dst in gss
+                        if src != dst
+                    }
+
+        alone = list(simulate(5)), list(simulate(6))
+        assert alone[0] != alone[1]
+
+        # Both simulations in one process, their updates interleaved
+        side_by_side = list(zip(simulate(5), simulate(6)))
+
+        assert [headers for headers, _ in side_by_side] == alone[0]
+        assert [headers for _, headers in side_by_side] == alone[1]
+
+    def test_headers_match_networkx(self):
+        graph = _build_graph(np.random.default_rng(7), no_gss=5)
+        gss = _get_gss(graph)
+        pairs = [(src, dst) for src in gss for dst in gss if src != dst]
+
+        builder = srhb.BaselineSourceRoutingHeaderBuilder()
+        env = SimpleNamespace(now=0)
+
+        def check_headers(graph: nx.DiGraph) -> None:
+            builder.update(env, graph, 0)
+            env.now += 1
+
+            # Computed, then cached
+            for _ in range(2):
+                for src, dst in pairs:
+                    sp = nx.shortest_path(graph, src, dst, weight="length")
+                    assert builder.get_sr_header(src, dst) == _get_reference_sr_header(
+                        graph, sp
+                    )
+
+        check_headers(graph)
+
+        # The pair with the most ISLs on its path
+        src, dst = max(
+            pairs,
+            key=lambda pair: len(nx.shortest_path(graph, *pair, weight="length")),
+        )
+        sp = nx.shortest_path(graph, src, dst, weight="length")
+        sr_header = builder.get_sr_header(src, dst)
+
+        assert len(sp) > 3
+
+        # Next snapshot, an ISL of the path got longer
+        longer = graph.copy()
+        longer[sp[1]][sp[2]]["length"] = longer[sp[2]][sp[1]]["length"] = 100.0
+
+        check_headers(longer)
+        assert builder.get_sr_header(src, dst) != sr_header
+
+        # Next snapshot, the ISL is gone
+        removed = graph.copy()
+        removed.remove_edges_from([(sp[1], sp[2]), (sp[2], sp[1])])
+
+        check_headers(removed)
+        assert builder.get_sr_header(src, dst) != sr_header
+
+        # Back to the first snapshot
+        check_headers(graph)
+        assert builder.get_sr_header(src, dst) == sr_header
+
+    @pytest.mark.parametrize(
+        "srhb_class, smoothing",
+        [
+            (srhb.NoSmoothingOnBufferSizeSourceRoutingHeaderBuilder, False),
+            (srhb.ExponentialSmoothingOnBufferSizeSourceRoutingHeaderBuilder, True),
+        ],
+    )
+    def test_weights_match_per_edge_weights(self, srhb_class, smoothing):
+        rng = np.random.default_rng(8)
+        graph = _build_graph(rng)
+        queue_size = ntwkparams.NetworkParameters.SATELLITE_QUEUE_SIZE
+        alpha = ntwkparams.NetworkParameters.ALPHA
+
+        builder = srhb_class()
+        env = SimpleNamespace(now=0)
+        avg_buffer_occupation = dict()
+
+        for i in range(6):
+            # Next snapshot, averages outlive the topology
+            if i == 3:
+                graph = graph.copy()
+
+            buffer_occupation = dict()
+
+            for satellite, info in graph.nodes(data=True):
+                if "leo_satellite" not in info:
+                    continue
+
+                for port, out_port in info["leo_satellite"].out_ports.items():
+                    # Some full buffers, and some so close to full that the weight
+                    # goes over 2**31 - 1
+                    out_port.byte_size = rng.choice(
+                        [
+                            rng.uniform(0, queue_size),
+                            queue_size * (1 - 1e-12),
+                            queue_size,
+                        ],
+                        p=[0.8, 0.1, 0.1],
+                    ).item()
+                    buffer_occupation[satellite, port] = out_port.byte_size
+
+            if smoothing:
+                for key, byte_size in buffer_occupation.items():
+                    avg_buffer_occupation[key] = alpha * byte_size + (
+                        1 - alpha
+                    ) * avg_buffer_occupation.get(key, 0.0)
+                buffer_occupation = dict(avg_buffer_occupation)
+
+            builder.update(env, graph, 0)
+            env.now += 1
+
+            expected = _get_reference_weights(graph, buffer_occupation)
+
+            assert math.inf in expected.values() or smoothing
+            np.testing.assert_allclose(
+                [builder._weight[builder._edge_index[edge]] for edge in expected],
+                list(expected.values()),
+                rtol=1e-12,
+            )
+
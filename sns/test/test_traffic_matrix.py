@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+import numpy as np
+import pytest
+import pytz
+import sns.traffic_matrix as snstm
+
+# The reader is tested against the encoder of the traffic matrix generator service
+sys.path.append(str(Path(__file__).resolve().parents[2] / "traffic_matrix_generator"))
+
+import gravity_model.matrix_stream as mxs  # noqa: E402
+
+CITIES = ["Tokyo", "Cairo", "Lima"]
+
+
+def _encode_stream(matrices) -> bytes:
+    return b"".join(
+        [mxs.encode_header(CITIES)]
+        + [mxs.encode_matrix(t, traffic_matrix) for t, traffic_matrix in matrices]
+        + [mxs.encode_end()]
+    )
+
+
+@pytest.fixture
+def matrices():
+    rng = np.random.default_rng(0)
+    start_time = datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC)
+
+    return [
+        (start_time + timedelta(seconds=i), rng.uniform(0, 1e6, size=(3, 3)))
+        for i in range(4)
+    ]
+
+
+class TestTrafficMatrix:
+    @pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+    def test_iter_stream(self, matrices, chunk_size):
+        stream = _encode_stream(matrices)
+
+        decoded = list(
+            snstm.iter_stream(
+                stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)
+            )
+        )
+
+        assert len(decoded) == len(matrices)
+
+        for (t, traffic_matrix), (expected_t, expected) in zip(decoded, matrices):
+            assert t == expected_t
+            assert traffic_matrix.cities == CITIES
+            assert np.array_equal(traffic_matrix.matrix, expected)
+            assert traffic_matrix.get("Cairo", "Lima") == expected[1, 2]
+
+    def test_not_a_stream(self, matrices):
+        stream = _encode_stream(matrices)
+
+        # No END record
+        with pytest.raises(ValueError):
+            list(snstm.iter_stream([stream[: -len(mxs.encode_end())]]))
+
+        with pytest.raises(ValueError):
+            list(snstm.iter_stream([b"TOPA" + stream[4:]]))
+
+    def test_range_response_is_closed(self, monkeypatch, matrices):
+        stream = _encode_stream(matrices)
+        closed = []
+
+        class Response:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                closed.append(True)
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                yield stream
+
+        monkeypatch.setattr(snstm.requests, "get", lambda **kwargs: Response())
+
+        traffic_matrices = snstm.TrafficMatrix.iter_traffic_matrix_svc_range("url")
+        next(traffic_matrices)
+
+        # Simulations shorter than the range stop consuming it
+        traffic_matrices.close()
+
+        assert closed == [True]
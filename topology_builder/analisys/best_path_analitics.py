@@ -11,6 +11,7 @@ import os
 from mdutils.mdutils import MdUtils
 
 sys.path.append(os.path.abspath("../topology_builder"))
+from topology_builder.propagation.propagator import ConstellationPropagator
 from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
 from topology_builder.builder.min_distance_topology_builder import (
     MinimumDistanceTopologyBuilder,
@@ -52,12 +53,19 @@ def collect_sp_analitics(
         gs_s,
     ) = fetch_simulation_parameters("./config.yaml")
 
+    repository = STKLeoSatelliteRepository(Path(constellation_file))
+
+    # Propagate the constellation over the whole time grid at once
+    times, positions = ConstellationPropagator(
+        [info["skyfield_obj"] for _, info in repository.get_constellation()]
+    ).propagate_range(start_time, end_time, dt)
+
     now = start_time
     shortest_path_analitics = dict()
 
     current_topology = (
         MinimumDistanceTopologyBuilder(verbose=False, name=name, t=now)
-        .add_LEO_constellation(STKLeoSatelliteRepository(Path(constellation_file)))
+        .add_LEO_constellation(repository, positions=positions[0])
         .add_ISLs()
         .add_GSs(gs_s)
         .add_GSLs()
@@ -66,7 +74,7 @@ def collect_sp_analitics(
 
     now += datetime.timedelta(milliseconds=dt)
 
-    while now <= end_time:
+    for now, snapshot_positions in zip(times[1:], positions[1:]):
         previous_topology = current_topology
 
         print(f"Building topology at {now}")
@@ -76,9 +84,7 @@ def collect_sp_analitics(
                 builder_cls(
                     verbose=False, name=name, t=now, previous_topology=previous_topology
                 )
-                .add_LEO_constellation(
-                    STKLeoSatelliteRepository(Path(constellation_file))
-                )
+                .add_LEO_constellation(repository, positions=snapshot_positions)
                 .add_ISLs()
                 .add_GSs(gs_s)
                 .add_GSLs()
@@ -87,9 +93,7 @@ def collect_sp_analitics(
         else:
             current_topology = (
                 builder_cls(verbose=False, name=name, t=now)
-                .add_LEO_constellation(
-                    STKLeoSatelliteRepository(Path(constellation_file))
-                )
+                .add_LEO_constellation(repository, positions=snapshot_positions)
                 .add_ISLs()
                 .add_GSs(gs_s)
                 .add_GSLs()
@@ -125,8 +129,6 @@ def collect_sp_analitics(
 
             # print(json.dumps(shortest_path_analitics, indent=4))
 
-        now = now + datetime.timedelta(milliseconds=dt)
-
     return shortest_path_analitics
 
 
@@ -12,6 +12,7 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
 sys.path.append(os.path.abspath("../topology_builder"))
+from topology_builder.propagation.propagator import ConstellationPropagator
 from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
 from topology_builder.builder.min_distance_topology_builder import (
     MinimumDistanceTopologyBuilder,
@@ -52,11 +53,18 @@ def collect_sp_analitics(
         gs_s,
     ) = fetch_simulation_parameters("./config.yaml")
 
+    repository = STKLeoSatelliteRepository(Path(constellation_file))
+
+    # Propagate the constellation over the whole time grid at once
+    times, positions = ConstellationPropagator(
+        [info["skyfield_obj"] for _, info in repository.get_constellation()]
+    ).propagate_range(start_time, end_time, dt)
+
     now = start_time
 
     current_topology = (
         MinimumDistanceTopologyBuilder(verbose=False, name=name, t=now)
-        .add_LEO_constellation(STKLeoSatelliteRepository(Path(constellation_file)))
+        .add_LEO_constellation(repository, positions=positions[0])
         .add_ISLs()
         .add_GSs(gs_s)
         .add_GSLs()
@@ -76,7 +84,7 @@ def collect_sp_analitics(
         (now - start_time).seconds: 0
     }
 
-    while now <= end_time:
+    for now, snapshot_positions in zip(times[1:], positions[1:]):
         previous_topology = current_topology
 
         print(f"Building topology at {now}")
@@ -86,9 +94,7 @@ def collect_sp_analitics(
                 builder_cls(
                     verbose=False, name=name, t=now, previous_topology=previous_topology
                 )
-                .add_LEO_constellation(
-                    STKLeoSatelliteRepository(Path(constellation_file))
-                )
+                .add_LEO_constellation(repository, positions=snapshot_positions)
                 .add_ISLs()
                 .add_GSs(gs_s)
                 .add_GSLs()
@@ -97,9 +103,7 @@ def collect_sp_analitics(
         else:
             current_topology = (
                 builder_cls(verbose=False, name=name, t=now)
-                .add_LEO_constellation(
-                    STKLeoSatelliteRepository(Path(constellation_file))
-                )
+                .add_LEO_constellation(repository, positions=snapshot_positions)
                 .add_ISLs()
                 .add_GSs(gs_s)
                 .add_GSLs()
@@ -117,8 +121,6 @@ def collect_sp_analitics(
         
         link_changes[(now - start_time).seconds] = len(list(current_topology.get_diff_graph(previous_topology).edges))
 
-        now = now + datetime.timedelta(milliseconds=dt)
-
     return topology_stability_analitics, average_link_length, link_changes
 
 
@@ -36,6 +36,27 @@ class TestAddConstellation:
 
         assert len(topology.get_leo_satellites()) == 66
 
+    def test_add_constellation_plane_index(self):
+        topology: Topology = (
+            MinimumDistanceTopologyBuilder(
+                verbose=True,
+                name="Iridium",
+                t=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            )
+            .add_LEO_constellation(
+                STKLeoSatelliteRepository(Path("../constellations/Iridium_TLE.txt"))
+            )
+            .build()
+        )
+
+        for plane in range(topology.no_planes):
+            assert len(topology.get_plane_satellites(plane)) == 6
+
+        for sat in topology.get_leo_satellites():
+            assert sat == topology.get_satellite_at(
+                topology.get_sat_plane(sat), topology.get_position_in_plane(sat)
+            )
+
     """
     def test_los_topology_builder(self):
         gs_s = [
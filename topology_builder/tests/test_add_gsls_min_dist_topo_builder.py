@@ -65,3 +65,32 @@ class TestAddGSLs:
         print(topology.get_GSLs())
 
         assert len(topology.get_GSLs()) == 2
+
+    def test_add_GSLs_above_horizon(self):
+        gs_s = [
+            {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+            {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+            {"name": "Cape Town", "lat": -33.92, "lon": 18.42},
+        ]
+
+        builder = (
+            MinimumDistanceTopologyBuilder(
+                verbose=True,
+                name="Iridium",
+                t=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            )
+            .add_LEO_constellation(
+                STKLeoSatelliteRepository(Path("../constellations/Iridium_TLE.txt"))
+            )
+            .add_GSs(gs_s)
+            .add_GSLs()
+        )
+
+        for gs in builder.build().get_GSs():
+            sat = next(iter(builder.topology.ntwk.adj[gs]))
+            assert builder._get_elevation(gs, sat) > 0
+            assert min(
+                builder.topology.get_distance(gs, candidate)
+                for candidate in builder.satellites
+                if builder._get_elevation(gs, candidate) > 0
+            ) == pytest.approx(builder.topology.ntwk[gs][sat]["length"])
@@ -1,7 +1,12 @@
 from pathlib import Path
 import datetime, pytz
 import pytest
-from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.isl_policies import ISLPolicies
+from topology_builder.repository.satellite_repository import (
+    MultiShellLeoSatelliteRepository,
+    STKLeoSatelliteRepository,
+    WalkerLeoSatelliteRepository,
+)
 from topology_builder.topology.topology import Topology
 from topology_builder.builder.min_distance_topology_builder import (
     MinimumDistanceTopologyBuilder,
@@ -29,6 +34,8 @@ class TestAddISLs:
             assert len(list(topology.ntwk.adj[sat])) == 4
 
         assert topology.get_ISLs() != 0
+        assert len(topology.get_ISLs()) == topology.ntwk.number_of_edges() == 132
+        assert len(topology.get_GSLs()) == 0
 
     def test_add_isls_no_sat(self):
         with pytest.raises(Exception):
@@ -41,3 +48,56 @@ class TestAddISLs:
                 .add_ISLs()
                 .build()
             )
+
+    def test_add_isls_multi_shell(self):
+        topology: Topology = (
+            MinimumDistanceTopologyBuilder(
+                verbose=False,
+                name="Multi shell",
+                t=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            )
+            .add_LEO_constellation(
+                MultiShellLeoSatelliteRepository(
+                    [
+                        WalkerLeoSatelliteRepository(
+                            no_planes=12,
+                            no_sat_per_plane=8,
+                            inclination=53,
+                            altitude=550,
+                            phasing=1,
+                            name="Low",
+                        ),
+                        WalkerLeoSatelliteRepository(
+                            no_planes=4,
+                            no_sat_per_plane=6,
+                            inclination=70,
+                            altitude=1100,
+                            name="High",
+                        ),
+                    ]
+                )
+            )
+            .set_ISL_policy(1, ISLPolicies.INTRA_PLANE)
+            .add_ISLs()
+            .build()
+        )
+
+        assert topology.get_shell_planes(0) == list(range(12))
+        assert topology.get_shell_planes(1) == list(range(12, 16))
+        assert topology.get_next_plane(11) == 0
+        assert topology.get_next_plane(15) == 12
+
+        for u, v in topology.get_ISLs():
+            shell = topology.get_sat_shell(u)
+
+            # No link between shells
+            assert topology.get_sat_shell(v) == shell
+
+            if shell == 1:
+                assert topology.get_sat_plane(u) == topology.get_sat_plane(v)
+
+        for sat in topology.get_leo_satellites():
+            if topology.get_sat_shell(sat) == 1:
+                assert len(topology.ntwk.adj[sat]) == 2
+            else:
+                assert len(topology.ntwk.adj[sat]) >= 3
@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import httpx
+import pytest
+from topology_builder.topology.snapshot_cache import SnapshotCache
+
+
+class TestAsgiSvc:
+    URL = "/topology_builder/min_dist_topo_builder/walker"
+    PARAMS = {
+        "t": "2023-09-12 10:00:00 +0000",
+        "cities": "Rome,Paris",
+        "walker": "53:24/4/1",
+        "format": "binary",
+    }
+
+    @pytest.fixture
+    def svc(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshots.sqlite"))
+
+        from topology_builder import asgi_svc, builds
+
+        built = []
+        lock = threading.Lock()
+
+        def build_snapshot(topo_name, t, gs_s, walker, altitude, binary, positions=None):
+            names = [gs["name"] for gs in gs_s]
+            with lock:
+                built.append(names)
+
+            # Long enough for the concurrent requests to find the build in flight
+            time.sleep(0.2)
+
+            return ",".join(names).encode(), "application/x-topology"
+
+        def get_ground_stations(cities):
+            return [
+                {"name": city, "lat": 0.0, "lon": float(i)}
+                for i, city in enumerate(cities)
+            ]
+
+        monkeypatch.setattr(builds, "build_snapshot", build_snapshot)
+        monkeypatch.setattr(builds, "get_ground_stations", get_ground_stations)
+        monkeypatch.setattr(
+            asgi_svc, "SNAPSHOT_CACHE", SnapshotCache(tmp_path / "snapshots.sqlite")
+        )
+
+        # Threads instead of processes, so that the fake build is used
+        with ThreadPoolExecutor(4) as pool:
+            monkeypatch.setattr(asgi_svc, "pool", pool)
+            yield asgi_svc, built
+
+    def _get(self, app, params, url=URL):
+        async def get_all():
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                return await asyncio.gather(*[client.get(url, params=p) for p in params])
+
+        return asyncio.run(get_all())
+
+    def test_concurrent_requests_are_coalesced(self, svc):
+        asgi_svc, built = svc
+
+        other = {**self.PARAMS, "cities": "Rome,Tokyo"}
+        responses = self._get(asgi_svc.app, [self.PARAMS] * 5 + [other] * 2)
+
+        assert all(response.status_code == 200 for response in responses)
+
+        # One build per set of GSs
+        assert sorted(built) == [["Rome", "Paris"], ["Rome", "Tokyo"]]
+        assert {response.content for response in responses[:5]} == {b"Rome,Paris"}
+        assert {response.content for response in responses[5:]} == {b"Rome,Tokyo"}
+
+    def test_built_snapshots_are_cached(self, svc):
+        asgi_svc, built = svc
+
+        self._get(asgi_svc.app, [self.PARAMS])
+
+        # The cache is filled out of the event loop
+        for _ in range(50):
+            if len(asgi_svc.SNAPSHOT_CACHE) == 1:
+                break
+            time.sleep(0.01)
+
+        (response,) = self._get(asgi_svc.app, [self.PARAMS])
+
+        assert response.content == b"Rome,Paris"
+        assert len(built) == 1
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"dt": "0"},
+            {"dt": "-1000"},
+            {"keyframe_interval": "0"},
+            {"end": "2023-09-12 09:59:00 +0000"},
+        ],
+    )
+    def test_invalid_range(self, svc, params):
+        asgi_svc, built = svc
+
+        range_params = {
+            "start": "2023-09-12 10:00:00 +0000",
+            "end": "2023-09-12 10:01:00 +0000",
+            "dt": "1000",
+            "cities": "Rome,Paris",
+            "walker": "53:96/12/1",
+        }
+
+        (response,) = self._get(
+            asgi_svc.app, [{**range_params, **params}], url=f"{self.URL}/range"
+        )
+
+        assert response.status_code == 400
+        assert built == []
+
@@ -0,0 +1,60 @@
+import datetime
+from pathlib import Path
+import numpy as np
+import pytz
+from topology_builder.builder.min_distance_topology_builder import (
+    MinimumDistanceTopologyBuilder,
+)
+from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.topology import binary_format
+from topology_builder.topology.topology import Topology
+
+
+class TestBinaryFormat:
+    def test_round_trip(self):
+        gs_s = [
+            {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+            {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+        ]
+
+        topology: Topology = (
+            MinimumDistanceTopologyBuilder(
+                verbose=False,
+                name="Iridium",
+                t=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            )
+            .add_LEO_constellation(
+                STKLeoSatelliteRepository(Path("../constellations/Iridium_TLE.txt"))
+            )
+            .add_ISLs()
+            .add_GSs(gs_s)
+            .add_GSLs()
+            .build()
+        )
+
+        header, arrays = binary_format.decode(topology.to_bytes())
+
+        assert header["name"] == "Iridium"
+        assert header["no_planes"] == topology.no_planes
+        assert header["nodes"] == list(topology.ntwk.nodes)
+
+        for name, array in arrays.items():
+            assert header["arrays"][name]["offset"] % 8 == 0
+            assert not array.flags.writeable
+
+        nodes = header["nodes"]
+
+        assert len(arrays["indices"]) == 2 * topology.ntwk.number_of_edges()
+
+        for i, node in enumerate(nodes):
+            neighbours = arrays["indices"][arrays["indptr"][i] : arrays["indptr"][i + 1]]
+            lengths = arrays["length"][arrays["indptr"][i] : arrays["indptr"][i + 1]]
+
+            assert [nodes[j] for j in neighbours] == list(topology.ntwk.adj[node])
+            assert np.allclose(
+                lengths,
+                [topology.ntwk[node][nodes[j]]["length"] for j in neighbours],
+            )
+
+        assert (arrays["plane"] >= 0).sum() == 66
+        assert binary_format.NODE_TYPES[arrays["node_type"][-1]] == "GROUD_STATION"
@@ -0,0 +1,58 @@
+import yaml
+from typer.testing import CliRunner
+from topology_builder import cli
+from topology_builder.repository.satellite_repository import (
+    WalkerLeoSatelliteRepository,
+)
+
+
+class TestCli:
+    def _build_dynamic_topology(self, tmp_path, workers: int) -> bytes:
+        output_file = tmp_path / f"topology_{workers}.bin"
+        config_file = tmp_path / f"config_{workers}.yaml"
+
+        with open(config_file, "w") as file:
+            yaml.dump(
+                {
+                    "name": "Walker",
+                    "constellation_file": "walker",
+                    "start_time": "2023-09-12 10:00:00 +0000",
+                    "end_time": "2023-09-12 10:10:00 +0000",
+                    "dt": 30000,
+                    "keyframe_interval": 4,
+                    "ground_stations": [
+                        {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+                        {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+                        {"name": "Lima", "lat": -12.06, "lon": -77.04},
+                    ],
+                    "output_file": str(output_file),
+                },
+                file,
+            )
+
+        result = CliRunner().invoke(
+            cli.app,
+            [
+                "build-dynamic-topology",
+                "--config-file",
+                str(config_file),
+                "--workers",
+                str(workers),
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+
+        return output_file.read_bytes()
+
+    def test_workers(self, tmp_path, monkeypatch):
+        # 53:96/12/1 at 550 km, built once in the parent and handed to the workers
+        repository = WalkerLeoSatelliteRepository(
+            no_planes=12, no_sat_per_plane=8, inclination=53, altitude=550, phasing=1
+        )
+        monkeypatch.setattr(cli, "STKLeoSatelliteRepository", lambda file: repository)
+
+        serial = self._build_dynamic_topology(tmp_path, workers=1)
+
+        # Snapshots are built out of order by the pool but written in order
+        assert self._build_dynamic_topology(tmp_path, workers=2) == serial
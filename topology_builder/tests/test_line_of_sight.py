@@ -0,0 +1,46 @@
+import numpy as np
+from topology_builder.propagation.line_of_sight import (
+    distance,
+    distance_matrix,
+    los,
+    los_matrix,
+)
+
+
+class TestLineOfSight:
+    positions = np.array(
+        [
+            [7000.0, 0.0, 0.0],
+            [6900.0, 1000.0, 0.0],
+            [-7000.0, 0.0, 0.0],
+        ]
+    )
+
+    def test_distance_matrix(self):
+        distances = distance_matrix(self.positions)
+
+        assert distances.shape == (3, 3)
+        assert np.allclose(distances, distances.T)
+        assert np.allclose(np.diag(distances), 0)
+        assert np.isclose(distances[0, 2], 14000.0)
+        assert np.isclose(
+            distances[0, 1], np.linalg.norm(self.positions[0] - self.positions[1])
+        )
+
+    def test_los_matrix(self):
+        los = los_matrix(self.positions)
+
+        assert los.shape == (3, 3)
+        assert (los == los.T).all()
+        assert not np.diag(los).any()
+        assert los[0, 1]
+        assert not los[0, 2]
+
+    def test_pairwise_matches_matrices(self):
+        assert np.allclose(
+            distance(self.positions[:, None, :], self.positions[None, :, :]),
+            distance_matrix(self.positions),
+        )
+        assert (
+            los(self.positions[0], self.positions) == los_matrix(self.positions)[0]
+        ).all()
@@ -0,0 +1,114 @@
+from pathlib import Path
+import datetime
+import numpy as np
+import pytest
+import pytz
+from skyfield.api import load
+from topology_builder.propagation.propagator import ConstellationPropagator
+from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+
+
+class TestConstellationPropagator:
+    def test_propagate_matches_skyfield(self):
+        satellites = [
+            info["skyfield_obj"]
+            for _, info in STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_constellation()
+        ]
+
+        t = load.timescale().from_datetime(
+            datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC)
+        )
+
+        positions = ConstellationPropagator(satellites).propagate(t)
+
+        assert positions.shape == (66, 3)
+        assert np.allclose(
+            positions, np.array([sat.at(t).position.km for sat in satellites])
+        )
+
+    def test_propagate_range(self):
+        satellites = [
+            info["skyfield_obj"]
+            for _, info in STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_constellation()
+        ]
+
+        propagator = ConstellationPropagator(satellites)
+
+        times, positions = propagator.propagate_range(
+            start_time=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            end_time=datetime.datetime(
+                year=2023, month=9, day=12, minute=1, tzinfo=pytz.UTC
+            ),
+            dt=10000,
+        )
+
+        assert len(times) == 7
+        assert positions.shape == (7, 66, 3)
+
+        ts = load.timescale()
+
+        for now, snapshot_positions in zip(times, positions):
+            assert np.allclose(
+                snapshot_positions, propagator.propagate(ts.from_datetime(now))
+            )
+
+    def test_iter_propagate_range(self):
+        satellites = [
+            info["skyfield_obj"]
+            for _, info in STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_constellation()
+        ]
+
+        propagator = ConstellationPropagator(satellites)
+        grid = dict(
+            start_time=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            end_time=datetime.datetime(
+                year=2023, month=9, day=12, minute=1, tzinfo=pytz.UTC
+            ),
+            dt=10000,
+        )
+
+        times, positions = propagator.propagate_range(**grid)
+        chunks = list(propagator.iter_propagate_range(**grid, chunk_size=3))
+
+        assert [len(chunk_times) for chunk_times, _ in chunks] == [3, 3, 1]
+        assert [now for chunk_times, _ in chunks for now in chunk_times] == times
+        assert np.allclose(
+            np.concatenate([chunk_positions for _, chunk_positions in chunks]), positions
+        )
+
+    @pytest.mark.parametrize(
+        "end_minute, dt",
+        [(1, 0), (1, -10000), (0, 10000)],
+    )
+    def test_invalid_range(self, end_minute, dt):
+        satellites = [
+            info["skyfield_obj"]
+            for _, info in STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_constellation()
+        ]
+
+        propagator = ConstellationPropagator(satellites)
+        grid = dict(
+            start_time=datetime.datetime(
+                year=2023, month=9, day=12, minute=1, tzinfo=pytz.UTC
+            ),
+            end_time=datetime.datetime(
+                year=2023, month=9, day=12, minute=end_minute, tzinfo=pytz.UTC
+            ),
+            dt=dt,
+        )
+
+        with pytest.raises(ValueError):
+            propagator.propagate_range(**grid)
+
+        # On the call, before any chunk is requested
+        with pytest.raises(ValueError):
+            propagator.iter_propagate_range(**grid)
+
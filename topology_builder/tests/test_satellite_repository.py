@@ -1,6 +1,14 @@
+import os
+import re
+import numpy as np
 from pathlib import Path
 import pytest
-from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.repository.satellite_repository import (
+    ElementSetLeoSatelliteRepository,
+    MultiShellLeoSatelliteRepository,
+    STKLeoSatelliteRepository,
+    WalkerLeoSatelliteRepository,
+)
 
 
 class TestSatelliteRepository:
@@ -19,3 +27,200 @@ class TestSatelliteRepository:
     def test_stk_repo_invalid_path(self):
         with pytest.raises(Exception):
             STKLeoSatelliteRepository(Path("invalid/path/file.tle")).get_constellation()
+
+    def test_stk_repo_cache(self, tmp_path):
+        file = tmp_path / "Iridium_TLE.txt"
+        file.write_bytes(Path("../constellations/Iridium_TLE.txt").read_bytes())
+
+        satellites = STKLeoSatelliteRepository(file).get_constellation()
+        cached = STKLeoSatelliteRepository(file).get_constellation()
+
+        assert [info["skyfield_obj"] for _, info in satellites] == [
+            info["skyfield_obj"] for _, info in cached
+        ]
+
+        # Modifying the file invalidates the cache
+        os.utime(file, ns=(0, 0))
+
+        reloaded = STKLeoSatelliteRepository(file).get_constellation()
+
+        assert reloaded[0][1]["skyfield_obj"] is not satellites[0][1]["skyfield_obj"]
+
+    def _write_3le(self, file: Path) -> None:
+        lines = [
+            line.strip()
+            for line in Path("../constellations/Iridium_TLE.txt").read_text().splitlines()
+            if line.startswith("1 ") or line.startswith("2 ")
+        ]
+
+        names = [name for name, _ in STKLeoSatelliteRepository(
+            Path("../constellations/Iridium_TLE.txt")
+        ).get_constellation()]
+
+        file.write_text(
+            "\n".join(
+                f"0 {name}\n{line_1}\n{line_2}"
+                for name, line_1, line_2 in zip(names, lines[::2], lines[1::2])
+            )
+        )
+
+    def test_element_set_repo_infers_planes(self, tmp_path):
+        file = tmp_path / "iridium.tle"
+        self._write_3le(file)
+
+        satellites = ElementSetLeoSatelliteRepository(file).get_constellation()
+        stk = dict(
+            STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_constellation()
+        )
+
+        assert len(satellites) == 66
+
+        planes = {}
+        for name, info in satellites:
+            planes.setdefault(info["plane"], set()).add(name)
+
+        # Same planes as the STK export, up to their numbering
+        assert len(planes) == 11
+        assert all(
+            len({stk[name]["plane"] for name in plane}) == 1 for plane in planes.values()
+        )
+
+        # Consecutive positions are consecutive in the STK export too
+        for name, info in satellites:
+            following = [
+                other
+                for other, other_info in satellites
+                if other_info["plane"] == info["plane"]
+                and other_info["position_in_plane"] == (info["position_in_plane"] + 1) % 6
+            ][0]
+
+            assert (
+                stk[following]["position_in_plane"] - stk[name]["position_in_plane"]
+            ) % 6 in (1, 5)
+
+    def test_element_set_repo_truncated_tle(self, tmp_path):
+        file = tmp_path / "iridium.tle"
+        self._write_3le(file)
+        lines = file.read_text().splitlines()
+
+        # Second line of the last record missing
+        file.write_text("\n".join(lines[:-1]))
+
+        with pytest.raises(ValueError, match=re.escape(lines[-3][2:])):
+            ElementSetLeoSatelliteRepository(file).get_constellation()
+
+        # Second line of a record followed by the next record
+        file.write_text("\n".join(lines[:2] + lines[3:]))
+
+        with pytest.raises(ValueError, match=re.escape(lines[0][2:])):
+            ElementSetLeoSatelliteRepository(file).get_constellation()
+
+    def test_element_set_repo_omm_csv(self, tmp_path):
+        file = tmp_path / "iss.csv"
+        file.write_text(
+            "OBJECT_NAME,OBJECT_ID,EPOCH,MEAN_MOTION,ECCENTRICITY,INCLINATION,"
+            "RA_OF_ASC_NODE,ARG_OF_PERICENTER,MEAN_ANOMALY,EPHEMERIS_TYPE,"
+            "CLASSIFICATION_TYPE,NORAD_CAT_ID,ELEMENT_SET_NO,REV_AT_EPOCH,BSTAR,"
+            "MEAN_MOTION_DOT,MEAN_MOTION_DDOT\n"
+            "ISS (ZARYA),1998-067A,2023-09-12T12:00:00.000000,15.50,0.0005,51.64,"
+            "200.0,90.0,270.0,0,U,25544,999,41000,0.0002,0.0001,0\n"
+            "GEO,2000-001A,2023-09-12T12:00:00.000000,1.0027,0.0001,0.05,"
+            "10.0,0.0,0.0,0,U,26000,999,8000,0,0,0\n"
+        )
+
+        satellites = ElementSetLeoSatelliteRepository(file).get_constellation()
+
+        # The GEO object is skipped
+        assert [name for name, _ in satellites] == ["ISS (ZARYA)"]
+        assert satellites[0][1]["plane"] == 0
+        assert satellites[0][1]["position_in_plane"] == 0
+
+    def test_element_set_repo_groups_shells(self, tmp_path):
+        inclinations = [53, 53, 53, 53, 70, 70]
+        altitudes = [550, 550, 600, 600, 590, 590]
+
+        # Mean motion in rev/day of circular orbits at the altitudes
+        mean_motions = [
+            np.sqrt(
+                ElementSetLeoSatelliteRepository.MU
+                / (ElementSetLeoSatelliteRepository.EARTH_RADIUS + altitude) ** 3
+            )
+            * 86400
+            / (2 * np.pi)
+            for altitude in altitudes
+        ]
+
+        file = tmp_path / "shells.csv"
+        file.write_text(
+            "OBJECT_NAME,OBJECT_ID,EPOCH,MEAN_MOTION,ECCENTRICITY,INCLINATION,"
+            "RA_OF_ASC_NODE,ARG_OF_PERICENTER,MEAN_ANOMALY,EPHEMERIS_TYPE,"
+            "CLASSIFICATION_TYPE,NORAD_CAT_ID,ELEMENT_SET_NO,REV_AT_EPOCH,BSTAR,"
+            "MEAN_MOTION_DOT,MEAN_MOTION_DDOT\n"
+            + "".join(
+                f"SAT-{i},2023-001{chr(65 + i)},2023-09-12T12:00:00.000000,"
+                f"{mean_motion:.8f},0.0001,{inclination},10.0,0.0,{30.0 * i},0,U,"
+                f"{50000 + i},999,1000,0,0,0\n"
+                for i, (inclination, mean_motion) in enumerate(
+                    zip(inclinations, mean_motions)
+                )
+            )
+        )
+
+        satellites = dict(ElementSetLeoSatelliteRepository(file).get_constellation())
+
+        shells = [satellites[f"SAT-{i}"]["shell"] for i in range(6)]
+
+        assert shells[0] == shells[1]
+        assert shells[2] == shells[3]
+        assert shells[4] == shells[5]
+        assert len({shells[0], shells[2], shells[4]}) == 3
+
+    def test_walker_repo(self):
+        satellites = WalkerLeoSatelliteRepository(
+            no_planes=4, no_sat_per_plane=6, inclination=53, altitude=550, phasing=1
+        ).get_constellation()
+
+        assert len(satellites) == 24
+        assert satellites[7][0] == "Walker_1_1"
+        assert satellites[7][1]["plane"] == 1
+        assert satellites[7][1]["position_in_plane"] == 1
+
+        model = satellites[7][1]["skyfield_obj"].model
+
+        assert np.degrees(model.inclo) == pytest.approx(53)
+        assert np.degrees(model.nodeo) == pytest.approx(90)
+        # 360 / 6 in plane + 1 * 360 / 24 between planes
+        assert np.degrees(model.mo) == pytest.approx(75)
+
+        star = WalkerLeoSatelliteRepository(
+            no_planes=4, no_sat_per_plane=6, inclination=86, altitude=780, pattern="star"
+        ).get_constellation()
+
+        assert np.degrees(star[-1][1]["skyfield_obj"].model.nodeo) == pytest.approx(135)
+
+    def test_walker_repo_invalid_pattern(self):
+        with pytest.raises(ValueError):
+            WalkerLeoSatelliteRepository(
+                no_planes=4, no_sat_per_plane=6, inclination=53, altitude=550, pattern="x"
+            )
+
+    @pytest.mark.parametrize("empty_shell", [0, 1, 2])
+    def test_multi_shell_repo_empty_shell(self, empty_shell):
+        shells = [
+            WalkerLeoSatelliteRepository(
+                no_planes=4,
+                no_sat_per_plane=6,
+                inclination=53,
+                altitude=550,
+                name=f"Shell{shell}",
+            )
+            for shell in range(3)
+        ]
+        shells[empty_shell] = WalkerLeoSatelliteRepository(
+            no_planes=0, no_sat_per_plane=6, inclination=53, altitude=550
+        )
+
+        with pytest.raises(ValueError, match=f"Shell {empty_shell}"):
+            MultiShellLeoSatelliteRepository(shells).get_constellation()
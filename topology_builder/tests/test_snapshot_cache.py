@@ -0,0 +1,70 @@
+from pathlib import Path
+from topology_builder.repository.satellite_repository import (
+    STKLeoSatelliteRepository,
+    WalkerLeoSatelliteRepository,
+)
+from topology_builder.topology.snapshot_cache import SnapshotCache
+
+
+class TestSnapshotCache:
+    def test_get_put(self, tmp_path):
+        cache = SnapshotCache(tmp_path / "snapshots.sqlite")
+
+        key = SnapshotCache.make_key(t=0, gs_s=[{"name": "Rome"}])
+
+        assert key == SnapshotCache.make_key(gs_s=[{"name": "Rome"}], t=0)
+        assert key != SnapshotCache.make_key(t=1, gs_s=[{"name": "Rome"}])
+        assert cache.get(key) is None
+
+        cache.put(key, b"snapshot", "application/x-topology")
+
+        assert cache.get(key) == (b"snapshot", "application/x-topology")
+
+        # Persistent
+        cache.close()
+
+        assert SnapshotCache(tmp_path / "snapshots.sqlite").get(key) == (
+            b"snapshot",
+            "application/x-topology",
+        )
+
+    def test_lru_eviction(self, tmp_path):
+        cache = SnapshotCache(tmp_path / "snapshots.sqlite", max_bytes=30, max_entries=2)
+
+        cache.put("a", bytes(10), "application/x-topology")
+        cache.put("b", bytes(10), "application/x-topology")
+
+        # a becomes the most recently used
+        cache.get("a")
+        cache.put("c", bytes(10), "application/x-topology")
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+        cache.put("d", bytes(25), "application/x-topology")
+
+        assert len(cache) == 1
+        assert cache.get_size() == 25
+
+    def test_constellation_fingerprint(self, tmp_path):
+        file = tmp_path / "Iridium_TLE.txt"
+        file.write_bytes(Path("../constellations/Iridium_TLE.txt").read_bytes())
+
+        assert (
+            STKLeoSatelliteRepository(file).get_fingerprint()
+            == STKLeoSatelliteRepository(
+                Path("../constellations/Iridium_TLE.txt")
+            ).get_fingerprint()
+        )
+
+        walker = dict(no_planes=4, no_sat_per_plane=6, inclination=53, altitude=550)
+
+        assert (
+            WalkerLeoSatelliteRepository(**walker).get_fingerprint()
+            == WalkerLeoSatelliteRepository(**walker).get_fingerprint()
+        )
+        assert (
+            WalkerLeoSatelliteRepository(**walker).get_fingerprint()
+            != WalkerLeoSatelliteRepository(**walker, phasing=1).get_fingerprint()
+        )
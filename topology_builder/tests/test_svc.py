@@ -0,0 +1,41 @@
+import pytest
+
+
+class TestSvc:
+    URL = "/topology_builder/min_dist_topo_builder/walker/range"
+    PARAMS = {
+        "start": "2023-09-12 10:00:00 +0000",
+        "end": "2023-09-12 10:01:00 +0000",
+        "dt": "1000",
+        "keyframe_interval": "60",
+        "cities": "Rome,Paris",
+        "walker": "53:96/12/1",
+    }
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SNAPSHOT_CACHE_FILE", str(tmp_path / "snapshots.sqlite"))
+
+        from topology_builder import builds, svc
+
+        def get_ground_stations(cities):
+            raise AssertionError("Invalid ranges are rejected before any lookup")
+
+        monkeypatch.setattr(builds, "get_ground_stations", get_ground_stations)
+
+        return svc.app.test_client()
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"dt": "0"},
+            {"dt": "-1000"},
+            {"keyframe_interval": "0"},
+            {"end": "2023-09-12 09:59:00 +0000"},
+            {"dt": "one"},
+        ],
+    )
+    def test_invalid_range(self, client, params):
+        response = client.get(self.URL, query_string={**self.PARAMS, **params})
+
+        assert response.status_code == 400
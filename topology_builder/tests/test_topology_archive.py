@@ -0,0 +1,107 @@
+import datetime
+import io
+from pathlib import Path
+import pytest
+import pytz
+from topology_builder.builder.min_distance_topology_builder import (
+    MinimumDistanceTopologyBuilder,
+)
+from topology_builder.propagation.propagator import ConstellationPropagator
+from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.topology.archive import (
+    KEYFRAME,
+    TopologyArchiveReader,
+    TopologyArchiveWriter,
+)
+
+
+class TestTopologyArchive:
+    def test_random_access(self, tmp_path):
+        gs_s = [
+            {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+            {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+        ]
+
+        repository = STKLeoSatelliteRepository(Path("../constellations/Iridium_TLE.txt"))
+
+        times, positions = ConstellationPropagator(
+            [info["skyfield_obj"] for _, info in repository.get_constellation()]
+        ).propagate_range(
+            start_time=datetime.datetime(year=2023, month=9, day=12, tzinfo=pytz.UTC),
+            end_time=datetime.datetime(
+                year=2023, month=9, day=12, minute=10, tzinfo=pytz.UTC
+            ),
+            dt=60000,
+        )
+
+        topologies = [
+            MinimumDistanceTopologyBuilder(verbose=False, name="Iridium", t=now)
+            .add_LEO_constellation(repository, positions=snapshot_positions)
+            .add_ISLs()
+            .add_GSs(gs_s)
+            .add_GSLs()
+            .build()
+            for now, snapshot_positions in zip(times, positions)
+        ]
+
+        file = tmp_path / "iridium.topa"
+
+        with TopologyArchiveWriter(file, keyframe_interval=4) as archive:
+            for topology in topologies:
+                archive.write(topology)
+
+        reader = TopologyArchiveReader(file)
+
+        assert reader.get_timestamps() == times
+
+        # Random order, so that deltas are replayed from different keyframes
+        for i in [7, 0, 10, 3, 5]:
+            graph = reader.get(times[i] + datetime.timedelta(seconds=30))
+            ntwk = topologies[i].ntwk
+
+            assert graph.graph["t"] == times[i]
+            assert list(graph.nodes) == list(ntwk.nodes)
+            assert {frozenset(edge) for edge in graph.edges} == {
+                frozenset(edge) for edge in ntwk.edges
+            }
+
+            for u, v, length in ntwk.edges(data="length"):
+                assert graph[u][v]["length"] == length
+
+        # An archive that was not closed is indexed by scanning the records
+        truncated = tmp_path / "truncated.topa"
+        truncated.write_bytes(file.read_bytes()[: int(reader.index["offset"][-1]) + 1])
+
+        assert TopologyArchiveReader(truncated).get_timestamps() == times[:-1]
+
+        # Archives can be written to streams, e.g. HTTP responses
+        stream = io.BytesIO()
+
+        with TopologyArchiveWriter(stream, keyframe_interval=1) as archive:
+            for topology in topologies[:3]:
+                archive.write(topology)
+
+        with TopologyArchiveReader(stream.getvalue()) as reader:
+            assert reader.get_timestamps() == times[:3]
+
+        reader = TopologyArchiveReader(stream.getvalue())
+
+        assert reader.get_timestamps() == times[:3]
+        assert set(reader.index["kind"]) == {KEYFRAME}
+
+    def test_not_an_archive(self, tmp_path):
+        empty = tmp_path / "empty.topa"
+        empty.write_bytes(b"")
+
+        other = tmp_path / "other.topa"
+        other.write_bytes(b"TOPO" + bytes(64))
+
+        for file in [empty, other]:
+            with pytest.raises(ValueError):
+                TopologyArchiveReader(file)
+
+    @pytest.mark.parametrize("keyframe_interval", [0, -1])
+    def test_invalid_keyframe_interval(self, keyframe_interval):
+        with pytest.raises(ValueError):
+            TopologyArchiveWriter(io.BytesIO(), keyframe_interval=keyframe_interval)
+
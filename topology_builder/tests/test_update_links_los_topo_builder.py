@@ -0,0 +1,88 @@
+from pathlib import Path
+import datetime
+import pytest
+from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.builder.min_distance_topology_builder import (
+    MinimumDistanceTopologyBuilder,
+)
+from topology_builder.builder.los_topology_builder import LOSTopologyBuilder
+
+
+class TestUpdateLinksLOSTopoBuilder:
+    def test_update_links_matches_full_build(self):
+        gs_s = [
+            {"name": "Aberdeen", "lat": 57.9, "lon": 2.9},
+            {"name": "Bombai", "lat": 19.0, "lon": 72.48},
+        ]
+
+        dt = 60000
+
+        now = datetime.datetime.strptime(
+            "2023-09-12 10:00:00 +00:00", "%Y-%m-%d %H:%M:%S %z"
+        )
+
+        end_time = datetime.datetime.strptime(
+            "2023-09-12 10:10:00 +00:00", "%Y-%m-%d %H:%M:%S %z"
+        )
+
+        repository = STKLeoSatelliteRepository(Path("../constellations/Iridium_TLE.txt"))
+
+        full_topology = incremental_topology = (
+            MinimumDistanceTopologyBuilder(verbose=False, name="Iridium", t=now)
+            .add_LEO_constellation(repository)
+            .add_ISLs()
+            .add_GSs(gs_s)
+            .add_GSLs()
+            .build()
+        )
+
+        now += datetime.timedelta(milliseconds=dt)
+
+        while now <= end_time:
+            full_topology = (
+                LOSTopologyBuilder(
+                    verbose=False,
+                    name="Iridium",
+                    t=now,
+                    previous_topology=full_topology,
+                )
+                .add_LEO_constellation(repository)
+                .add_ISLs()
+                .add_GSs(gs_s)
+                .add_GSLs()
+                .build()
+            )
+
+            builder = (
+                LOSTopologyBuilder(
+                    verbose=False,
+                    name="Iridium",
+                    t=now,
+                    previous_topology=incremental_topology,
+                )
+                .add_LEO_constellation(repository)
+                .update_links()
+            )
+
+            previous_edges = {
+                frozenset(edge) for edge in incremental_topology.ntwk.edges
+            }
+            incremental_topology = builder.build()
+
+            assert {frozenset(edge) for edge in full_topology.ntwk.edges} == {
+                frozenset(edge) for edge in incremental_topology.ntwk.edges
+            }
+
+            for u, v in full_topology.ntwk.edges:
+                assert full_topology.ntwk[u][v]["length"] == pytest.approx(
+                    incremental_topology.ntwk[u][v]["length"]
+                )
+
+            assert {frozenset(edge) for edge in builder.delta.added} == {
+                frozenset(edge) for edge in incremental_topology.ntwk.edges
+            } - previous_edges
+            assert {frozenset(edge) for edge in builder.delta.removed} == previous_edges - {
+                frozenset(edge) for edge in incremental_topology.ntwk.edges
+            }
+
+            now += datetime.timedelta(milliseconds=dt)
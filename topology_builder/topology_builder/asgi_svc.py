@@ -0,0 +1,201 @@
+"""
+ASGI variant of svc, e.g. uvicorn topology_builder.asgi_svc:app
+
+Builds run in a process pool of TOPOLOGY_BUILDER_WORKERS processes (CPU count by
+default), so concurrent requests do not serialize behind one thread. Concurrent requests
+for the same snapshot are coalesced into a single build.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+import io
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from topology_builder import builds
+from topology_builder.propagation.propagator import ConstellationPropagator
+from topology_builder.topology import archive
+from topology_builder.topology.snapshot_cache import SnapshotCache
+
+SNAPSHOT_CACHE = SnapshotCache(
+    Path(os.environ.get("SNAPSHOT_CACHE_FILE", "./cache/snapshots.sqlite")),
+    max_bytes=int(os.environ.get("SNAPSHOT_CACHE_MAX_BYTES", 1 << 30)),
+    max_entries=int(os.environ.get("SNAPSHOT_CACHE_MAX_ENTRIES", 100_000)),
+)
+WORKERS = int(os.environ.get("TOPOLOGY_BUILDER_WORKERS", os.cpu_count()))
+
+# Set by lifespan
+pool: ProcessPoolExecutor | None = None
+# Snapshot key -> build in progress
+in_flight: Dict[str, asyncio.Future] = dict()
+
+
+async def get_ground_stations(request: Request) -> List[Dict[str, Any]]:
+    # Every request has its own GSs, the city service is called out of the event loop
+    return await asyncio.to_thread(
+        builds.get_ground_stations,
+        [city.strip() for city in request.query_params["cities"].split(",")],
+    )
+
+
+async def get_snapshot(key: str, *args: Any) -> Tuple[bytes, str]:
+    cached = await asyncio.to_thread(SNAPSHOT_CACHE.get, key)
+    if cached is not None:
+        return cached
+
+    if key not in in_flight:
+        build = asyncio.get_running_loop().run_in_executor(
+            pool, builds.build_snapshot, *args
+        )
+
+        def done(build: asyncio.Future) -> None:
+            del in_flight[key]
+            if not build.cancelled() and build.exception() is None:
+                asyncio.get_running_loop().run_in_executor(
+                    None, SNAPSHOT_CACHE.put, key, *build.result()
+                )
+
+        build.add_done_callback(done)
+        in_flight[key] = build
+
+    # A request that goes away does not cancel the build of the others
+    return await asyncio.shield(in_flight[key])
+
+
+async def snapshot(request: Request) -> Response:
+    topo_name = request.path_params["topo_name"]
+    t = datetime.strptime(request.query_params["t"], builds.TIME_FORMAT)
+    gs_s = await get_ground_stations(request)
+    walker = request.query_params.get("walker")
+    altitude = float(request.query_params.get("altitude", 550))
+    binary = request.query_params.get("format") == "binary"
+
+    key = await asyncio.to_thread(
+        builds.get_snapshot_key, topo_name, t, gs_s, walker, altitude, binary
+    )
+
+    data, mimetype = await get_snapshot(
+        key, topo_name, t, gs_s, walker, altitude, binary
+    )
+
+    return Response(data, media_type=mimetype)
+
+
+async def topology_range(request: Request) -> Response:
+    """
+    Snapshots from start to end, every dt milliseconds, streamed as a topology archive.
+    Snapshots are built in parallel and streamed in order.
+    """
+    topo_name = request.path_params["topo_name"]
+    try:
+        start = datetime.strptime(request.query_params["start"], builds.TIME_FORMAT)
+        end = datetime.strptime(request.query_params["end"], builds.TIME_FORMAT)
+        dt = int(request.query_params.get("dt", 1000))
+        keyframe_interval = int(request.query_params.get("keyframe_interval", 60))
+
+        builds.check_range(start, end, dt, keyframe_interval)
+    except ValueError as e:
+        return Response(str(e), status_code=400)
+
+    gs_s = await get_ground_stations(request)
+    walker = request.query_params.get("walker")
+    altitude = float(request.query_params.get("altitude", 550))
+
+    def get_chunks():
+        repository = builds.get_repository(walker, altitude)
+
+        return ConstellationPropagator(
+            [info["skyfield_obj"] for _, info in repository.get_constellation()]
+        ).iter_propagate_range(start, end, dt)
+
+    # The constellation is propagated a chunk of time instants at a time, as the stream
+    # goes, out of the event loop
+    chunks = await asyncio.to_thread(get_chunks)
+
+    async def generate():
+        loop = asyncio.get_running_loop()
+        stream = io.BytesIO()
+        writer = archive.TopologyArchiveWriter(stream, keyframe_interval=keyframe_interval)
+
+        # Time instants of the current chunk that are not submitted yet
+        tasks = deque()
+        builds_in_order = deque()
+
+        async def submit() -> None:
+            if not tasks:
+                chunk = await asyncio.to_thread(next, chunks, None)
+
+                # Every snapshot of the range is already submitted
+                if chunk is None:
+                    return
+
+                tasks.extend(zip(*chunk))
+
+            now, snapshot_positions = tasks.popleft()
+            builds_in_order.append(
+                (
+                    now,
+                    loop.run_in_executor(
+                        pool,
+                        builds.build_snapshot,
+                        topo_name,
+                        now,
+                        gs_s,
+                        walker,
+                        altitude,
+                        True,
+                        snapshot_positions,
+                    ),
+                )
+            )
+
+        # Bounded number of builds ahead of the stream
+        for _ in range(2 * WORKERS):
+            await submit()
+
+        try:
+            while builds_in_order:
+                now, build = builds_in_order.popleft()
+                await submit()
+
+                data, _ = await build
+                writer.write_snapshot(now, data)
+
+                yield stream.getvalue()
+                stream.seek(0)
+                stream.truncate()
+        finally:
+            for _, build in builds_in_order:
+                build.cancel()
+
+        writer.close()
+        yield stream.getvalue()
+
+    return StreamingResponse(generate(), media_type=archive.MIMETYPE)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    global pool
+
+    pool = ProcessPoolExecutor(max_workers=WORKERS)
+    try:
+        yield
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/topology_builder/min_dist_topo_builder/{topo_name}", snapshot),
+        Route("/topology_builder/min_dist_topo_builder/{topo_name}/range", topology_range),
+    ],
+    lifespan=lifespan,
+)
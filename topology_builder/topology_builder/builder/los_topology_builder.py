@@ -1,9 +1,12 @@
-from typing import Any, Dict
+from typing import Any, Dict, Self
+import numpy as np
 from skyfield.api import utc
 from datetime import datetime
-from topology_builder.topology.topology import Topology
+from topology_builder.propagation.line_of_sight import distance, los
+from topology_builder.topology.topology import Topology, TopologyDelta
 from topology_builder.builder.topology_builder import TopologyBuilder
 from topology_builder.node_types import NodeTypes
+from topology_builder.isl_policies import ISLPolicies
 
 
 class LOSTopologyBuilder(TopologyBuilder):
@@ -16,12 +19,11 @@ class LOSTopologyBuilder(TopologyBuilder):
     ) -> None:
         super().__init__(verbose, name, t)
         self.previous_topology = previous_topology
+        self.delta: TopologyDelta | None = None
 
     def _add_inter_plane_links(self, satellite: str) -> Dict[str, Any]:
-        next_plane = (
-            self.topology.get_sat_plane(satellite) + 1
-        ) % self.topology.no_planes
-        
+        next_plane = self.topology.get_next_plane(self.topology.get_sat_plane(satellite))
+
         candidate_next_plane = next(
             iter(
                 [
@@ -39,18 +41,152 @@ class LOSTopologyBuilder(TopologyBuilder):
 
         return {
             "satellite": candidate_next_plane,
-            "distance": self.topology.get_difference(candidate_next_plane, satellite)
-            .distance()
-            .km,
+            "distance": self.topology.get_distance(candidate_next_plane, satellite),
         }
 
     def _get_sat_for_building_gsl(self, gs: str) -> Dict[str, Any]:
         candidate = next(iter(self.previous_topology.ntwk.adj[gs]))
 
-        alt, _, distance = self.topology.get_difference(candidate, gs).altaz()
-
         # below the horizon
-        if alt.degrees <= 0:
+        if self._get_elevation(gs, candidate) <= self.min_elevation:
             return self._get_closer_satellite_to_gs(gs)
         else:
-            return {"satellite": candidate, "distance": distance.km}
+            return {
+                "satellite": candidate,
+                "distance": self.topology.get_distance(candidate, gs),
+            }
+
+    def _get_satellite_positions(self, satellites: list[str]) -> np.ndarray:
+        return self.topology.positions[
+            [self.topology.node_index[sat] for sat in satellites]
+        ]
+
+    def _add_link(self, u: str, v: str, length: float) -> None:
+        if not self.topology.ntwk.has_edge(u, v):
+            self.delta.added[u, v] = length
+        self.topology.add_edge(u, v, length=length)
+
+    def update_links(self) -> Self:
+        """Incremental alternative to add_ISLs, add_GSs and add_GSLs.
+        Starts from the GSs and links of the previous topology, updates the length of the links
+        still in LOS and re-selects only the broken ones. The changes w.r.t. the previous
+        topology are stored in self.delta.
+
+        Returns:
+            self: part of the builder pattern
+        """
+
+        if len(self.topology.get_leo_satellites()) == 0:
+            raise Exception(
+                "The number of satellites in the topology should not be 0 for updating links."
+            )
+
+        if self.verbose:
+            print("\nUpdating links...")
+
+        self.delta = TopologyDelta()
+
+        self.add_GSs(
+            [
+                {
+                    "name": gs,
+                    "lat": self.previous_topology.ntwk.nodes[gs]["latitude"],
+                    "lon": self.previous_topology.ntwk.nodes[gs]["longitude"],
+                }
+                for gs in self.previous_topology.get_GSs()
+            ]
+        )
+
+        # ISLs still in LOS
+        isls = self.previous_topology.get_ISLs()
+        isls_u = self._get_satellite_positions([u for u, _ in isls])
+        isls_v = self._get_satellite_positions([v for _, v in isls])
+        isls_los = los(isls_u, isls_v)
+        isls_length = distance(isls_u, isls_v)
+
+        # GSLs still above the elevation mask, as (gs, satellite)
+        gsls = [
+            (u, v)
+            if self.previous_topology.ntwk.nodes[u]["type"] == NodeTypes.GROUD_STATION
+            else (v, u)
+            for u, v in self.previous_topology.get_GSLs()
+        ]
+        gsls_visible = (
+            self._get_elevations([gs for gs, _ in gsls], [sat for _, sat in gsls])
+            > self.min_elevation
+        )
+        gsls_length = distance(
+            self._get_satellite_positions([sat for _, sat in gsls]),
+            self._get_satellite_positions([gs for gs, _ in gsls]),
+        )
+
+        broken_isls = []
+        broken_gsls = []
+
+        for (u, v), still_los, length in zip(isls, isls_los, isls_length):
+            if still_los:
+                self.topology.add_edge(u, v, length=float(length))
+                self.delta.updated[u, v] = float(length)
+            else:
+                self.delta.removed.append((u, v))
+                broken_isls.append((u, v))
+
+        for (gs, sat), visible, length in zip(gsls, gsls_visible, gsls_length):
+            if visible:
+                self.topology.add_edge(gs, sat, length=float(length))
+                self.delta.updated[gs, sat] = float(length)
+            else:
+                self.delta.removed.append((gs, sat))
+                broken_gsls.append(gs)
+
+        # Intra-plane links that were not in LOS
+        missing_intra_plane = [
+            (sat, neighbour)
+            for sat in self.topology.get_leo_satellites()
+            for plane in [self.topology.get_sat_plane(sat)]
+            for neighbour in [
+                self.topology.get_satellite_at(
+                    plane,
+                    (self.topology.get_position_in_plane(sat) + 1)
+                    % len(self.topology.get_plane_satellites(plane)),
+                )
+            ]
+            if neighbour not in (None, sat)
+            and self._get_ISL_policy(sat) != ISLPolicies.NONE
+            and not self.topology.ntwk.has_edge(sat, neighbour)
+        ]
+
+        if len(missing_intra_plane) > 0:
+            missing_u = self._get_satellite_positions([u for u, _ in missing_intra_plane])
+            missing_v = self._get_satellite_positions([v for _, v in missing_intra_plane])
+
+            for (u, v), now_los, length in zip(
+                missing_intra_plane,
+                los(missing_u, missing_v),
+                distance(missing_u, missing_v),
+            ):
+                if now_los:
+                    self._add_link(u, v, float(length))
+
+        # Broken inter-plane links are re-selected by the satellite they belong to
+        for u, v in broken_isls:
+            for satellite, other in ((u, v), (v, u)):
+                if (
+                    self._get_ISL_policy(satellite) != ISLPolicies.GRID
+                    or self.topology.get_next_plane(self.topology.get_sat_plane(satellite))
+                    != self.topology.get_sat_plane(other)
+                ):
+                    continue
+
+                closer = self.get_closer_sat_next_plane(satellite)
+                self._add_link(satellite, closer["satellite"], closer["distance"])
+
+        # Broken GSLs
+        for gs in broken_gsls:
+            closer = self._get_closer_satellite_to_gs(gs)
+            self._add_link(gs, closer["satellite"], closer["distance"])
+
+        if self.verbose:
+            print(self.delta)
+
+        return self
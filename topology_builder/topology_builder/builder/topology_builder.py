@@ -1,121 +1,223 @@
 import itertools
 import math
 from typing import Any, Dict, List, Self
-from skyfield.api import load, wgs84, utc
+import numpy as np
+from scipy.spatial import cKDTree
+from skyfield.api import wgs84, utc
+from skyfield.constants import AU_KM
+from skyfield.framelib import itrs
+from skyfield.positionlib import build_position
 from datetime import datetime
+from topology_builder.propagation.line_of_sight import distance, los
+from topology_builder.propagation.propagator import ConstellationPropagator
+from topology_builder.propagation.timescale import get_timescale
 from topology_builder.repository.satellite_repository import LeoSatelliteRepository
 from topology_builder.topology.topology import Topology
 from topology_builder.node_types import NodeTypes
+from topology_builder.isl_policies import ISLPolicies
 
 
 class TopologyBuilder:
+    # Nearest satellites first queried for every GS when building GSLs
+    GSL_CANDIDATES = 8
+
     def __init__(
         self, verbose: bool, name: str, t: datetime = datetime.now(tz=utc)
     ) -> None:
         self.verbose = verbose
-        self.t = load.timescale().from_datetime(t)
+        self.t = get_timescale().from_datetime(t)
         self.topology = Topology(name, self.t)
+        self.satellites: List[str] = []
+        self.satellite_index: Dict[str, int] = dict()
+        self._satellite_positions: np.ndarray = np.empty((0, 3))
+        self._satellite_tree: cKDTree | None = None
+        # GS -> closer satellite above the elevation mask
+        self._closer_satellites: Dict[str, Dict[str, Any]] = dict()
+        self.min_elevation: float = 0  # degrees
+        # shell -> ISL policy, GRID if not set
+        self.isl_policies: Dict[int, ISLPolicies] = dict()
 
     def _los_between_satellites(self, sat_u: str, sat_v: str) -> bool:
-        # Get position vertors
-        pos_u = self.topology.get_position(sat_u).position.km
-        pos_v = self.topology.get_position(sat_v).position.km
+        return bool(
+            los(
+                self.topology.get_position_vector(sat_u),
+                self.topology.get_position_vector(sat_v),
+            )
+        )
+
+    def _index_satellites(self) -> None:
+        self.satellites = self.topology.get_leo_satellites()
+        self.satellite_index = {sat: i for i, sat in enumerate(self.satellites)}
+        self._satellite_positions = self.topology.positions[
+            [self.topology.node_index[sat] for sat in self.satellites]
+        ]
+        self._satellite_tree = None
+        self._closer_satellites = dict()
+
+    def _get_zeniths(self, gs_s: List[str]) -> np.ndarray:
+        """
+        Return the local vertical of every gs in GCRS
+        """
+        lat = np.radians([self.topology.ntwk.nodes[gs]["latitude"] for gs in gs_s])
+        lon = np.radians([self.topology.ntwk.nodes[gs]["longitude"] for gs in gs_s])
+
+        # ITRS -> GCRS
+        return np.stack(
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)],
+            axis=1,
+        ) @ itrs.rotation_at(self.t)
 
-        num = sum(pos_u[:] * pos_u[:]) * sum(pos_v[:] * pos_v[:]) - math.pow(
-            sum(pos_u[:] * pos_v[:]), 2
+    def _get_elevations(self, gs_s: List[str], satellites: List[str]) -> np.ndarray:
+        """
+        Return the elevation in degrees of every satellite as seen from the corresponding gs
+        """
+        differences = (
+            self.topology.positions[[self.topology.node_index[sat] for sat in satellites]]
+            - self.topology.positions[[self.topology.node_index[gs] for gs in gs_s]]
         )
-        den = (
-            sum(pos_u[:] * pos_u[:])
-            + sum(pos_v[:] * pos_v[:])
-            - 2 * sum(pos_u[:] * pos_v[:])
+
+        return np.degrees(
+            np.arcsin(
+                np.einsum("ij,ij->i", differences, self._get_zeniths(gs_s))
+                / np.linalg.norm(differences, axis=1)
+            )
         )
 
-        res = math.sqrt(abs(num / den)) - 6378.14  # Earth radius
+    def _get_elevation(self, gs: str, satellite: str) -> float:
+        """
+        Return the elevation in degrees of satellite as seen from gs
+        """
+        return float(self._get_elevations([gs], [satellite])[0])
 
-        return res > 0
+    @property
+    def satellite_tree(self) -> cKDTree:
+        """
+        KD-tree over the satellite positions, indexed by satellite_index
+        """
+        if self._satellite_tree is None:
+            self._satellite_tree = cKDTree(self._satellite_positions)
+        return self._satellite_tree
 
-    def _get_closer_satellite_to_gs(self, gs: str) -> Dict[str, Any]:
+    def _get_closer_satellites_to_gss(
+        self, gs_s: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
         """
-        Return closer satellite to gs
+        Return the closer satellite above the elevation mask to every gs.
+        The k nearest satellites of all the GSs are queried at once from the KD-tree,
+        k is doubled for the GSs that do not see any of them.
         """
-        satellites: List[str] = self.topology.get_leo_satellites()
-        # Closer until now
+        gs_positions = self.topology.positions[
+            [self.topology.node_index[gs] for gs in gs_s]
+        ]
+        zeniths = self._get_zeniths(gs_s)
+        min_sin_elevation = math.sin(math.radians(self.min_elevation))
+
         closer = dict()
-        # Initialization
-        closer["distance"] = math.inf  # heigth from GS
-        closer["satellite"] = satellites[0]  # Candidate satellite
-        # Iterate over the candidate satellites except the first
-        for sat in satellites:
-            # Get alt and distance
-            alt, _, distance = self.topology.get_difference(sat, gs).altaz()
-            # below the horizon
-            if alt.degrees <= 0:
-                continue
-            # Build candidate
-            candidate = {"satellite": sat, "distance": distance.km}
-            # Update closer satellite
-            closer = (
-                closer
-                if min(closer["distance"], candidate["distance"]) == closer["distance"]
-                else candidate
+        pending = np.arange(len(gs_s))
+        k = min(self.GSL_CANDIDATES, len(self.satellites))
+
+        while len(pending) > 0:
+            distances, indices = self.satellite_tree.query(gs_positions[pending], k=k)
+            distances = distances.reshape(len(pending), k)
+            indices = indices.reshape(len(pending), k)
+
+            differences = (
+                self._satellite_positions[indices] - gs_positions[pending, None, :]
+            )
+            above_mask = (
+                np.einsum("gkj,gj->gk", differences, zeniths[pending])
+                > min_sin_elevation * distances
             )
 
+            # Candidates are sorted by distance, the first one above the mask is the closer
+            first = above_mask.argmax(axis=1)
+
+            for row in np.flatnonzero(above_mask.any(axis=1)):
+                closer[gs_s[pending[row]]] = {
+                    "satellite": self.satellites[indices[row, first[row]]],
+                    "distance": float(distances[row, first[row]]),
+                }
+
+            pending = pending[~above_mask.any(axis=1)]
+
+            if k == len(self.satellites):
+                break
+
+            k = min(2 * k, len(self.satellites))
+
+        # No satellite above the mask
+        for gs in pending:
+            closer[gs_s[gs]] = {"satellite": self.satellites[0], "distance": math.inf}
+
         return closer
 
+    def _get_closer_satellite_to_gs(self, gs: str) -> Dict[str, Any]:
+        """
+        Return closer satellite to gs
+        """
+        if gs not in self._closer_satellites:
+            self._closer_satellites.update(self._get_closer_satellites_to_gss([gs]))
+
+        return self._closer_satellites[gs]
+
     def get_closer_sat_next_plane(self, satellite: str) -> Dict[str, Any]:
-        current_plane = self.topology.get_sat_plane(satellite)
+        next_plane = self.topology.get_next_plane(self.topology.get_sat_plane(satellite))
+
+        candidates = self.topology.get_plane_satellites(next_plane)
 
-        satellites_next_plane_los = [
-            sat
-            for sat in self.topology.get_leo_satellites()
-            if self.topology.get_sat_plane(sat)
-            == (current_plane + 1) % self.topology.no_planes
-            and self._los_between_satellites(satellite, sat)
+        position = self.topology.get_position_vector(satellite)
+        candidate_positions = self._satellite_positions[
+            [self.satellite_index[sat] for sat in candidates]
         ]
 
-        min_dist_next_plane = min(
-            satellites_next_plane_los,
-            key=lambda x: self.topology.get_difference(x, satellite).distance().km,
+        distances = np.where(
+            los(position, candidate_positions),
+            distance(position, candidate_positions),
+            math.inf,
         )
 
+        if len(candidates) == 0 or np.isinf(distances.min()):
+            raise ValueError(f"No satellite in LOS in the next plane of {satellite}")
+
+        min_dist_next_plane = int(np.argmin(distances))
+
         return {
-            "satellite": min_dist_next_plane,
-            "distance": self.topology.get_difference(min_dist_next_plane, satellite)
-            .distance()
-            .km,
+            "satellite": candidates[min_dist_next_plane],
+            "distance": float(distances[min_dist_next_plane]),
         }
 
+    def _get_ISL_policy(self, satellite: str) -> ISLPolicies:
+        shell = self.topology.get_sat_shell(satellite)
+        policy = self.isl_policies.get(shell, ISLPolicies.GRID)
+
+        # Single plane shells have no next plane
+        if policy == ISLPolicies.GRID and len(self.topology.get_shell_planes(shell)) == 1:
+            return ISLPolicies.INTRA_PLANE
+
+        return policy
+
     def _add_intra_plane_links(self, satellite: str) -> List[Dict[str, Any]]:
         current_plane = self.topology.get_sat_plane(satellite)
         current_position_in_plane = self.topology.get_position_in_plane(satellite)
 
-        candidates = []
-
-        for sat in self.topology.get_leo_satellites():
-            if sat == satellite:
-                continue
-            if self.topology.get_sat_plane(sat) != current_plane:
-                continue
-            if not self._los_between_satellites(satellite, sat):
-                continue
-            if not (
-                self.topology.get_position_in_plane(sat)
-                == (current_position_in_plane + 1) % self.topology.no_sat_per_plane
-                or self.topology.get_position_in_plane(sat)
-                == (current_position_in_plane - 1) % self.topology.no_sat_per_plane
-            ):
-                continue
-
-            candidates.append(
-                {
-                    "satellite": sat,
-                    "distance": self.topology.get_difference(sat, satellite)
-                    .distance()
-                    .km,
-                }
+        neighbours = {
+            self.topology.get_satellite_at(
+                current_plane,
+                # Planes may not be full
+                (current_position_in_plane + offset)
+                % len(self.topology.get_plane_satellites(current_plane)),
             )
-
-        return candidates
+            for offset in (1, -1)
+        } - {None, satellite}
+
+        return [
+            {
+                "satellite": sat,
+                "distance": self.topology.get_distance(sat, satellite),
+            }
+            for sat in sorted(neighbours, key=self.satellite_index.get)
+            if self._los_between_satellites(satellite, sat)
+        ]
 
     def _add_inter_plane_links(self, satellite: Dict[Any, Any]) -> Dict[str, Any]:
         pass
@@ -125,11 +227,14 @@ class TopologyBuilder:
 
     # Public Methods
 
-    def add_LEO_constellation(self, repository: LeoSatelliteRepository) -> Self:
+    def add_LEO_constellation(
+        self, repository: LeoSatelliteRepository, positions: np.ndarray | None = None
+    ) -> Self:
         """Adds LEO satllites to the Topology
 
         Args:
             repository (LeoSatelliteRepository): represents a data source for the satellite constellation
+            positions (np.ndarray, optional): (N, 3) GCRS positions in km at t, e.g. one snapshot of ConstellationPropagator.propagate_range. Propagated here if not given.
 
         Returns:
             self: part of the builder pattern
@@ -140,29 +245,41 @@ class TopologyBuilder:
         if self.verbose:
             print(f"\nAdding {len(constellation)} LEO satellites")
 
-        self.topology.ntwk.add_nodes_from(
+        # Propagate the whole constellation once
+        if positions is None:
+            positions = ConstellationPropagator(
+                [info["skyfield_obj"] for _, info in constellation]
+            ).propagate(self.t)
+
+        geocentric = build_position(positions.T / AU_KM, center=399, t=self.t)
+        latitudes, longitudes = wgs84.latlon_of(geocentric)
+        heights = wgs84.height_of(geocentric)
+
+        self.topology.add_nodes_from(
             [
                 (
                     name,
                     dict(
                         info,
                         **{
-                            "latitude": wgs84.latlon_of(
-                                info["skyfield_obj"].at(self.t)
-                            )[0].degrees,
-                            "longitude": wgs84.latlon_of(
-                                info["skyfield_obj"].at(self.t)
-                            )[1].degrees,
-                            "height": wgs84.height_of(
-                                info["skyfield_obj"].at(self.t)
-                            ).km,
+                            "latitude": latitudes.degrees[i],
+                            "longitude": longitudes.degrees[i],
+                            "height": heights.km[i],
+                            "shell": info.get("shell", 0),
                         },
                     ),
                 )
-                for name, info in constellation
+                for i, (name, info) in enumerate(constellation)
             ]
         )
 
+        self.topology.set_positions([name for name, _ in constellation], positions)
+
+        for name, info in constellation:
+            self.topology.add_to_plane_index(
+                name, info["plane"], info["position_in_plane"], info.get("shell", 0)
+            )
+
         self.topology.no_planes = max([info["plane"] for _, info in constellation]) + 1
 
         self.topology.no_sat_per_plane = (
@@ -173,6 +290,8 @@ class TopologyBuilder:
             print(f"Number of planes : {self.topology.no_planes}")
             print(f"Number of per plane : {self.topology.no_sat_per_plane}")
 
+        self._index_satellites()
+
         return self
 
     def add_GSs(self, groud_stations: List[Dict[Any, Any]]) -> Self:
@@ -204,13 +323,39 @@ class TopologyBuilder:
         ]
 
         # Add to the network
-        self.topology.ntwk.add_nodes_from(gs_s_topo)
+        self.topology.add_nodes_from(gs_s_topo)
+
+        if len(gs_s_topo) > 0:
+            self.topology.set_positions(
+                [name for name, _ in gs_s_topo],
+                wgs84.latlon(
+                    np.array([gs["lat"] for gs in groud_stations]),
+                    np.array([gs["lon"] for gs in groud_stations]),
+                )
+                .at(self.t)
+                .position.km.T,
+            )
+
+        return self
+
+    def set_ISL_policy(self, shell: int, policy: ISLPolicies) -> Self:
+        """Sets the ISLs built by add_ISLs for the satellites of a shell
+
+        Args:
+            shell (int): the shell
+            policy (ISLPolicies): GRID (default), INTRA_PLANE or NONE
+
+        Returns:
+            self: part of the builder pattern
+        """
+
+        self.isl_policies[shell] = policy
 
         return self
 
     def add_ISLs(self) -> Self:
         """
-        Add ISLs based on the four closer satellites.
+        Add ISLs based on the four closer satellites, according to the ISL policy of every shell.
         """
 
         satellites = self.topology.get_leo_satellites()
@@ -228,13 +373,19 @@ class TopologyBuilder:
             if self.verbose and i % int(0.1 * len(satellites)) == 0:
                 print(f"progressing... satellite {i + 1} of {len(satellites)}")
 
+            policy = self._get_ISL_policy(satellite)
+
             candidates = itertools.chain(
-                self._add_intra_plane_links(satellite),
-                [self._add_inter_plane_links(satellite)],
+                self._add_intra_plane_links(satellite)
+                if policy != ISLPolicies.NONE
+                else [],
+                [self._add_inter_plane_links(satellite)]
+                if policy == ISLPolicies.GRID
+                else [],
             )
 
             [
-                self.topology.ntwk.add_edge(
+                self.topology.add_edge(
                     satellite, candidate["satellite"], length=candidate["distance"]
                 )
                 for candidate in candidates
@@ -265,6 +416,9 @@ class TopologyBuilder:
                 "The number of ground stations in the topology should not be 0 when building GSLs."
             )
 
+        # Closer satellites to all the GSs at once
+        self._closer_satellites = self._get_closer_satellites_to_gss(gs_s)
+
         for i, gs in enumerate(gs_s):
             # Get closer satellite to gs
             closer_satellite = self._get_sat_for_building_gsl(gs=gs)
@@ -272,7 +426,7 @@ class TopologyBuilder:
             if self.verbose:
                 print(f"Adding GSL {i + 1}/{len(gs_s)}.")
 
-            self.topology.ntwk.add_edge(
+            self.topology.add_edge(
                 gs,  # gs
                 closer_satellite["satellite"],  # Satellite
                 length=closer_satellite["distance"],  # Distance
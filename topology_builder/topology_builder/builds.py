@@ -0,0 +1,165 @@
+"""
+Snapshot builds shared by the Flask (svc) and ASGI (asgi_svc) services. Functions are
+top-level and take and return picklable values, so that they can run in worker processes;
+repositories and the city store are per process.
+"""
+
+from datetime import datetime
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from city_store import CityStore
+from topology_builder.builder.min_distance_topology_builder import (
+    MinimumDistanceTopologyBuilder,
+)
+from topology_builder.propagation import propagator
+from topology_builder.repository.satellite_repository import (
+    LeoSatelliteRepository,
+    STKLeoSatelliteRepository,
+    WalkerLeoSatelliteRepository,
+)
+from topology_builder.topology import binary_format
+from topology_builder.topology.snapshot_cache import SnapshotCache
+from topology_builder.topology.topology import Topology
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+# Walker notation, altitude -> repository, so that satellites are generated once
+_walker_repositories: Dict[Tuple[str, float], WalkerLeoSatelliteRepository] = dict()
+# Set by get_city_store
+_city_store: CityStore | None = None
+
+
+def get_repository(walker: str | None, altitude: float) -> LeoSatelliteRepository:
+    """
+    Iridium, or a synthetic Walker constellation given as i:T/P/F, e.g. 53:1584/72/1
+    """
+    if walker is None:
+        return STKLeoSatelliteRepository(Path("./constellations/Iridium_TLE.txt"))
+
+    if (walker, altitude) not in _walker_repositories:
+        inclination, pattern = walker.split(":")
+        no_sats, no_planes, phasing = [int(value) for value in pattern.split("/")]
+
+        _walker_repositories[walker, altitude] = WalkerLeoSatelliteRepository(
+            no_planes=no_planes,
+            no_sat_per_plane=no_sats // no_planes,
+            inclination=float(inclination),
+            altitude=altitude,
+            phasing=phasing,
+        )
+
+    return _walker_repositories[walker, altitude]
+
+
+def get_city_store() -> CityStore:
+    """
+    City store of the process, bulk-loaded from CITIES_FILE if set. The city service at
+    BASE_CITY_API_URL is only called for cities missing from the store.
+    """
+    global _city_store
+
+    if _city_store is None:
+        api_key_file = os.environ.get("CITY_SVC_API_KEY_FILE")
+
+        _city_store = CityStore(
+            Path(os.environ.get("CITY_STORE_FILE", "./cache/cities.sqlite")),
+            base_url=os.environ.get("BASE_CITY_API_URL"),
+            api_key=Path(api_key_file).read_text().strip() if api_key_file else None,
+            timeout=float(os.environ.get("CITY_SVC_TIMEOUT", 5)),
+        )
+
+        if os.environ.get("CITIES_FILE"):
+            _city_store.load_file(Path(os.environ["CITIES_FILE"]))
+
+    return _city_store
+
+
+def get_ground_stations(cities: List[str]) -> List[Dict[str, Any]]:
+    """Resolves the cities of a request into GSs, through the city store
+
+    Args:
+        cities (List[str]): city names
+
+    Returns:
+        List[Dict[str, Any]]: name, lat and lon of every city, in the same order
+    """
+
+    return [
+        {"name": city["name"], "lat": city["latitude"], "lon": city["longitude"]}
+        for city in get_city_store().get(cities)
+    ]
+
+
+def check_range(start: datetime, end: datetime, dt: int, keyframe_interval: int) -> None:
+    """
+    Raises ValueError on a range request that would never end or cannot be archived
+    """
+    propagator.check_range(start, end, dt)
+
+    if keyframe_interval < 1:
+        raise ValueError(f"keyframe_interval must be at least 1, not {keyframe_interval}")
+
+
+def get_snapshot_key(
+    topo_name: str,
+    t: datetime,
+    gs_s: List[Dict[str, Any]],
+    walker: str | None,
+    altitude: float,
+    binary: bool,
+) -> str:
+    return SnapshotCache.make_key(
+        constellation=get_repository(walker, altitude).get_fingerprint(),
+        builder=MinimumDistanceTopologyBuilder.__name__,
+        name=topo_name,
+        t=t.timestamp(),
+        gs_s=gs_s,
+        binary=binary,
+    )
+
+
+def build_topology(
+    topo_name: str,
+    t: datetime,
+    gs_s: List[Dict[str, Any]],
+    walker: str | None,
+    altitude: float,
+    positions: np.ndarray | None = None,
+) -> Topology:
+    return (
+        MinimumDistanceTopologyBuilder(
+            verbose=False,
+            name=topo_name,
+            t=t,
+        )
+        .add_LEO_constellation(get_repository(walker, altitude), positions=positions)
+        .add_GSs(gs_s)
+        .add_ISLs()
+        .add_GSLs()
+        .build()
+    )
+
+
+def build_snapshot(
+    topo_name: str,
+    t: datetime,
+    gs_s: List[Dict[str, Any]],
+    walker: str | None,
+    altitude: float,
+    binary: bool,
+    positions: np.ndarray | None = None,
+) -> Tuple[bytes, str]:
+    """Builds and serializes a topology, Topology objects cannot be pickled
+
+    Returns:
+        Tuple[bytes, str]: the snapshot and its mimetype
+    """
+
+    topology = build_topology(topo_name, t, gs_s, walker, altitude, positions)
+
+    if binary:
+        return topology.to_bytes(), binary_format.MIMETYPE
+
+    return str(topology).encode(), "application/json"
@@ -1,20 +1,59 @@
 import datetime
 import json
+from multiprocessing import Pool
 from pathlib import Path
 import time
 import yaml
-from typing import Annotated, Optional
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+import numpy as np
 import typer
 from topology_builder import __app_name__, __version__
 from topology_builder.builder.min_distance_topology_builder import (
     MinimumDistanceTopologyBuilder,
 )
+from topology_builder.propagation.propagator import ConstellationPropagator
 from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder.topology.archive import TopologyArchiveWriter
 from topology_builder.topology.topology import Topology
 
 
 app = typer.Typer()
 
+# Per-process state of the snapshot workers, see _init_snapshot_worker
+_worker_state: Dict[str, Any] = dict()
+
+
+def _init_snapshot_worker(
+    repository: STKLeoSatelliteRepository,
+    name: str,
+    ground_stations: List[Dict[str, Any]],
+) -> None:
+    _worker_state["repository"] = repository
+    _worker_state["name"] = name
+    _worker_state["ground_stations"] = ground_stations
+
+
+def _build_snapshot(
+    task: Tuple[datetime.datetime, np.ndarray]
+) -> Tuple[datetime.datetime, bytes]:
+    now, positions = task
+
+    topology: Topology = (
+        MinimumDistanceTopologyBuilder(
+            verbose=False,
+            name=_worker_state["name"],
+            t=now,
+        )
+        .add_LEO_constellation(_worker_state["repository"], positions=positions)
+        .add_ISLs()
+        .add_GSs(_worker_state["ground_stations"])
+        .add_GSLs()
+        .build()
+    )
+
+    # Topologies hold SGP4 objects, which cannot be pickled
+    return now, topology.to_bytes()
+
 
 @app.command()
 def build_single_topology(
@@ -59,6 +98,9 @@ def build_single_topology(
 def build_dynamic_topology(
     config_file: Annotated[str, typer.Option(help="config file.")],
     verbose: Annotated[bool, typer.Option(help="Print logs.")] = False,
+    workers: Annotated[
+        int, typer.Option(help="Number of processes building the snapshots.")
+    ] = 1,
 ):
     """
     Build the dynamic topology associated to a satellite constellation.
@@ -70,52 +112,52 @@ def build_dynamic_topology(
         print(json.dumps(config, indent=4))
 
     dt = config["dt"]
-    now = start_time = datetime.datetime.strptime(
+    start_time = datetime.datetime.strptime(
         config["start_time"], "%Y-%m-%d %H:%M:%S %z"
     )
     end_time = datetime.datetime.strptime(config["end_time"], "%Y-%m-%d %H:%M:%S %z")
 
-    dyn_status = []
-
-    start_time = time.time()
-
-    while now <= end_time:
-        if verbose:
-            print(f"\nBuilding topology at {now}")
-
-        dyn_status.append(
-            MinimumDistanceTopologyBuilder(
-                verbose=False,
-                name=config["name"],
-                t=datetime.datetime.strptime(config["t"], "%Y-%m-%d %H:%M:%S %z"),
-            )
-            .add_LEO_constellation(
-                STKLeoSatelliteRepository(Path(config["constellation_file"]))
-            )
-            .add_ISLs()
-            .add_GSs(config["ground_stations"])
-            .add_GSLs()
-            .build()
-        )
-
-        now += datetime.timedelta(milliseconds=dt)
+    s_time = time.time()
+
+    repository = STKLeoSatelliteRepository(Path(config["constellation_file"]))
+
+    # The constellation is propagated a chunk of time instants at a time, as the snapshots
+    # are built
+    chunks = ConstellationPropagator(
+        [info["skyfield_obj"] for _, info in repository.get_constellation()]
+    ).iter_propagate_range(start_time, end_time, dt)
+
+    initargs = (repository, config["name"], config["ground_stations"])
+
+    # Snapshots are streamed to the archive, in order, as they are built
+    with TopologyArchiveWriter(
+        Path(config["output_file"]),
+        keyframe_interval=config.get("keyframe_interval", 60),
+        length_tolerance=config.get("length_tolerance", 0.0),
+    ) as archive:
+        if workers > 1:
+            with Pool(workers, _init_snapshot_worker, initargs) as pool:
+                for times, positions in chunks:
+                    for now, snapshot in pool.imap(
+                        _build_snapshot,
+                        zip(times, positions),
+                        chunksize=max(1, len(times) // (4 * workers)),
+                    ):
+                        if verbose:
+                            print(f"\nBuilt topology at {now}")
+                        archive.write_snapshot(now, snapshot)
+        else:
+            _init_snapshot_worker(*initargs)
+            for times, positions in chunks:
+                for now, snapshot in map(_build_snapshot, zip(times, positions)):
+                    if verbose:
+                        print(f"\nBuilt topology at {now}")
+                    archive.write_snapshot(now, snapshot)
 
     if verbose:
-        print(f"The simulation took {(time.time() - start_time) / 60} minutes")
-
-    with open(config["output_file"], "w") as file:
-        json.dump(
-            {
-                "start_time": start_time,
-                "end_time": end_time,
-                "dt": dt,
-                "topologies": [topology.to_json() for topology in dyn_status],
-            },
-            file,
-            indent=4,
-            default=str,
-        )
-        print(f'\nTopology successfully saved to "{config["output_file"]}"')
+        print(f"The simulation took {(time.time() - s_time) / 60} minutes")
+
+    print(f'\nTopology successfully saved to "{config["output_file"]}"')
 
 
 def _version_callback(value: bool) -> None:
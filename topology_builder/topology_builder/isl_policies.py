@@ -0,0 +1,7 @@
+from enum import Enum
+
+class ISLPolicies(str, Enum):
+    # Intra-plane links and a link to the closer satellite of the next plane
+    GRID = "GRID"
+    INTRA_PLANE = "INTRA_PLANE"
+    NONE = "NONE"
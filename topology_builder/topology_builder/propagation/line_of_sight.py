@@ -0,0 +1,82 @@
+import numpy as np
+
+EARTH_RADIUS = 6378.14  # km
+
+
+def distance_matrix(positions: np.ndarray) -> np.ndarray:
+    """Computes the pairwise distances between positions
+
+    Args:
+        positions (np.ndarray): (N, 3) positions in km
+
+    Returns:
+        np.ndarray: (N, N) distances in km
+    """
+
+    gram = positions @ positions.T
+    squared_norms = np.diag(gram)
+
+    return np.sqrt(
+        np.maximum(squared_norms[:, None] + squared_norms[None, :] - 2 * gram, 0)
+    )
+
+
+def los_matrix(positions: np.ndarray) -> np.ndarray:
+    """Computes the pairwise line of sight between positions, i.e. whether the line
+    passing through two positions does not intersect the Earth
+
+    Args:
+        positions (np.ndarray): (N, 3) positions in km
+
+    Returns:
+        np.ndarray: (N, N) boolean matrix, False on the diagonal
+    """
+
+    gram = positions @ positions.T
+    squared_norms = np.diag(gram)
+
+    num = squared_norms[:, None] * squared_norms[None, :] - gram**2
+    den = squared_norms[:, None] + squared_norms[None, :] - 2 * gram
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        visible = np.sqrt(np.abs(num / den)) - EARTH_RADIUS > 0
+
+    np.fill_diagonal(visible, False)
+
+    return visible
+
+
+def distance(pos_u: np.ndarray, pos_v: np.ndarray) -> np.ndarray:
+    """Computes the distances between (broadcastable) arrays of positions
+
+    Args:
+        pos_u (np.ndarray): (..., 3) positions in km
+        pos_v (np.ndarray): (..., 3) positions in km
+
+    Returns:
+        np.ndarray: (...) distances in km
+    """
+
+    return np.linalg.norm(pos_u - pos_v, axis=-1)
+
+
+def los(pos_u: np.ndarray, pos_v: np.ndarray) -> np.ndarray:
+    """Computes the line of sight between (broadcastable) arrays of positions
+
+    Args:
+        pos_u (np.ndarray): (..., 3) positions in km
+        pos_v (np.ndarray): (..., 3) positions in km
+
+    Returns:
+        np.ndarray: (...) boolean array
+    """
+
+    uu = np.sum(pos_u * pos_u, axis=-1)
+    vv = np.sum(pos_v * pos_v, axis=-1)
+    uv = np.sum(pos_u * pos_v, axis=-1)
+
+    num = uu * vv - uv**2
+    den = uu + vv - 2 * uv
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(np.abs(num / den)) - EARTH_RADIUS > 0
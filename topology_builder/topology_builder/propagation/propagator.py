@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+import numpy as np
+from sgp4.api import SatrecArray
+from skyfield.api import EarthSatellite, Time
+from skyfield.constants import DAY_S
+from skyfield.sgp4lib import TEME
+from topology_builder.propagation.timescale import get_timescale
+
+# Time instants propagated per SGP4 call by iter_propagate_range
+RANGE_CHUNK_SIZE = 256
+
+
+def check_range(start_time: datetime, end_time: datetime, dt: int) -> None:
+    """Raises ValueError on a time grid that would never end or is empty"""
+
+    if dt <= 0:
+        raise ValueError(f"dt must be positive, not {dt}")
+
+    if end_time < start_time:
+        raise ValueError(f"end time {end_time} is before start time {start_time}")
+
+
+class ConstellationPropagator:
+    def __init__(self, satellites: List[EarthSatellite]) -> None:
+        self.satellites = satellites
+        self._satrec_array = SatrecArray([sat.model for sat in satellites])
+
+    def propagate(self, t: Time) -> np.ndarray:
+        """Propagates every satellite of the constellation with a single SGP4 call
+
+        Args:
+            t (Time): time instant, or array of T time instants, at which the constellation is propagated
+
+        Returns:
+            np.ndarray: (N, 3) GCRS positions in km, in the same order as the satellites, or (T, N, 3) if t is an array
+        """
+
+        # Same time conversion skyfield applies in EarthSatellite.at()
+        jd = np.atleast_1d(t.whole)
+        fraction = np.atleast_1d(t.tai_fraction - t._leap_seconds() / DAY_S)
+
+        _, teme, _ = self._satrec_array.sgp4(jd, fraction)  # (N, T, 3)
+
+        # TEME -> GCRS
+        rotation = TEME.rotation_at(t)
+
+        if rotation.ndim == 2:
+            return teme[:, 0, :] @ rotation
+
+        return np.einsum("jit,ntj->tni", rotation, teme)
+
+    def propagate_range(
+        self, start_time: datetime, end_time: datetime, dt: int
+    ) -> Tuple[List[datetime], np.ndarray]:
+        """Propagates every satellite over the whole [start_time, end_time] grid with a single SGP4 call
+
+        Args:
+            start_time (datetime): first time instant
+            end_time (datetime): last time instant, included
+            dt (int): time step in milliseconds
+
+        Returns:
+            Tuple[List[datetime], np.ndarray]: the T time instants of the grid and the (T, N, 3) GCRS positions in km
+        """
+
+        check_range(start_time, end_time, dt)
+
+        times = []
+        now = start_time
+
+        while now <= end_time:
+            times.append(now)
+            now += timedelta(milliseconds=dt)
+
+        return times, self.propagate(get_timescale().from_datetimes(times))
+
+    def iter_propagate_range(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        dt: int,
+        chunk_size: int = RANGE_CHUNK_SIZE,
+    ) -> Iterator[Tuple[List[datetime], np.ndarray]]:
+        """Propagates every satellite over the [start_time, end_time] grid, chunk_size time
+        instants per SGP4 call, so that memory does not grow with the length of the range
+
+        Args:
+            start_time (datetime): first time instant
+            end_time (datetime): last time instant, included
+            dt (int): time step in milliseconds
+            chunk_size (int): maximum number of time instants per chunk
+
+        Returns:
+            Iterator[Tuple[List[datetime], np.ndarray]]: the time instants of a chunk and their (T, N, 3) GCRS positions in km
+        """
+
+        # Checked on the call, not on the first chunk
+        check_range(start_time, end_time, dt)
+
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+
+        return self._iter_propagate_range(start_time, end_time, dt, chunk_size)
+
+    def _iter_propagate_range(
+        self, start_time: datetime, end_time: datetime, dt: int, chunk_size: int
+    ) -> Iterator[Tuple[List[datetime], np.ndarray]]:
+        now = start_time
+
+        while now <= end_time:
+            times = []
+
+            while now <= end_time and len(times) < chunk_size:
+                times.append(now)
+                now += timedelta(milliseconds=dt)
+
+            yield times, self.propagate(get_timescale().from_datetimes(times))
@@ -0,0 +1,14 @@
+from functools import cache
+from skyfield.api import load
+from skyfield.timelib import Timescale
+
+
+@cache
+def get_timescale() -> Timescale:
+    """Returns the timescale shared by the whole process, building one is expensive
+
+    Returns:
+        Timescale: the shared timescale
+    """
+
+    return load.timescale()
@@ -0,0 +1,84 @@
+"""
+Streaming readers of element set files, each yielding one EarthSatellite at a time:
+
+    3LE/TLE          : optional name line followed by the two TLE lines
+    CCSDS OMM (JSON) : list of OMM objects, as served e.g. by CelesTrak
+    CCSDS OMM (XML)  : ndm/omm documents, one segment per satellite
+    CCSDS OMM (CSV)  : header with the OMM keywords and one row per satellite
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterator
+import xml.etree.ElementTree as ET
+from skyfield.api import EarthSatellite
+from topology_builder.propagation.timescale import get_timescale
+
+
+def read_tle(file: Path) -> Iterator[EarthSatellite]:
+    ts = get_timescale()
+    name = None
+
+    with open(file, "r") as lines:
+        for line in lines:
+            line = line.strip()
+
+            if line.startswith("1 ") and len(line) >= 69:
+                line_2 = next(lines, "").strip()
+
+                if not line_2.startswith("2 "):
+                    raise ValueError(
+                        f"Truncated TLE record {name or line[2:7].strip()} in {file}"
+                    )
+
+                yield EarthSatellite(line, line_2, name, ts)
+                name = None
+            elif line:
+                # 3LE name lines may start with "0 "
+                name = line[2:] if line.startswith("0 ") else line
+
+
+def read_omm_json(file: Path) -> Iterator[EarthSatellite]:
+    ts = get_timescale()
+
+    with open(file, "r") as objects:
+        for fields in json.load(objects):
+            yield EarthSatellite.from_omm(ts, fields)
+
+
+def read_omm_xml(file: Path) -> Iterator[EarthSatellite]:
+    ts = get_timescale()
+
+    for _, element in ET.iterparse(file):
+        # Namespaces are ignored
+        if element.tag.rpartition("}")[2] != "segment":
+            continue
+
+        fields = {
+            field.tag.rpartition("}")[2]: field.text
+            for section in element.iter()
+            for field in section
+            if len(field) == 0
+        }
+
+        yield EarthSatellite.from_omm(ts, fields)
+
+        # Keep memory flat on large documents
+        element.clear()
+
+
+def read_omm_csv(file: Path) -> Iterator[EarthSatellite]:
+    ts = get_timescale()
+
+    with open(file, "r", newline="") as rows:
+        for fields in csv.DictReader(rows):
+            yield EarthSatellite.from_omm(ts, fields)
+
+
+READERS: Dict[str, Callable[[Path], Iterator[EarthSatellite]]] = {
+    "tle": read_tle,
+    "json": read_omm_json,
+    "xml": read_omm_xml,
+    "csv": read_omm_csv,
+}
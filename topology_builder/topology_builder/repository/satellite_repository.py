@@ -1,7 +1,93 @@
+from datetime import datetime
+import hashlib
+import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-from skyfield.api import load, EarthSatellite
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+from sgp4.api import WGS72, Satrec, SatrecArray
+from skyfield.api import EarthSatellite, utc
 from topology_builder.node_types import NodeTypes
+from topology_builder.propagation.timescale import get_timescale
+from topology_builder.repository import element_sets
+
+# (file, mtime, options) -> parsed constellation, shared by every repository of the process
+_constellation_cache: Dict[Tuple[Any, ...], List[Tuple[str, Dict[str, Any]]]] = dict()
+
+
+def _get_cached_constellation(
+    file: Path,
+    parse: Callable[[], List[Tuple[str, Dict[str, Any]]]],
+    *options: Any,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parses a constellation file once per process and again only if it is modified.
+    Satellite objects are shared, info dicts are copied.
+    """
+
+    key = (file.resolve(), file.stat().st_mtime_ns, *options)
+
+    if key not in _constellation_cache:
+        # Drop the constellation parsed from an older version of the file
+        for stale in [
+            cached
+            for cached in _constellation_cache
+            if cached[0] == key[0] and cached[2:] == key[2:]
+        ]:
+            del _constellation_cache[stale]
+
+        _constellation_cache[key] = parse()
+
+    return [(name, dict(info)) for name, info in _constellation_cache[key]]
+
+
+# (file, mtime) -> SHA-256 of the file
+_fingerprint_cache: Dict[Tuple[Path, int], str] = dict()
+
+
+def _get_file_fingerprint(file: Path, *options: Any) -> str:
+    key = (file.resolve(), file.stat().st_mtime_ns)
+
+    if key not in _fingerprint_cache:
+        _fingerprint_cache[key] = hashlib.sha256(file.read_bytes()).hexdigest()
+
+    return hashlib.sha256(
+        json.dumps([_fingerprint_cache[key], *options]).encode()
+    ).hexdigest()
+
+
+def _cluster(
+    values: np.ndarray, tolerance: float, period: float | None = None
+) -> np.ndarray:
+    """Labels values splitting them, once sorted, where consecutive values are more
+    than tolerance apart. Labels are increasing with the values.
+
+    Args:
+        values (np.ndarray): (N,) values
+        tolerance (float): maximum gap within a cluster
+        period (float, optional): period of circular values, e.g. 360 for angles in degrees
+
+    Returns:
+        np.ndarray: (N,) labels, from 0
+    """
+
+    labels = np.zeros(len(values), dtype=int)
+
+    if len(values) == 0:
+        return labels
+
+    order = np.argsort(values)
+
+    if period is not None:
+        # Start after the largest gap, so that no cluster straddles 0
+        gaps = np.diff(values[order], append=values[order[0]] + period)
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+
+    gaps = np.diff(values[order])
+    if period is not None:
+        gaps = np.mod(gaps, period)
+
+    labels[order] = np.concatenate([[0], np.cumsum(gaps > tolerance)])
+
+    return labels
 
 
 class SatelliteRepository:
@@ -11,6 +97,12 @@ class SatelliteRepository:
     def get_constellation() -> Dict[str, Any]:
         pass
 
+    def get_fingerprint(self) -> str:
+        """
+        Hash of the content of the constellation, equal for repositories returning the same satellites
+        """
+        pass
+
 
 class LeoSatelliteRepository(SatelliteRepository):
     def __init__(self) -> None:
@@ -53,6 +145,19 @@ class STKLeoSatelliteRepository(LeoSatelliteRepository):
         ]
 
     def get_constellation(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Returns the satellites of the constellation. The file is parsed once per
+        process and again only if it is modified; satellite objects are shared.
+
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: (name, info) of every satellite
+        """
+
+        return _get_cached_constellation(self.file, self._parse)
+
+    def get_fingerprint(self) -> str:
+        return _get_file_fingerprint(self.file, type(self).__name__)
+
+    def _parse(self) -> List[Tuple[str, Dict[str, Any]]]:
         with open(self.file, "r") as file:
             file.readline()  # First line is useless
 
@@ -73,7 +178,7 @@ class STKLeoSatelliteRepository(LeoSatelliteRepository):
                         sat_info["name"],
                         {
                             "skyfield_obj": EarthSatellite(
-                                line_1, line_2, sat_info["name"], load.timescale()
+                                line_1, line_2, sat_info["name"], get_timescale()
                             ),
                             "plane": sat_info["plane"],
                             "position_in_plane": sat_info["position_in_plane"],
@@ -85,3 +190,390 @@ class STKLeoSatelliteRepository(LeoSatelliteRepository):
                 [file.readline() for _ in range(2)]  # Last two lines are useless
 
         return satellites
+
+
+class ElementSetLeoSatelliteRepository(LeoSatelliteRepository):
+    """
+    Constellation from a 3LE/TLE or CCSDS OMM (JSON, XML, CSV) file of any size. Planes
+    and positions in plane are inferred from the orbits at the latest epoch of the file:
+    satellites are grouped by inclination and altitude into shells, then by RAAN into
+    planes, and ordered by argument of latitude within each plane. Objects out of LEO are
+    skipped.
+    """
+
+    MU = 398600.4418  # km^3 / s^2
+    EARTH_RADIUS = 6378.137  # km
+    MAX_LEO_ALTITUDE = 2000  # km
+
+    def __init__(
+        self,
+        file: Path,
+        format: str | None = None,
+        inclination_tolerance: float = 0.5,
+        altitude_tolerance: float = 25,
+        raan_tolerance: float = 1,
+    ) -> None:
+        """
+        Args:
+            file (Path): element set file, parsed lazily on the first get_constellation
+            format (str, optional): one of element_sets.READERS, from the file suffix if not given
+            inclination_tolerance (float): maximum inclination gap in a group, in degrees
+            altitude_tolerance (float): maximum altitude gap in a group, in km
+            raan_tolerance (float): maximum RAAN gap in a plane, in degrees
+        """
+
+        if not file.exists():
+            raise Exception(f"{file} does not exist")
+        super().__init__()
+
+        self.file: Path = file
+        self.format = format or (
+            file.suffix[1:].lower()
+            if file.suffix[1:].lower() in element_sets.READERS
+            else "tle"
+        )
+
+        if self.format not in element_sets.READERS:
+            raise ValueError(f"Unknown element set format {self.format}")
+
+        self.inclination_tolerance = inclination_tolerance
+        self.altitude_tolerance = altitude_tolerance
+        self.raan_tolerance = raan_tolerance
+
+    def get_constellation(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Returns the satellites of the constellation. The file is parsed once per
+        process and again only if it is modified; satellite objects are shared.
+
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: (name, info) of every satellite, by plane and position in plane
+        """
+
+        return _get_cached_constellation(
+            self.file,
+            self._parse,
+            self.format,
+            self.inclination_tolerance,
+            self.altitude_tolerance,
+            self.raan_tolerance,
+        )
+
+    def get_fingerprint(self) -> str:
+        return _get_file_fingerprint(
+            self.file,
+            type(self).__name__,
+            self.format,
+            self.inclination_tolerance,
+            self.altitude_tolerance,
+            self.raan_tolerance,
+        )
+
+    def _get_orbits(self, satellites: List[EarthSatellite]) -> Dict[str, np.ndarray]:
+        """
+        Inclination, altitude, RAAN and argument of latitude of every satellite, in
+        degrees and km, from the TEME state at the latest epoch
+        """
+
+        jd = max(sat.model.jdsatepoch + sat.model.jdsatepochF for sat in satellites)
+
+        _, r, v = SatrecArray([sat.model for sat in satellites]).sgp4(
+            np.array([jd]), np.zeros(1)
+        )
+        r, v = r[:, 0], v[:, 0]
+
+        h = np.cross(r, v)
+        h /= np.linalg.norm(h, axis=-1, keepdims=True)
+
+        raan = np.arctan2(h[:, 0], -h[:, 1])
+        node = np.stack([np.cos(raan), np.sin(raan), np.zeros(len(raan))], axis=-1)
+
+        argument_of_latitude = np.arctan2(
+            np.sum(np.cross(node, r) * h, axis=-1), np.sum(node * r, axis=-1)
+        )
+
+        semi_major_axis = np.cbrt(
+            self.MU / (np.array([sat.model.no_kozai for sat in satellites]) / 60) ** 2
+        )
+
+        return {
+            "inclination": np.degrees(np.arccos(np.clip(h[:, 2], -1, 1))),
+            "altitude": semi_major_axis - self.EARTH_RADIUS,
+            "raan": np.degrees(raan) % 360,
+            "argument_of_latitude": np.degrees(argument_of_latitude) % 360,
+        }
+
+    def _parse(self) -> List[Tuple[str, Dict[str, Any]]]:
+        satellites: List[EarthSatellite] = []
+
+        for sat in element_sets.READERS[self.format](self.file):
+            # Mean motion in rad/min
+            altitude = (
+                np.cbrt(self.MU / (sat.model.no_kozai / 60) ** 2) - self.EARTH_RADIUS
+            )
+            if altitude <= self.MAX_LEO_ALTITUDE:
+                satellites.append(sat)
+
+        if len(satellites) == 0:
+            return []
+
+        orbits = self._get_orbits(satellites)
+
+        inclinations = _cluster(orbits["inclination"], self.inclination_tolerance)
+        altitudes = np.empty(len(satellites), dtype=int)
+        for inclination in np.unique(inclinations):
+            members = np.flatnonzero(inclinations == inclination)
+            altitudes[members] = _cluster(
+                orbits["altitude"][members], self.altitude_tolerance
+            )
+
+        # Every (inclination, altitude) pair is a group
+        groups = np.unique(
+            np.stack([inclinations, altitudes], axis=1), axis=0, return_inverse=True
+        )[1].reshape(-1)
+
+        # Every group is a shell
+        shells = np.empty(len(satellites), dtype=int)
+        planes = np.empty(len(satellites), dtype=int)
+        no_planes = 0
+        for shell, group in enumerate(np.unique(groups)):
+            members = np.flatnonzero(groups == group)
+            shells[members] = shell
+            planes[members] = no_planes + _cluster(
+                orbits["raan"][members], self.raan_tolerance, period=360
+            )
+            no_planes = planes[members].max() + 1
+
+        constellation = []
+        names = set()
+
+        for plane in range(no_planes):
+            members = np.flatnonzero(planes == plane)
+            members = members[np.argsort(orbits["argument_of_latitude"][members])]
+
+            for position_in_plane, i in enumerate(members):
+                sat = satellites[i]
+
+                # Names are not unique, e.g. debris or missing 3LE name lines
+                name = sat.name or str(sat.model.satnum)
+                if name in names:
+                    name = f"{name}_{sat.model.satnum}"
+                while name in names:
+                    name = f"{name}_"
+                names.add(name)
+
+                constellation.append(
+                    (
+                        name,
+                        {
+                            "skyfield_obj": sat,
+                            "plane": plane,
+                            "position_in_plane": position_in_plane,
+                            "shell": int(shells[i]),
+                            "type": NodeTypes.LEO_SATELLITE,
+                        },
+                    )
+                )
+
+        return constellation
+
+
+class WalkerLeoSatelliteRepository(LeoSatelliteRepository):
+    """
+    Synthetic Walker constellation i:T/P/F of circular orbits: P planes of T/P satellites,
+    with RAANs spread over 360 degrees (delta) or 180 degrees (star) and a phase offset of
+    F * 360 / T degrees between satellites of adjacent planes.
+    """
+
+    MU = 398600.4418  # km^3 / s^2
+    EARTH_RADIUS = 6378.137  # km
+    # SGP4 epochs are days from 1949 December 31 00:00 UT
+    SGP4_EPOCH = datetime(1949, 12, 31, tzinfo=utc)
+
+    def __init__(
+        self,
+        no_planes: int,
+        no_sat_per_plane: int,
+        inclination: float,
+        altitude: float,
+        phasing: int = 0,
+        pattern: str = "delta",
+        epoch: datetime = datetime(2023, 9, 12, tzinfo=utc),
+        name: str = "Walker",
+    ) -> None:
+        """
+        Args:
+            no_planes (int): P
+            no_sat_per_plane (int): T / P
+            inclination (float): i, in degrees
+            altitude (float): in km
+            phasing (int): F, in [0, P)
+            pattern (str): "delta" or "star"
+            epoch (datetime): epoch of the elements
+            name (str): satellites are named <name>_<plane>_<position in plane>
+        """
+
+        if pattern not in ("delta", "star"):
+            raise ValueError(f"Unknown Walker pattern {pattern}")
+        if not 0 <= phasing < max(no_planes, 1):
+            raise ValueError(f"Phasing must be in [0, {no_planes})")
+        super().__init__()
+
+        self.no_planes = no_planes
+        self.no_sat_per_plane = no_sat_per_plane
+        self.inclination = inclination
+        self.altitude = altitude
+        self.phasing = phasing
+        self.pattern = pattern
+        self.epoch = epoch
+        self.name = name
+        self._constellation: List[Tuple[str, Dict[str, Any]]] | None = None
+
+    def get_elements(self) -> Dict[str, np.ndarray]:
+        """Mean elements of every satellite, plane by plane
+
+        Returns:
+            Dict[str, np.ndarray]: plane, position_in_plane, and raan, mean_anomaly in radians
+        """
+
+        planes, positions = np.divmod(
+            np.arange(self.no_planes * self.no_sat_per_plane), self.no_sat_per_plane
+        )
+        raan_spread = 2 * np.pi if self.pattern == "delta" else np.pi
+
+        return {
+            "plane": planes,
+            "position_in_plane": positions,
+            "raan": planes * raan_spread / self.no_planes,
+            "mean_anomaly": np.mod(
+                2 * np.pi * positions / self.no_sat_per_plane
+                + 2 * np.pi * self.phasing * planes / len(planes),
+                2 * np.pi,
+            ),
+        }
+
+    def get_constellation(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Returns the satellites of the constellation, generated once
+
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: (name, info) of every satellite, by plane and position in plane
+        """
+
+        if self._constellation is None:
+            self._constellation = self._generate()
+
+        return [(name, dict(info)) for name, info in self._constellation]
+
+    def get_fingerprint(self) -> str:
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    type(self).__name__,
+                    self.no_planes,
+                    self.no_sat_per_plane,
+                    self.inclination,
+                    self.altitude,
+                    self.phasing,
+                    self.pattern,
+                    self.epoch.isoformat(),
+                    self.name,
+                ]
+            ).encode()
+        ).hexdigest()
+
+    def _generate(self) -> List[Tuple[str, Dict[str, Any]]]:
+        ts = get_timescale()
+        elements = self.get_elements()
+
+        # Mean motion in rad/min
+        mean_motion = (
+            np.sqrt(self.MU / (self.EARTH_RADIUS + self.altitude) ** 3) * 60
+        )
+        epoch = (self.epoch - self.SGP4_EPOCH).total_seconds() / 86400
+
+        constellation = []
+
+        for i, (plane, position_in_plane, raan, mean_anomaly) in enumerate(
+            zip(
+                elements["plane"].tolist(),
+                elements["position_in_plane"].tolist(),
+                elements["raan"].tolist(),
+                elements["mean_anomaly"].tolist(),
+            )
+        ):
+            satrec = Satrec()
+            satrec.sgp4init(
+                WGS72,
+                "i",
+                i + 1,
+                epoch,
+                0.0,  # bstar
+                0.0,  # ndot
+                0.0,  # nddot
+                0.0,  # eccentricity
+                0.0,  # argument of perigee
+                np.radians(self.inclination),
+                mean_anomaly,
+                mean_motion,
+                raan,
+            )
+
+            name = f"{self.name}_{plane}_{position_in_plane}"
+            sat = EarthSatellite.from_satrec(satrec, ts)
+            sat.name = name
+
+            constellation.append(
+                (
+                    name,
+                    {
+                        "skyfield_obj": sat,
+                        "plane": plane,
+                        "position_in_plane": position_in_plane,
+                        "type": NodeTypes.LEO_SATELLITE,
+                    },
+                )
+            )
+
+        return constellation
+
+
+class MultiShellLeoSatelliteRepository(LeoSatelliteRepository):
+    """
+    Constellation made of the shells of other repositories, e.g. Walker constellations at
+    different altitudes and inclinations. The i-th repository is shell i; planes are
+    numbered across shells, in order.
+    """
+
+    def __init__(self, shells: List[LeoSatelliteRepository]) -> None:
+        super().__init__()
+        self.shells = shells
+
+    def get_constellation(self) -> List[Tuple[str, Dict[str, Any]]]:
+        constellation = []
+        names = set()
+        plane_offset = 0
+
+        for shell, repository in enumerate(self.shells):
+            satellites = repository.get_constellation()
+
+            # Planes of the next shell are numbered from those of this one
+            if len(satellites) == 0:
+                raise ValueError(f"Shell {shell} has no satellites")
+
+            for name, info in satellites:
+                if name in names:
+                    raise ValueError(f"Satellite {name} is in more than one shell")
+                names.add(name)
+
+                info["shell"] = shell
+                info["plane"] += plane_offset
+
+            constellation.extend(satellites)
+            plane_offset = max([info["plane"] for _, info in satellites]) + 1
+
+        return constellation
+
+    def get_fingerprint(self) -> str:
+        return hashlib.sha256(
+            json.dumps(
+                [type(self).__name__] + [shell.get_fingerprint() for shell in self.shells]
+            ).encode()
+        ).hexdigest()
@@ -1,52 +1,102 @@
 from datetime import datetime
+import io
 import os
 from pathlib import Path
 from flask import Flask, Response
 from flask import request
-import sys
-import requests
-from topology_builder.builder.min_distance_topology_builder import MinimumDistanceTopologyBuilder
-from topology_builder.repository.satellite_repository import STKLeoSatelliteRepository
+from topology_builder import builds
+from topology_builder.propagation.propagator import ConstellationPropagator
+from topology_builder.topology import archive
+from topology_builder.topology.snapshot_cache import SnapshotCache
 
 app = Flask(__name__)
 
-BASE_CITY_API_URL = os.environ.get('BASE_CITY_API_URL')
-CITY_SVC_API_KEY = Path(os.environ.get('CITY_SVC_API_KEY_FILE')).read_text()
-GS_S = []
+SNAPSHOT_CACHE = SnapshotCache(
+    Path(os.environ.get('SNAPSHOT_CACHE_FILE', './cache/snapshots.sqlite')),
+    max_bytes=int(os.environ.get('SNAPSHOT_CACHE_MAX_BYTES', 1 << 30)),
+    max_entries=int(os.environ.get('SNAPSHOT_CACHE_MAX_ENTRIES', 100_000)),
+)
+
+
+def get_ground_stations():
+    # Every request has its own GSs
+    return builds.get_ground_stations(
+        [city.strip() for city in request.args.get("cities").split(',')]
+    )
 
 @app.route("/topology_builder/min_dist_topo_builder/<string:topo_name>")
 def hello_world(topo_name: str):
-    t = request.args.get('t')
-    
-    if len(GS_S) == 0:
-        cities: str = [city.strip() for city in request.args.get("cities").split(',')]
-
-        for city in cities:
-            response = requests.get(
-                f"{BASE_CITY_API_URL}?name={city}", headers={"X-Api-Key": CITY_SVC_API_KEY}
-            )
-
-            GS_S.append({
-                'name' : response.json()[0]['name'],
-                'lat' : response.json()[0]['latitude'],
-                'lon' : response.json()[0]['longitude'],
-            })
-
-    network = (
-            MinimumDistanceTopologyBuilder(
-                verbose=True,
-                name=topo_name,
-                t=datetime.strptime(t, '%Y-%m-%d %H:%M:%S %z'),
-            )
-            .add_LEO_constellation(
-                STKLeoSatelliteRepository(Path("./constellations/Iridium_TLE.txt"))
-            )
-            .add_GSs(GS_S)
-            .add_ISLs()
-            .add_GSLs()
-            .build()
-        )
-    return Response(str(network), mimetype='application/json')
+    t = datetime.strptime(request.args.get('t'), builds.TIME_FORMAT)
+    gs_s = get_ground_stations()
+    walker = request.args.get('walker')
+    altitude = float(request.args.get('altitude', 550))
+    binary = request.args.get('format') == 'binary'
+
+    key = builds.get_snapshot_key(topo_name, t, gs_s, walker, altitude, binary)
+
+    cached = SNAPSHOT_CACHE.get(key)
+    if cached is not None:
+        data, mimetype = cached
+        return Response(data, mimetype=mimetype)
+
+    data, mimetype = builds.build_snapshot(topo_name, t, gs_s, walker, altitude, binary)
+
+    SNAPSHOT_CACHE.put(key, data, mimetype)
+
+    return Response(data, mimetype=mimetype)
+
+@app.route("/topology_builder/min_dist_topo_builder/<string:topo_name>/range")
+def topology_range(topo_name: str):
+    """
+    Snapshots from start to end, every dt milliseconds, streamed as a topology archive.
+    keyframe_interval=1 streams full snapshots, larger values stream deltas in between.
+    """
+    try:
+        start = datetime.strptime(request.args.get('start'), builds.TIME_FORMAT)
+        end = datetime.strptime(request.args.get('end'), builds.TIME_FORMAT)
+        dt = int(request.args.get('dt', 1000))
+        keyframe_interval = int(request.args.get('keyframe_interval', 60))
+
+        builds.check_range(start, end, dt, keyframe_interval)
+    except ValueError as e:
+        return Response(str(e), status=400)
+
+    gs_s = get_ground_stations()
+    walker = request.args.get('walker')
+    altitude = float(request.args.get('altitude', 550))
+    repository = builds.get_repository(walker, altitude)
+
+    # Propagate the constellation a chunk of time instants at a time, as the stream goes
+    chunks = ConstellationPropagator(
+        [info["skyfield_obj"] for _, info in repository.get_constellation()]
+    ).iter_propagate_range(start, end, dt)
+
+    def generate():
+        stream = io.BytesIO()
+        writer = archive.TopologyArchiveWriter(stream, keyframe_interval=keyframe_interval)
+
+        for times, positions in chunks:
+            for now, snapshot_positions in zip(times, positions):
+                writer.write(
+                    builds.build_topology(
+                        topo_name,
+                        now,
+                        gs_s,
+                        walker,
+                        altitude,
+                        positions=snapshot_positions,
+                    )
+                )
+
+                # Send every snapshot as soon as it is built
+                yield stream.getvalue()
+                stream.seek(0)
+                stream.truncate()
+
+        writer.close()
+        yield stream.getvalue()
+
+    return Response(generate(), mimetype=archive.MIMETYPE)
 
 if __name__ == '__main__':
     app.run()
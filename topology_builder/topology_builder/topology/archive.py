@@ -0,0 +1,328 @@
+"""
+Delta-encoded, append-only archive of a time series of topologies.
+
+    magic | record | record | ... | end record | index | trailer
+
+Every record is a keyframe, i.e. the full topology in binary_format, or the delta of the
+edges w.r.t. the previous record: removed edges, added edges with their length and edges
+whose length drifted by more than length_tolerance km since it was last stored. Edges are
+pairs of node indices of the last keyframe; a keyframe is written every keyframe_interval
+records and whenever the set of nodes changes.
+
+The end record and the index (timestamp, kind, offset of every record) are written on
+close, so that any snapshot can be rebuilt from the closest keyframe before it. Archives
+that were not closed are indexed by scanning the records, and archives streamed over the
+network can be consumed record by record up to the end record.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timezone
+import mmap
+from pathlib import Path
+import struct
+from typing import BinaryIO, Dict, List, Self, Tuple
+import networkx as nx
+import numpy as np
+from topology_builder.topology import binary_format
+from topology_builder.topology.topology import Topology
+
+MAGIC = b"TOPA"
+INDEX_MAGIC = b"TIDX"
+MIMETYPE = "application/x-topology-archive"
+
+KEYFRAME = 0
+DELTA = 1
+END = 2
+
+_RECORD = struct.Struct("<Bdq")  # kind, POSIX timestamp, payload size
+_DELTA_COUNTS = struct.Struct("<III")  # removed, added, updated
+_TRAILER = struct.Struct("<qI4s")  # index offset, number of records, magic
+_INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("kind", "<u1"), ("offset", "<i8")])
+
+Edges = Dict[Tuple[int, int], float]
+
+
+def _get_edges(arrays: Dict[str, np.ndarray]) -> Edges:
+    sources = np.repeat(np.arange(len(arrays["node_type"])), np.diff(arrays["indptr"]))
+    # Both directions are stored, keep u < v
+    mask = sources < arrays["indices"]
+
+    return dict(
+        zip(
+            zip(sources[mask].tolist(), arrays["indices"][mask].tolist()),
+            arrays["length"][mask].tolist(),
+        )
+    )
+
+
+def _encode_delta(removed: List[Tuple[int, int]], added: Edges, updated: Edges) -> bytes:
+    return b"".join(
+        [
+            _DELTA_COUNTS.pack(len(removed), len(added), len(updated)),
+            np.array(removed, dtype="<i4").reshape(-1, 2).tobytes(),
+            np.array(list(added), dtype="<i4").reshape(-1, 2).tobytes(),
+            np.array(list(added.values()), dtype="<f8").tobytes(),
+            np.array(list(updated), dtype="<i4").reshape(-1, 2).tobytes(),
+            np.array(list(updated.values()), dtype="<f8").tobytes(),
+        ]
+    )
+
+
+def _decode_delta(payload: bytes) -> Tuple[np.ndarray, Edges, Edges]:
+    n_removed, n_added, n_updated = _DELTA_COUNTS.unpack_from(payload)
+
+    offset = _DELTA_COUNTS.size
+    arrays = []
+    for dtype, count in [
+        ("<i4", 2 * n_removed),
+        ("<i4", 2 * n_added),
+        ("<f8", n_added),
+        ("<i4", 2 * n_updated),
+        ("<f8", n_updated),
+    ]:
+        arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+        offset += arrays[-1].nbytes
+
+    removed, added, added_length, updated, updated_length = arrays
+
+    return (
+        removed.reshape(-1, 2),
+        dict(zip(map(tuple, added.reshape(-1, 2).tolist()), added_length.tolist())),
+        dict(zip(map(tuple, updated.reshape(-1, 2).tolist()), updated_length.tolist())),
+    )
+
+
+class TopologyArchiveWriter:
+    def __init__(
+        self,
+        file: Path | BinaryIO,
+        keyframe_interval: int = 60,
+        length_tolerance: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            file (Path | BinaryIO): archive file, or stream the archive is written to
+            keyframe_interval (int): records between two keyframes, 1 for keyframes only
+            length_tolerance (float): length drift, in km, below which lengths are not updated
+        """
+
+        if keyframe_interval < 1:
+            raise ValueError(
+                f"keyframe_interval must be at least 1, not {keyframe_interval}"
+            )
+
+        # Streams are not closed by close()
+        self._owns_file = isinstance(file, Path)
+        self.file: BinaryIO = open(file, "wb") if self._owns_file else file
+        self.keyframe_interval = keyframe_interval
+        self.length_tolerance = length_tolerance
+
+        self._index: List[Tuple[float, int, int]] | None = []
+        self._nodes: List[str] = []
+        # Edges as stored in the archive, i.e. as a reader rebuilds them
+        self._edges: Edges = dict()
+        self._since_keyframe = 0
+        # Streams may not support tell()
+        self._offset = 0
+
+        self._write(MAGIC)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self._offset += len(data)
+
+    def _write_record(self, kind: int, timestamp: float, payload: bytes) -> None:
+        self._index.append((timestamp, kind, self._offset))
+        self._write(_RECORD.pack(kind, timestamp, len(payload)))
+        self._write(payload)
+
+    def write(self, topology: Topology) -> None:
+        """Appends a topology, which must be later than the ones already written
+
+        Args:
+            topology (Topology): the snapshot
+        """
+
+        self.write_snapshot(topology.t.utc_datetime(), topology.to_bytes())
+
+    def write_snapshot(self, t: datetime, snapshot: bytes) -> None:
+        """Appends a topology already encoded with Topology.to_bytes()
+
+        Args:
+            t (datetime): time instant of the snapshot
+            snapshot (bytes): the encoded snapshot
+        """
+
+        timestamp = t.timestamp()
+        header, arrays = binary_format.decode(snapshot)
+        edges = _get_edges(arrays)
+
+        if (
+            self._since_keyframe % self.keyframe_interval == 0
+            or header["nodes"] != self._nodes
+        ):
+            self._nodes = header["nodes"]
+            self._edges = edges
+            self._since_keyframe = 1
+
+            self._write_record(KEYFRAME, timestamp, snapshot)
+            return
+
+        removed = [edge for edge in self._edges if edge not in edges]
+        added = {edge: length for edge, length in edges.items() if edge not in self._edges}
+        updated = {
+            edge: length
+            for edge, length in edges.items()
+            if edge in self._edges
+            and abs(length - self._edges[edge]) > self.length_tolerance
+        }
+
+        for edge in removed:
+            del self._edges[edge]
+        self._edges.update(added)
+        self._edges.update(updated)
+        self._since_keyframe += 1
+
+        self._write_record(DELTA, timestamp, _encode_delta(removed, added, updated))
+
+    def close(self) -> None:
+        if self._index is None:
+            return
+
+        self._write(_RECORD.pack(END, 0, 0))
+
+        index_offset = self._offset
+        self._write(np.array(self._index, dtype=_INDEX_DTYPE).tobytes())
+        self._write(_TRAILER.pack(index_offset, len(self._index), INDEX_MAGIC))
+        self._index = None
+
+        if self._owns_file:
+            self.file.close()
+
+
+class TopologyArchiveReader:
+    def __init__(self, file: Path | bytes) -> None:
+        """
+        Args:
+            file (Path | bytes): archive, files are memory-mapped so that only the records
+                that are accessed are read
+        """
+
+        self._mmap = None
+
+        if isinstance(file, Path):
+            with open(file, "rb") as f:
+                if f.seek(0, 2) == 0:
+                    raise ValueError("Not a topology archive")
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.buffer = memoryview(file if self._mmap is None else self._mmap)
+
+        if bytes(self.buffer[: len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError("Not a topology archive")
+
+        # Copied, so that the mapping can be closed
+        self.index = self._read_index().copy()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.buffer.release()
+
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def _read_index(self) -> np.ndarray:
+        if len(self.buffer) >= len(MAGIC) + _TRAILER.size:
+            index_offset, count, magic = _TRAILER.unpack_from(
+                self.buffer, len(self.buffer) - _TRAILER.size
+            )
+            if magic == INDEX_MAGIC:
+                return np.frombuffer(
+                    self.buffer, dtype=_INDEX_DTYPE, count=count, offset=index_offset
+                )
+
+        # Not closed, scan the records
+        index = []
+        offset = len(MAGIC)
+        while offset + _RECORD.size <= len(self.buffer):
+            kind, timestamp, size = _RECORD.unpack_from(self.buffer, offset)
+            if kind == END or offset + _RECORD.size + size > len(self.buffer):
+                break
+            index.append((timestamp, kind, offset))
+            offset += _RECORD.size + size
+
+        return np.array(index, dtype=_INDEX_DTYPE)
+
+    def _read_record(self, i: int) -> memoryview:
+        offset = int(self.index["offset"][i])
+        _, _, size = _RECORD.unpack_from(self.buffer, offset)
+        return self.buffer[offset + _RECORD.size : offset + _RECORD.size + size]
+
+    def get_timestamps(self) -> List[datetime]:
+        return [
+            datetime.fromtimestamp(timestamp, tz=timezone.utc)
+            for timestamp in self.index["timestamp"]
+        ]
+
+    def get(self, t: datetime) -> nx.Graph:
+        """Rebuilds the latest snapshot at or before t. Node attributes are those of the
+        keyframe the snapshot is rebuilt from.
+
+        Args:
+            t (datetime): time instant
+
+        Returns:
+            nx.Graph: the topology, with name and t as graph attributes
+        """
+
+        i = bisect_right(self.index["timestamp"], t.timestamp()) - 1
+
+        if i < 0:
+            raise KeyError(f"No topology at or before {t}")
+
+        keyframe = i
+        while self.index["kind"][keyframe] != KEYFRAME:
+            keyframe -= 1
+
+        header, arrays = binary_format.decode(self._read_record(keyframe))
+        nodes = header["nodes"]
+
+        edges = _get_edges(arrays)
+
+        for record in range(keyframe + 1, i + 1):
+            removed, added, updated = _decode_delta(self._read_record(record))
+            for u, v in removed.tolist():
+                del edges[u, v]
+            edges.update(added)
+            edges.update(updated)
+
+        graph = nx.Graph(
+            name=header["name"],
+            t=datetime.fromtimestamp(self.index["timestamp"][i], tz=timezone.utc),
+        )
+
+        for j, node in enumerate(nodes):
+            graph.add_node(
+                node,
+                type=binary_format.NODE_TYPES[arrays["node_type"][j]],
+                latitude=float(arrays["latitude"][j]),
+                longitude=float(arrays["longitude"][j]),
+            )
+
+        graph.add_edges_from(
+            (nodes[u], nodes[v], {"length": length}) for (u, v), length in edges.items()
+        )
+
+        return graph
@@ -0,0 +1,140 @@
+"""
+Compact binary snapshot format of a Topology.
+
+    magic (4 bytes) | version (uint32) | header size (uint32) | header (JSON) | arrays
+
+The JSON header holds the scalar fields, the node names and, for every array, its
+dtype, shape and offset from the beginning of the buffer. Arrays are little-endian,
+8-byte aligned, so that they can be loaded with np.frombuffer without copies:
+
+    node_type, latitude, longitude, height, plane, position_in_plane, shell : node table
+    indptr, indices, length                                          : edges in CSR form,
+                                                                       both directions
+"""
+
+import json
+import struct
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from topology_builder.node_types import NodeTypes
+
+MAGIC = b"TOPO"
+VERSION = 1
+MIMETYPE = "application/x-topology"
+
+NODE_TYPES: List[NodeTypes] = [NodeTypes.GROUD_STATION, NodeTypes.LEO_SATELLITE]
+
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGNMENT = 8
+
+
+def _pad(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def encode(
+    header: Dict[str, Any], nodes: List[Tuple[str, Dict[str, Any]]], adj: Dict[str, Dict[str, Any]]
+) -> bytes:
+    """Encodes a topology snapshot
+
+    Args:
+        header (Dict[str, Any]): JSON serializable scalar fields of the snapshot
+        nodes (List[Tuple[str, Dict[str, Any]]]): node names and attributes
+        adj (Dict[str, Dict[str, Any]]): adjacency with a "length" attribute per edge
+
+    Returns:
+        bytes: the encoded snapshot
+    """
+
+    index = {node: i for i, (node, _) in enumerate(nodes)}
+
+    indptr = np.zeros(len(nodes) + 1, dtype="<i8")
+    indptr[1:] = np.cumsum([len(adj[node]) for node, _ in nodes])
+
+    arrays = {
+        "node_type": np.array(
+            [NODE_TYPES.index(info["type"]) for _, info in nodes], dtype="<u1"
+        ),
+        "latitude": np.array(
+            [info.get("latitude", np.nan) for _, info in nodes], dtype="<f8"
+        ),
+        "longitude": np.array(
+            [info.get("longitude", np.nan) for _, info in nodes], dtype="<f8"
+        ),
+        "height": np.array([info.get("height", np.nan) for _, info in nodes], dtype="<f8"),
+        "plane": np.array([info.get("plane", -1) for _, info in nodes], dtype="<i4"),
+        "position_in_plane": np.array(
+            [info.get("position_in_plane", -1) for _, info in nodes], dtype="<i4"
+        ),
+        "shell": np.array([info.get("shell", -1) for _, info in nodes], dtype="<i4"),
+        "indptr": indptr,
+        "indices": np.array(
+            [index[v] for node, _ in nodes for v in adj[node]], dtype="<i4"
+        ),
+        "length": np.array(
+            [adj[node][v]["length"] for node, _ in nodes for v in adj[node]],
+            dtype="<f8",
+        ),
+    }
+
+    header = dict(header, nodes=[node for node, _ in nodes], arrays=dict())
+
+    # Offsets depend on the header size, which depends on the offsets
+    offset = 0
+    while True:
+        position = offset
+        for name, array in arrays.items():
+            header["arrays"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": position,
+            }
+            position += array.nbytes + _pad(array.nbytes)
+
+        encoded_header = json.dumps(header).encode()
+        header_end = _PREAMBLE.size + len(encoded_header)
+        if header_end + _pad(header_end) == offset:
+            break
+        offset = header_end + _pad(header_end)
+
+    chunks = [
+        _PREAMBLE.pack(MAGIC, VERSION, len(encoded_header)),
+        encoded_header,
+        bytes(_pad(header_end)),
+    ]
+
+    for array in arrays.values():
+        chunks.append(array.tobytes())
+        chunks.append(bytes(_pad(array.nbytes)))
+
+    return b"".join(chunks)
+
+
+def decode(buffer: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Decodes a topology snapshot, arrays are read-only views on buffer
+
+    Args:
+        buffer (bytes): the encoded snapshot
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, np.ndarray]]: header and arrays
+    """
+
+    magic, version, header_size = _PREAMBLE.unpack_from(buffer)
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a topology snapshot or unsupported version")
+
+    header = json.loads(bytes(buffer[_PREAMBLE.size : _PREAMBLE.size + header_size]))
+
+    arrays = {
+        name: np.frombuffer(
+            buffer,
+            dtype=np.dtype(spec["dtype"]),
+            count=int(np.prod(spec["shape"])),
+            offset=spec["offset"],
+        ).reshape(spec["shape"])
+        for name, spec in header["arrays"].items()
+    }
+
+    return header, arrays
@@ -0,0 +1,133 @@
+"""
+Persistent, content-addressed cache of serialized topology snapshots, backed by SQLite.
+
+Keys are hashes of everything a snapshot depends on, e.g. the fingerprint of the
+constellation, the builder, t and the GSs, so entries never need to be invalidated. The
+least recently used entries are evicted once the cache exceeds max_bytes or max_entries.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+from threading import Lock
+import time
+from typing import Any, Tuple
+
+
+class SnapshotCache:
+    def __init__(
+        self, file: Path, max_bytes: int = 1 << 30, max_entries: int = 100_000
+    ) -> None:
+        """
+        Args:
+            file (Path): SQLite database, created if it does not exist
+            max_bytes (int): maximum total size of the snapshots
+            max_entries (int): maximum number of snapshots
+        """
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = Lock()
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the threads of the service, serialized by _lock
+        self._connection = sqlite3.connect(file, timeout=30, check_same_thread=False)
+        # Readers do not block the writer, even across processes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                key TEXT PRIMARY KEY,
+                mimetype TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS snapshots_last_access ON snapshots (last_access)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Content address of a snapshot
+
+        Args:
+            parts (Any): JSON serializable values the snapshot depends on
+
+        Returns:
+            str: SHA-256 of the parts
+        """
+
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Tuple[bytes, str] | None:
+        """Returns the snapshot and its mimetype, None if not cached"""
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, mimetype FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self._connection.execute(
+                "UPDATE snapshots SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._connection.commit()
+
+        return bytes(row[0]), row[1]
+
+    def put(self, key: str, data: bytes, mimetype: str) -> None:
+        """Stores a snapshot, evicting the least recently used ones if needed"""
+
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (key, mimetype, data, len(data), time.time()),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        size, entries = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM snapshots"
+        ).fetchone()
+
+        if size <= self.max_bytes and entries <= self.max_entries:
+            return
+
+        evicted = []
+        for key, entry_size in self._connection.execute(
+            "SELECT key, size FROM snapshots ORDER BY last_access"
+        ):
+            if size <= self.max_bytes and entries <= self.max_entries:
+                break
+            evicted.append((key,))
+            size -= entry_size
+            entries -= 1
+
+        self._connection.executemany("DELETE FROM snapshots WHERE key = ?", evicted)
+
+    def get_size(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM snapshots"
+            ).fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
@@ -1,7 +1,9 @@
+from bisect import bisect_left, insort
 import random
-from typing import List, Self, Tuple
+from typing import Any, Dict, List, Self, Tuple
 import networkx as nx, json
 from skyfield.api import wgs84, Time
+from skyfield.constants import AU_KM
 import matplotlib.pyplot as plt
 
 #from mpl_toolkits.basemap import Basemap
@@ -9,7 +11,22 @@ import numpy as np
 from itertools import chain, cycle
 import matplotlib.colors as mcolors
 from topology_builder.node_types import NodeTypes
-from skyfield.positionlib import ICRF
+from topology_builder.topology import binary_format
+from skyfield.positionlib import ICRF, build_position
+
+
+class TopologyDelta:
+    def __init__(self) -> None:
+        # edge -> length
+        self.added: Dict[Tuple[str, str], float] = dict()
+        self.updated: Dict[Tuple[str, str], float] = dict()
+        self.removed: List[Tuple[str, str]] = []
+
+    def __str__(self) -> str:
+        return f"TopologyDelta: {len(self.added)} added, {len(self.removed)} removed, {len(self.updated)} updated"
+
+    def __repr__(self) -> str:
+        return self.__str__()
 
 
 class Topology:
@@ -19,6 +36,21 @@ class Topology:
         self.t: Time = t
         self.no_planes: int = 0
         self.no_sat_per_plane: int = 0
+        # GCRS positions in km, one row per node, computed once per snapshot
+        self.positions: np.ndarray = np.empty((0, 3))
+        self.node_index: Dict[str, int] = dict()
+        # (plane, position_in_plane) -> satellite, and plane -> satellites
+        self.plane_index: Dict[Tuple[int, int], str] = dict()
+        self.planes: Dict[int, List[str]] = dict()
+        # shell -> sorted planes, and plane -> shell
+        self.shells: Dict[int, List[int]] = dict()
+        self.plane_shell: Dict[int, int] = dict()
+        # Node-type partitions, kept up to date by add_nodes_from, add_edge and remove_edge
+        self._nodes_by_type: Dict[NodeTypes, Dict[str, None]] = {
+            node_type: dict() for node_type in NodeTypes
+        }
+        self._isls: Dict[Tuple[str, str], None] = dict()
+        self._gsls: Dict[Tuple[str, str], None] = dict()
 
     def __str__(self) -> str:
         nx_data = nx.node_link_data(self.ntwk)
@@ -44,35 +76,58 @@ class Topology:
     def __repr__(self) -> str:
         return self.__str__()
 
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the topology in the compact binary format of binary_format
+        """
+        return binary_format.encode(
+            {
+                "name": self.name,
+                "t": self.t.utc_strftime(),
+                "description": self.ntwk.__str__(),
+                "no_planes": self.no_planes,
+                "no_sat_per_plane": self.no_sat_per_plane,
+            },
+            list(self.ntwk.nodes(data=True)),
+            self.ntwk.adj,
+        )
+
+    def add_nodes_from(self, nodes: List[Tuple[str, Dict[str, Any]]]) -> None:
+        self.ntwk.add_nodes_from(nodes)
+
+        for node, info in nodes:
+            self._nodes_by_type[info["type"]][node] = None
+
+    def add_edge(self, u: str, v: str, **attr) -> None:
+        if not self.ntwk.has_edge(u, v):
+            if (
+                self.ntwk.nodes[u]["type"] == NodeTypes.GROUD_STATION
+                or self.ntwk.nodes[v]["type"] == NodeTypes.GROUD_STATION
+            ):
+                self._gsls[u, v] = None
+            else:
+                self._isls[u, v] = None
+
+        self.ntwk.add_edge(u, v, **attr)
+
+    def remove_edge(self, u: str, v: str) -> None:
+        self.ntwk.remove_edge(u, v)
+
+        for edges in (self._isls, self._gsls):
+            edges.pop((u, v), None)
+            edges.pop((v, u), None)
+
     def get_GSs(self) -> List[str]:
-        return [
-            node
-            for node in self.ntwk.nodes
-            if self.ntwk.nodes[node]["type"] == NodeTypes.GROUD_STATION
-        ]
+        return list(self._nodes_by_type[NodeTypes.GROUD_STATION])
 
     def get_leo_satellites(self) -> List[str]:
-        return [
-            node
-            for node in self.ntwk.nodes
-            if self.ntwk.nodes[node]["type"] == NodeTypes.LEO_SATELLITE
-        ]
-
-    def get_ISLs(self) -> List[str]:
-        return [
-            (s, t)
-            for s, t in self.ntwk.edges
-            if self.ntwk.nodes[s]["type"] == NodeTypes.LEO_SATELLITE
-            and self.ntwk.nodes[t]["type"] == NodeTypes.LEO_SATELLITE
-        ]
-
-    def get_GSLs(self) -> List[str]:
-        return [
-            (s, t)
-            for s, t in self.ntwk.edges
-            if self.ntwk.nodes[s]["type"] == NodeTypes.GROUD_STATION
-            or self.ntwk.nodes[t]["type"] == NodeTypes.GROUD_STATION
-        ]
+        return list(self._nodes_by_type[NodeTypes.LEO_SATELLITE])
+
+    def get_ISLs(self) -> List[Tuple[str, str]]:
+        return list(self._isls)
+
+    def get_GSLs(self) -> List[Tuple[str, str]]:
+        return list(self._gsls)
 
     def get_sat_plane(self, satellite: str) -> int:
         return self.ntwk.nodes[satellite]["plane"]
@@ -80,16 +135,70 @@ class Topology:
     def get_position_in_plane(self, satellite: str) -> int:
         return self.ntwk.nodes[satellite]["position_in_plane"]
 
+    def set_positions(self, nodes: List[str], positions: np.ndarray) -> None:
+        """Stores the precomputed positions of nodes
+
+        Args:
+            nodes (List[str]): node names
+            positions (np.ndarray): (len(nodes), 3) GCRS positions in km
+        """
+
+        for node in nodes:
+            self.node_index[node] = len(self.node_index)
+
+        self.positions = np.vstack([self.positions, positions])
+
+    def get_position_vector(self, node: str) -> np.ndarray:
+        return self.positions[self.node_index[node]]
+
+    def get_distance(self, u: str, v: str) -> float:
+        return float(
+            np.linalg.norm(self.get_position_vector(u) - self.get_position_vector(v))
+        )
+
+    def add_to_plane_index(
+        self, satellite: str, plane: int, position_in_plane: int, shell: int = 0
+    ) -> None:
+        self.plane_index[plane, position_in_plane] = satellite
+        self.planes.setdefault(plane, []).append(satellite)
+
+        if plane not in self.plane_shell:
+            self.plane_shell[plane] = shell
+            insort(self.shells.setdefault(shell, []), plane)
+
+    def get_sat_shell(self, satellite: str) -> int:
+        return self.plane_shell[self.get_sat_plane(satellite)]
+
+    def get_shell_planes(self, shell: int) -> List[int]:
+        return self.shells.get(shell, [])
+
+    def get_next_plane(self, plane: int) -> int:
+        """
+        Next plane in the same shell, the last plane is followed by the first one
+        """
+        planes = self.shells[self.plane_shell[plane]]
+        return planes[(bisect_left(planes, plane) + 1) % len(planes)]
+
+    def get_satellite_at(self, plane: int, position_in_plane: int) -> str | None:
+        return self.plane_index.get((plane, position_in_plane))
+
+    def get_plane_satellites(self, plane: int) -> List[str]:
+        return self.planes.get(plane, [])
+
     def get_difference(self, u: str, v: str) -> ICRF:
         return self.ntwk.nodes[u]["skyfield_obj"].at(self.t) - self.ntwk.nodes[v][
             "skyfield_obj"
         ].at(self.t)
 
     def get_position(self, node: str) -> ICRF:
+        if node in self.node_index:
+            return build_position(
+                self.get_position_vector(node) / AU_KM, center=399, t=self.t
+            )
         return self.ntwk.nodes[node]["skyfield_obj"].at(self.t)
 
     def get_node_lat_lon(self, node: str):
-        lat, long = wgs84.latlon_of(self.ntwk.nodes[node]["skyfield_obj"].at(self.t))
+        lat, long = wgs84.latlon_of(self.get_position(node))
         return lat.degrees, long.degrees
 
     def is_different(self, other: Self):
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+import gravity_model.matrix_builder as mxb
+
+
+def diurnal_profile(
+    local_hours: np.ndarray, amplitude: float = 0.5, peak_hour: float = 21.0
+) -> np.ndarray:
+    """Activity of a city along the day, 1 on average
+
+    Args:
+        local_hours (np.ndarray): local solar time, in hours
+        amplitude (float): relative swing of the activity, in [0, 1]
+        peak_hour (float): local time of the busiest hour
+
+    Returns:
+        np.ndarray: activity at every local time
+    """
+
+    return 1 + amplitude * np.cos(2 * np.pi * (local_hours - peak_hour) / 24)
+
+
+def get_local_hours(t: datetime, longitudes: np.ndarray) -> np.ndarray:
+    """Local solar time of every longitude at t, in hours"""
+
+    t = t.astimezone(timezone.utc)
+    utc_hours = t.hour + t.minute / 60 + (t.second + t.microsecond / 1e6) / 3600
+
+    return (utc_hours + np.asarray(longitudes, dtype=np.float64) / 15) % 24
+
+
+def iter_traffic_matrices(
+    cities: List[Dict[str, Any]],
+    total_volume_of_traffic: float,
+    start_time: datetime,
+    end_time: datetime,
+    dt: int,
+    amplitude: float = 0.5,
+    peak_hour: float = 21.0,
+    fluctuation: float = 0.1,
+    seed: int | None = None,
+    **gravity_model: Any,
+) -> Iterator[Tuple[datetime, np.ndarray]]:
+    """Time-varying gravity model, generated lazily one time instant at a time.
+
+    The traffic from s to t at every time instant is the one of the gravity model, scaled
+    by the diurnal activity of s and t at their local time and by a random log-normal
+    fluctuation of mean 1.
+
+    Args:
+        cities (List[Dict[str, Any]]): name, population, latitude and longitude of every city
+        total_volume_of_traffic (float): sum of the matrix of the gravity model, i.e.
+            the total traffic on average over a day
+        start_time (datetime): first time instant
+        end_time (datetime): last time instant, included
+        dt (int): time step in milliseconds
+        amplitude (float): relative swing of the diurnal activity, 0 for a constant activity
+        peak_hour (float): local time of the busiest hour
+        fluctuation (float): standard deviation of the log of the random fluctuation,
+            0 for no fluctuation
+        seed (int | None): seed of the random fluctuation
+        gravity_model (Any): arguments of build_traffic_matrix, e.g. alpha
+
+    Raises:
+        ValueError: if dt is not positive or end_time is before start_time, checked on
+            the call rather than on the first matrix
+
+    Returns:
+        Iterator[Tuple[datetime, np.ndarray]]: time instant and n x n traffic matrix
+    """
+
+    if dt <= 0:
+        raise ValueError(f"dt must be positive, not {dt}")
+
+    if end_time < start_time:
+        raise ValueError(f"end time {end_time} is before start time {start_time}")
+
+    base, _ = mxb.build_traffic_matrix(
+        cities=cities, total_volume_of_traffic=total_volume_of_traffic, **gravity_model
+    )
+    longitudes = np.array([city["longitude"] for city in cities], dtype=np.float64)
+
+    return _iter_traffic_matrices(
+        base, longitudes, start_time, end_time, dt, amplitude, peak_hour, fluctuation, seed
+    )
+
+
+def _iter_traffic_matrices(
+    base: np.ndarray,
+    longitudes: np.ndarray,
+    start_time: datetime,
+    end_time: datetime,
+    dt: int,
+    amplitude: float,
+    peak_hour: float,
+    fluctuation: float,
+    seed: int | None,
+) -> Iterator[Tuple[datetime, np.ndarray]]:
+    rng = np.random.default_rng(seed)
+
+    now = start_time
+    while now <= end_time:
+        activity = diurnal_profile(get_local_hours(now, longitudes), amplitude, peak_hour)
+
+        traffic_matrix = base * np.outer(activity, activity)
+
+        if fluctuation > 0:
+            traffic_matrix *= rng.lognormal(
+                -(fluctuation**2) / 2, fluctuation, size=traffic_matrix.shape
+            )
+
+        yield now, traffic_matrix
+
+        now += timedelta(milliseconds=dt)
@@ -1,41 +1,85 @@
-from ast import Tuple
-from itertools import combinations
-from typing import Any, Dict, List
-import sys
-import geopy.distance
+from enum import Enum
+from typing import Any, Dict, List, Tuple
 import numpy as np
 
+EARTH_RADIUS = 6371.0088  # km, mean radius
 
-def build_traffic_matrix(cities : List[Dict[str, Any]], total_volume_of_traffic: float) -> Dict[str, Dict[str, float]]:
-    #pairwise_distance: Dict[str, Dict[str, float]] = dict()
-    p_in: Dict[str, float] = dict()
-    p_out: Dict[str, float] = dict()
-    total_population = sum([city['population'] for city in cities])
-    traffic_matrix_dict = dict()
 
-    print(total_population, file=sys.stderr)
+class DistanceDecay(str, Enum):
+    # f(d) = d^-alpha
+    POWER = "power"
+    # f(d) = exp(-alpha * d / 1000)
+    EXPONENTIAL = "exponential"
 
+
+def haversine_distances(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distances between every pair of points
+
+    Args:
+        latitudes (np.ndarray): latitudes, in degrees
+        longitudes (np.ndarray): longitudes, in degrees
+
+    Returns:
+        np.ndarray: n x n matrix of the distances, in km
     """
-    for s in cities:
-        for t in cities:
-            coords_s = (s['latitude'], s['longitude'])
-            coords_t = (t['latitude'], t['longitude'])
-            pairwise_distance[s['name'], t['name']] = geopy.distance.geodesic(coords_s, coords_t).km
-        
-    #print(pairwise_distance, file=sys.stderr)
 
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    # hav(d/R) = hav(dlat) + cos(lat1) cos(lat2) hav(dlon)
+    h = np.sin((latitudes[:, None] - latitudes[None, :]) / 2) ** 2
+    cos_latitudes = np.cos(latitudes)
+    h += (
+        np.outer(cos_latitudes, cos_latitudes)
+        * np.sin((longitudes[:, None] - longitudes[None, :]) / 2) ** 2
+    )
+    np.clip(h, 0, 1, out=h)
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(h, out=h), out=h)
+
+
+def build_traffic_matrix(
+    cities: List[Dict[str, Any]],
+    total_volume_of_traffic: float,
+    alpha: float = 0.0,
+    decay: DistanceDecay = DistanceDecay.POWER,
+    min_distance: float = 100.0,
+) -> Tuple[np.ndarray, List[str]]:
+    """Gravity model, the traffic from s to t is proportional to
+    population(s) * population(t) * f(distance(s, t))
+
+    Args:
+        cities (List[Dict[str, Any]]): name, population, latitude and longitude of every city
+        total_volume_of_traffic (float): sum of the matrix
+        alpha (float): strength of the distance decay, 0 ignores distance
+        decay (DistanceDecay): distance decay function f
+        min_distance (float): distances are clamped to min_distance km, so that the
+            traffic between very close cities stays finite
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: n x n traffic matrix and the names of its rows and columns
     """
 
-    p_in = {city['name']: city['population'] / total_population for city in cities}
-    p_out = {city['name']: city['population'] / total_population for city in cities}
+    names = [city["name"] for city in cities]
+    population = np.array([city["population"] for city in cities], dtype=np.float64)
+
+    traffic_matrix = np.outer(population, population)
+
+    if alpha != 0:
+        distances = haversine_distances(
+            [city["latitude"] for city in cities],
+            [city["longitude"] for city in cities],
+        )
+        np.maximum(distances, min_distance, out=distances)
+
+        if DistanceDecay(decay) == DistanceDecay.POWER:
+            traffic_matrix *= np.power(distances, -alpha, out=distances)
+        else:
+            traffic_matrix *= np.exp(-alpha * distances / 1000, out=distances)
 
-    traffic_matrix = total_volume_of_traffic * np.outer(list(p_in.values()), list(p_out.values()))
-    
-    for i, s in enumerate(cities):
-        traffic_matrix_dict[s['name']] = dict()
-        for j, t in enumerate(cities):
-            traffic_matrix_dict[s['name']][t['name']] = traffic_matrix[i][j]
+        # A city has no distance to itself, its traffic does not cross the network
+        np.fill_diagonal(traffic_matrix, 0)
 
-    print(traffic_matrix_dict, file=sys.stderr)
+    traffic_matrix *= total_volume_of_traffic / traffic_matrix.sum()
 
-    return traffic_matrix_dict
\ No newline at end of file
+    return traffic_matrix, names
@@ -0,0 +1,40 @@
+"""
+Stream of traffic matrices of the same cities, one per time instant.
+
+    magic   : b"TMXS"
+    header  : <I size, then the JSON list of the n city names
+    records : <Bd kind and POSIX timestamp, then for MATRIX records the n x n <f8 matrix,
+              row-major. The stream ends with an END record
+"""
+
+import json
+import struct
+from datetime import datetime
+from typing import List
+import numpy as np
+
+MAGIC = b"TMXS"
+MIMETYPE = "application/x-traffic-matrix-stream"
+
+# Record kinds
+MATRIX = 0
+END = 1
+
+_HEADER = struct.Struct("<I")
+_RECORD = struct.Struct("<Bd")
+
+
+def encode_header(cities: List[str]) -> bytes:
+    names = json.dumps(cities).encode()
+
+    return MAGIC + _HEADER.pack(len(names)) + names
+
+
+def encode_matrix(t: datetime, traffic_matrix: np.ndarray) -> bytes:
+    return _RECORD.pack(MATRIX, t.timestamp()) + np.ascontiguousarray(
+        traffic_matrix, dtype="<f8"
+    ).tobytes()
+
+
+def encode_end() -> bytes:
+    return _RECORD.pack(END, 0.0)
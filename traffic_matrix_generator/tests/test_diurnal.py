@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+import gravity_model.diurnal as diurnal
+import gravity_model.matrix_builder as mxb
+
+CITIES = [
+    {"name": "Tokyo", "population": 37.7e6, "latitude": 35.6897, "longitude": 139.692},
+    {"name": "Cairo", "population": 21.3e6, "latitude": 30.0444, "longitude": 31.2358},
+    {"name": "Lima", "population": 10.7e6, "latitude": -12.06, "longitude": -77.0375},
+]
+
+
+class TestDiurnal:
+    def test_diurnal_profile(self):
+        hours = np.arange(0, 24, 0.25)
+
+        profile = diurnal.diurnal_profile(hours, amplitude=0.4, peak_hour=21.0)
+
+        # 1 on average, busiest at the peak hour and quietest 12 hours later
+        assert profile.mean() == pytest.approx(1)
+        assert hours[profile.argmax()] == 21.0
+        assert profile.max() == pytest.approx(1.4)
+        assert hours[profile.argmin()] == 9.0
+        assert profile.min() == pytest.approx(0.6)
+
+        assert np.allclose(diurnal.diurnal_profile(hours, amplitude=0), 1)
+
+    def test_get_local_hours(self):
+        t = datetime(year=2023, month=9, day=12, hour=12, minute=30, tzinfo=timezone.utc)
+        longitudes = [0, 90, -90, 180, -180]
+
+        assert np.allclose(
+            diurnal.get_local_hours(t, longitudes), [12.5, 18.5, 6.5, 0.5, 0.5]
+        )
+
+        # Whatever the time zone of t
+        assert np.allclose(
+            diurnal.get_local_hours(
+                t.astimezone(timezone(timedelta(hours=2))), longitudes
+            ),
+            [12.5, 18.5, 6.5, 0.5, 0.5],
+        )
+
+    def test_iter_traffic_matrices(self):
+        start_time = datetime(year=2023, month=9, day=12, tzinfo=timezone.utc)
+        base, _ = mxb.build_traffic_matrix(CITIES, total_volume_of_traffic=1e9)
+
+        traffic_matrices = list(
+            diurnal.iter_traffic_matrices(
+                CITIES,
+                total_volume_of_traffic=1e9,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=23),
+                dt=3600 * 1000,
+                amplitude=0.5,
+                fluctuation=0,
+            )
+        )
+
+        # End time included
+        assert [t for t, _ in traffic_matrices] == [
+            start_time + timedelta(hours=hour) for hour in range(24)
+        ]
+
+        for t, traffic_matrix in traffic_matrices:
+            activity = diurnal.diurnal_profile(
+                diurnal.get_local_hours(t, [city["longitude"] for city in CITIES]),
+                amplitude=0.5,
+            )
+
+            assert np.allclose(traffic_matrix, base * np.outer(activity, activity))
+
+        # Traffic within a city peaks at 21 local time, i.e. 21 - longitude / 15 UTC
+        peaks = np.argmax([np.diag(matrix) for _, matrix in traffic_matrices], axis=0)
+
+        assert peaks.tolist() == [12, 19, 2]
+
+    def test_fluctuation(self):
+        start_time = datetime(year=2023, month=9, day=12, tzinfo=timezone.utc)
+        base, _ = mxb.build_traffic_matrix(CITIES, total_volume_of_traffic=1e9)
+
+        def generate(seed: int) -> np.ndarray:
+            return np.array(
+                [
+                    traffic_matrix
+                    for _, traffic_matrix in diurnal.iter_traffic_matrices(
+                        CITIES,
+                        total_volume_of_traffic=1e9,
+                        start_time=start_time,
+                        end_time=start_time + timedelta(minutes=499),
+                        dt=60 * 1000,
+                        amplitude=0,
+                        fluctuation=0.1,
+                        seed=seed,
+                    )
+                ]
+            )
+
+        traffic_matrices = generate(0)
+
+        assert np.array_equal(traffic_matrices, generate(0))
+        assert not np.array_equal(traffic_matrices, generate(1))
+
+        # Log-normal of mean 1 around the gravity model
+        fluctuations = traffic_matrices / base
+
+        assert fluctuations.mean() == pytest.approx(1, abs=0.01)
+        assert np.log(fluctuations).std() == pytest.approx(0.1, abs=0.01)
+
+    @pytest.mark.parametrize("end_hour, dt", [(1, 0), (1, -1000), (0, 1000)])
+    def test_invalid_range(self, end_hour, dt):
+        start_time = datetime(year=2023, month=9, day=12, hour=1, tzinfo=timezone.utc)
+
+        # On the call, before any matrix is requested
+        with pytest.raises(ValueError):
+            diurnal.iter_traffic_matrices(
+                CITIES,
+                total_volume_of_traffic=1e9,
+                start_time=start_time,
+                end_time=start_time.replace(hour=end_hour),
+                dt=dt,
+            )
+
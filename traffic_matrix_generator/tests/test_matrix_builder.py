@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import gravity_model.matrix_builder as mxb
+
+CITIES = [
+    {"name": "London", "population": 9.6e6, "latitude": 51.5074, "longitude": -0.1278},
+    {"name": "Paris", "population": 11.1e6, "latitude": 48.8566, "longitude": 2.3522},
+    {"name": "New York", "population": 18.9e6, "latitude": 40.7128, "longitude": -74.006},
+    {"name": "Sydney", "population": 5.3e6, "latitude": -33.8688, "longitude": 151.2093},
+]
+
+
+def _get_distances(cities) -> np.ndarray:
+    return mxb.haversine_distances(
+        [city["latitude"] for city in cities], [city["longitude"] for city in cities]
+    )
+
+
+class TestMatrixBuilder:
+    def test_haversine_distances(self):
+        distances = _get_distances(CITIES)
+
+        assert distances[0, 1] == pytest.approx(343.5, rel=1e-3)
+        assert distances[0, 2] == pytest.approx(5570, rel=1e-3)
+        assert distances[2, 3] == pytest.approx(15990, rel=1e-3)
+
+        assert np.array_equal(distances, distances.T)
+        assert np.all(np.diag(distances) == 0)
+
+        # Quarter of a meridian, half of the equator
+        distances = mxb.haversine_distances([0, 90, 0], [0, 0, 180])
+
+        assert distances[0, 1] == pytest.approx(np.pi * mxb.EARTH_RADIUS / 2)
+        assert distances[0, 2] == pytest.approx(np.pi * mxb.EARTH_RADIUS)
+
+    @pytest.mark.parametrize("decay", list(mxb.DistanceDecay))
+    def test_zeroed_diagonal(self, decay):
+        traffic_matrix, names = mxb.build_traffic_matrix(
+            CITIES, total_volume_of_traffic=1e9, alpha=1.0, decay=decay
+        )
+
+        assert names == [city["name"] for city in CITIES]
+        assert np.all(np.diag(traffic_matrix) == 0)
+        assert np.all(traffic_matrix[~np.eye(len(CITIES), dtype=bool)] > 0)
+        assert np.array_equal(traffic_matrix, traffic_matrix.T)
+        assert traffic_matrix.sum() == pytest.approx(1e9)
+
+    def test_no_distance_decay(self):
+        traffic_matrix, _ = mxb.build_traffic_matrix(CITIES, total_volume_of_traffic=1e9)
+
+        # Population only, traffic within a city included
+        population = np.array([city["population"] for city in CITIES])
+
+        assert np.allclose(
+            traffic_matrix,
+            1e9 * np.outer(population, population) / population.sum() ** 2,
+        )
+
+    @pytest.mark.parametrize(
+        "decay, alpha, f",
+        [
+            (mxb.DistanceDecay.POWER, 2.0, lambda d: d**-2.0),
+            (mxb.DistanceDecay.EXPONENTIAL, 0.5, lambda d: np.exp(-0.5 * d / 1000)),
+        ],
+    )
+    def test_distance_decay(self, decay, alpha, f):
+        traffic_matrix, _ = mxb.build_traffic_matrix(
+            CITIES, total_volume_of_traffic=1e9, alpha=alpha, decay=decay
+        )
+
+        population = np.array([city["population"] for city in CITIES])
+        off_diagonal = ~np.eye(len(CITIES), dtype=bool)
+
+        # Traffic over the product of the populations follows f, up to a constant
+        decay_shape = traffic_matrix / np.outer(population, population)
+        ratios = decay_shape[off_diagonal] / f(_get_distances(CITIES)[off_diagonal])
+
+        assert np.allclose(ratios, ratios[0])
+
+        # The farther, the less traffic between the same populations
+        order = np.argsort(_get_distances(CITIES)[0, 1:])
+        assert np.all(np.diff(decay_shape[0, 1:][order]) < 0)
+
+    def test_min_distance(self):
+        # 10 km apart, clamped to min_distance
+        close_cities = [
+            {"name": "A", "population": 1e6, "latitude": 0.0, "longitude": 0.0},
+            {"name": "B", "population": 1e6, "latitude": 0.0, "longitude": 0.0899},
+            {"name": "C", "population": 1e6, "latitude": 0.0, "longitude": 0.8993},
+        ]
+
+        traffic_matrix, _ = mxb.build_traffic_matrix(
+            close_cities, total_volume_of_traffic=1e9, alpha=2.0, min_distance=100.0
+        )
+
+        assert _get_distances(close_cities)[0, 1] == pytest.approx(10, rel=1e-3)
+        assert _get_distances(close_cities)[0, 2] == pytest.approx(100, rel=1e-3)
+        assert np.all(np.isfinite(traffic_matrix))
+        assert traffic_matrix[0, 1] == pytest.approx(traffic_matrix[0, 2], rel=1e-3)
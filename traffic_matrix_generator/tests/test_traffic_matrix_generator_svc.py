@@ -0,0 +1,41 @@
+from pathlib import Path
+import pytest
+
+
+class TestTrafficMatrixGeneratorSvc:
+    URL = "/traffic_matrix/range"
+    PARAMS = {
+        "start": "2023-09-12 10:00:00 +0000",
+        "end": "2023-09-12 10:00:02 +0000",
+        "dt": "1000",
+        "cities": "Tokyo,Cairo",
+        "total_volume_of_traffic": "1e9",
+    }
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CITY_STORE_FILE", str(tmp_path / "cities.sqlite"))
+        monkeypatch.setenv("CITIES_FILE", str(Path("../../cities.yaml").resolve()))
+
+        import traffic_matrix_generator_svc
+
+        return traffic_matrix_generator_svc.app.test_client()
+
+    def test_range(self, client):
+        response = client.get(self.URL, query_string=self.PARAMS)
+
+        assert response.status_code == 200
+        assert response.data.startswith(b"TMXS")
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"dt": "0"},
+            {"dt": "-1000"},
+            {"end": "2023-09-12 09:59:00 +0000"},
+        ],
+    )
+    def test_invalid_range(self, client, params):
+        response = client.get(self.URL, query_string={**self.PARAMS, **params})
+
+        assert response.status_code == 400
@@ -1,33 +1,104 @@
+from datetime import datetime
+import io
 import json
 import os
 import pathlib
 from typing import List
 from flask import Flask, Response
 from flask import request
-import requests
+import numpy as np
+from city_store import CityStore
+import gravity_model.diurnal as diurnal
 import gravity_model.matrix_builder as mxb
+import gravity_model.matrix_stream as mxs
 
 app = Flask(__name__)
 
-BASE_CITY_API_URL = os.environ.get('BASE_CITY_API_URL')
-CITY_SVC_API_KEY = pathlib.Path(os.environ.get('CITY_SVC_API_KEY_FILE')).read_text()
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+CITY_SVC_API_KEY_FILE = os.environ.get('CITY_SVC_API_KEY_FILE')
+# Known cities are served locally, the city service is only called for the others
+CITY_STORE = CityStore(
+    pathlib.Path(os.environ.get('CITY_STORE_FILE', './cache/cities.sqlite')),
+    base_url=os.environ.get('BASE_CITY_API_URL'),
+    api_key=pathlib.Path(CITY_SVC_API_KEY_FILE).read_text().strip() if CITY_SVC_API_KEY_FILE else None,
+    timeout=float(os.environ.get('CITY_SVC_TIMEOUT', 5)),
+)
+
+if os.environ.get('CITIES_FILE'):
+    CITY_STORE.load_file(pathlib.Path(os.environ['CITIES_FILE']))
 
 
 @app.route("/traffic_matrix")
 def traffic_matrix():
+    """
+    Dense traffic matrix and the names of its rows and columns, as JSON
+    ({"cities": [...], "matrix": [[...]]}) or, with format=npz, as an npz archive with
+    cities and matrix arrays, which is far smaller for thousands of cities.
+    """
     cities: List[str] = [city.strip() for city in request.args.get("cities").split(',')]
     total_volume_of_traffic = float(request.args.get("total_volume_of_traffic"))
 
-    for i, city in enumerate(cities):
-        response = requests.get(
-            f"{BASE_CITY_API_URL}?name={city}", headers={"X-Api-Key": CITY_SVC_API_KEY}
+    traffic_matrix, names = mxb.build_traffic_matrix(
+        cities=CITY_STORE.get(cities),
+        total_volume_of_traffic=total_volume_of_traffic,
+        alpha=float(request.args.get("alpha", 0)),
+        decay=mxb.DistanceDecay(request.args.get("decay", mxb.DistanceDecay.POWER)),
+        min_distance=float(request.args.get("min_distance", 100)),
+    )
+
+    if request.args.get("format") == "npz":
+        stream = io.BytesIO()
+        np.savez(stream, cities=np.array(names), matrix=traffic_matrix)
+
+        return Response(stream.getvalue(), mimetype="application/x-npz")
+
+    return Response(
+        json.dumps({"cities": names, "matrix": traffic_matrix.tolist()}),
+        mimetype="application/json",
+    )
+
+
+@app.route("/traffic_matrix/range")
+def traffic_matrix_range():
+    """
+    Traffic matrices from start to end, every dt milliseconds, with diurnal activity and
+    random fluctuations, streamed as a traffic matrix stream. Matrices are generated
+    while the stream is consumed.
+    """
+    try:
+        cities: List[str] = [city.strip() for city in request.args.get("cities").split(',')]
+        total_volume_of_traffic = float(request.args.get("total_volume_of_traffic"))
+        seed = request.args.get("seed")
+
+        cities_info = CITY_STORE.get(cities)
+
+        traffic_matrices = diurnal.iter_traffic_matrices(
+            cities=cities_info,
+            total_volume_of_traffic=total_volume_of_traffic,
+            start_time=datetime.strptime(request.args.get("start"), TIME_FORMAT),
+            end_time=datetime.strptime(request.args.get("end"), TIME_FORMAT),
+            dt=int(request.args.get("dt", 1000)),
+            amplitude=float(request.args.get("amplitude", 0.5)),
+            peak_hour=float(request.args.get("peak_hour", 21)),
+            fluctuation=float(request.args.get("fluctuation", 0.1)),
+            seed=int(seed) if seed is not None else None,
+            alpha=float(request.args.get("alpha", 0)),
+            decay=mxb.DistanceDecay(request.args.get("decay", mxb.DistanceDecay.POWER)),
+            min_distance=float(request.args.get("min_distance", 100)),
         )
+    except ValueError as e:
+        return Response(str(e), status=400)
+
+    def generate():
+        yield mxs.encode_header([city["name"] for city in cities_info])
+
+        for now, traffic_matrix in traffic_matrices:
+            yield mxs.encode_matrix(now, traffic_matrix)
 
-        cities[i] = response.json()[0]
-    
-    traffic_matrix = mxb.build_traffic_matrix(cities=cities, total_volume_of_traffic=total_volume_of_traffic)
+        yield mxs.encode_end()
 
-    return Response(json.dumps(traffic_matrix, indent=4), mimetype="application/json")
+    return Response(generate(), mimetype=mxs.MIMETYPE)
 
 
 if __name__ == "__main__":